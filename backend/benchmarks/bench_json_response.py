@@ -0,0 +1,129 @@
+# backend/benchmarks/bench_json_response.py
+"""
+Rendering cost of annotation responses: starlette's JSONResponse (stdlib json) against
+FastJSONResponse (orjson), the app's default response class.
+
+The payloads look like real imageAnnotations documents: a mix of boxes, ellipses and
+polygon / freehand / mask outlines with thousands of points each. Two cases are measured:
+  - response_model: the route returns a DTO, FastAPI dumps it to JSON-ready python, the response renders it
+  - raw document:   the Mongo document itself (ObjectId, datetimes) is rendered
+
+    python -m backend.benchmarks.bench_json_response 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import uuid
+from datetime import datetime
+
+# Settings() and the db module need these to import; nothing connects
+for name, value in {
+    "MAILGUN_DOMAIN": "bench", "MAILGUN_API_KEY": "bench", "MAIL_FROM": "bench@localhost",
+    "FRONTEND_BASE_URL": "http://localhost", "atlas_URL": "mongodb://localhost:27017", "atlas_DB": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from backend.core.json_response import FastJSONResponse
+from backend.src.models.annotation2 import ImageAnnotationsDto
+
+
+def outline(n: int) -> list[list[float]]:
+    cx, cy, r = random.uniform(200, 1800), random.uniform(200, 1300), random.uniform(50, 200)
+    return [
+        [round(cx + r * random.uniform(0.9, 1.1) * (i / n), 2), round(cy + r * random.uniform(0.9, 1.1), 2)]
+        for i in range(n)
+    ]
+
+
+def make_annotation(i: int) -> dict:
+    kind = ("bbox", "ellipse", "polygon", "freehand", "mask")[i % 5]
+    if kind == "bbox":
+        geometry = {"x": 10.5 * i, "y": 20.25, "width": 120.0, "height": 80.5}
+    elif kind == "ellipse":
+        geometry = {"cx": 300.0, "cy": 200.0, "rx": 45.5, "ry": 30.25}
+    elif kind == "polygon":
+        geometry = {"points": outline(random.randint(1000, 4000))}
+    elif kind == "freehand":
+        geometry = {"path": outline(random.randint(1000, 4000))}
+    else:
+        geometry = {"maskPath": outline(random.randint(1000, 4000))}
+    return {"id": str(uuid.uuid4()), "label": f"label-{i % 7}", "type": kind, "geometry": geometry}
+
+
+def make_docs(n: int) -> list[dict]:
+    random.seed(42)
+    return [
+        {
+            "_id": ObjectId(),
+            "imageId": str(ObjectId()),
+            "for_remark": False,
+            "annotations": [make_annotation(j) for j in range(10)],
+            "updatedAt": datetime(2025, 1, 1, 12, 0, 0),
+        }
+        for _ in range(n)
+    ]
+
+
+def measure(fn, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def render_all(response_class, contents: list) -> int:
+    # render() is what the response constructor runs on the route's return value
+    return sum(len(response_class(content).body) for content in contents)
+
+
+def run(n: int):
+    docs = make_docs(n)
+    adapter = TypeAdapter(ImageAnnotationsDto)
+    dtos = [adapter.validate_python({**doc, "_id": str(doc["_id"])}) for doc in docs]
+    # response_model: FastAPI hands the response class the JSON-ready dump of the DTO
+    dumped = [adapter.dump_python(dto, mode="json") for dto in dtos]
+    points = sum(
+        len(next(iter(a["geometry"].values()))) for doc in docs for a in doc["annotations"]
+        if a["type"] in ("polygon", "freehand", "mask")
+    )
+
+    # same JSON both ways
+    for content in dumped[:5]:
+        assert json.loads(JSONResponse(content).body) == json.loads(FastJSONResponse(content).body)
+    for doc in docs[:5]:
+        assert json.loads(JSONResponse(jsonable_encoder(doc, custom_encoder={ObjectId: str})).body) \
+            == json.loads(FastJSONResponse(doc).body)
+
+    size = render_all(FastJSONResponse, dumped)
+    print(f"{n} documents, {points} outline points, {size / 1e6:.1f} MB of JSON")
+
+    cases = {
+        "response_model": {
+            "json": lambda: render_all(JSONResponse, dumped),
+            "orjson": lambda: render_all(FastJSONResponse, dumped),
+        },
+        "raw document": {
+            # the stdlib path has to run jsonable_encoder first to get rid of ObjectId / datetime
+            "json": lambda: render_all(JSONResponse, [jsonable_encoder(d, custom_encoder={ObjectId: str}) for d in docs]),
+            "orjson": lambda: render_all(FastJSONResponse, docs),
+        },
+    }
+    for case, fns in cases.items():
+        results = {name: measure(fn) for name, fn in fns.items()}
+        for name, elapsed in results.items():
+            print(f"{case:>14} {name:>6}: {elapsed:8.3f}s  ({size / elapsed / 1e6:8.1f} MB/s)")
+        print(f"{case:>14} speedup: {results['json'] / results['orjson']:.1f}x")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    run(count)
@@ -0,0 +1,98 @@
+# backend/benchmarks/bench_list_serialization.py
+"""
+CPU cost of turning a dataset listing into JSON: the model path (ImageMetadata(**doc) -> to_dto ->
+response_model validation -> JSON) against the raw path (documents -> JSON bytes).
+
+No database is needed, the documents are generated in memory; reading them from Mongo
+costs the same for both paths.
+
+    python -m backend.benchmarks.bench_list_serialization 10000
+"""
+import os
+import sys
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Settings() and the db module need these to import; nothing connects
+for name, value in {
+    "MAILGUN_DOMAIN": "bench", "MAILGUN_API_KEY": "bench", "MAIL_FROM": "bench@localhost",
+    "FRONTEND_BASE_URL": "http://localhost", "atlas_URL": "mongodb://localhost:27017", "atlas_DB": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from backend.src.models.imageMetadata import ImageMetadata, ImageMetadataDto
+from backend.src.services.imageMetadata_service import MetadataService
+from backend.src.helpers.raw_json import encode_docs
+
+
+def make_docs(n: int) -> list[dict]:
+    dataset_id = str(ObjectId())
+    uploaded = datetime(2025, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "datasetId": dataset_id,
+            "fileName": f"sample_{i:05d}.jpg",
+            "is_completed": i % 3 == 0,
+            "width": 2048,
+            "height": 1536,
+            "fileType": "jpg",
+            "s3Key": f"images/{dataset_id}/{uuid.uuid4()}.jpg",
+            "contentType": "image/jpeg",
+            "sizeBytes": 250_000 + i,
+            "etag": uuid.uuid4().hex,
+            "status": "ready",
+            "thumbKey": f"images/_derived/{dataset_id}/{i}/thumb.webp",
+            "previewKey": f"images/_derived/{dataset_id}/{i}/preview.webp",
+            "uploadedAt": uploaded + timedelta(seconds=i),
+            "is_active": True,
+        }
+        for i in range(n)
+    ]
+
+
+def model_path(docs: list[dict], service: MetadataService, adapter: TypeAdapter) -> bytes:
+    dtos = [service.to_dto(ImageMetadata(**doc)) for doc in docs]
+    # what FastAPI does with response_model: dump, validate again, serialize
+    validated = adapter.validate_python([dto.model_dump() for dto in dtos])
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+
+def raw_path(docs: list[dict]) -> bytes:
+    return encode_docs(docs, ImageMetadataDto)
+
+
+def measure(fn, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n: int):
+    docs = make_docs(n)
+    service = MetadataService()
+    adapter = TypeAdapter(list[ImageMetadataDto])
+
+    # same JSON both ways
+    assert json.loads(model_path(docs[:50], service, adapter)) == json.loads(raw_path(docs[:50]))
+
+    results = {
+        "model": measure(lambda: model_path(docs, service, adapter)),
+        "raw": measure(lambda: raw_path(docs)),
+    }
+    for name, elapsed in results.items():
+        print(f"{name:>5}: {n} rows in {elapsed:8.3f}s  ({n / elapsed:12.1f} rows/s)")
+    print(f"speedup: {results['model'] / results['raw']:.1f}x")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    run(count)
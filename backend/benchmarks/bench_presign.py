@@ -0,0 +1,62 @@
+# backend/benchmarks/bench_presign.py
+"""
+Compare the per-file presign loop with the bulk presign path.
+
+Run against a scratch database, never production:
+
+    atlas_URL=mongodb://localhost:27017 atlas_DB=bench python -m backend.benchmarks.bench_presign 2000
+
+Presigning is local, so dummy AWS credentials are enough.
+"""
+import os
+import sys
+import time
+import asyncio
+import uuid
+
+# Settings() needs these to import; the benchmark never sends mail or talks to S3
+for name, value in {
+    "MAILGUN_DOMAIN": "bench", "MAILGUN_API_KEY": "bench", "MAIL_FROM": "bench@localhost",
+    "FRONTEND_BASE_URL": "http://localhost", "AWS_REGION": "eu-north-1", "S3_BUCKET": "bench-bucket",
+    "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from backend.core.db import db
+from backend.src.services.image_service import ImageService
+
+
+def make_files(n: int) -> list[dict]:
+    return [
+        {"filename": f"sample_{i:05d}.jpg", "size": 250_000, "contentType": "image/jpeg"}
+        for i in range(n)
+    ]
+
+
+async def run(n: int):
+    service = ImageService()
+    files = make_files(n)
+
+    results = {}
+    for name, presign in (("loop", service.presign_upload), ("bulk", service.presign_upload_bulk)):
+        dataset_id = f"bench_{uuid.uuid4().hex[:12]}"
+        start = time.perf_counter()
+        out = await presign(dataset_id, files, current_user=None)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+
+        items = out if isinstance(out, list) else out["items"]
+        image_ids = [item["imageId"] for item in items]
+
+        # remove everything this run created
+        await db["imageAnnotations"].delete_many({"imageId": {"$in": image_ids}})
+        await db["imageMetadata"].delete_many({"datasetId": dataset_id})
+
+        print(f"{name:>5}: {n} files in {elapsed:8.3f}s  ({n / elapsed:10.1f} files/s)")
+
+    print(f"speedup: {results['loop'] / results['bulk']:.1f}x")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    asyncio.run(run(count))
@@ -8,12 +8,12 @@ class Settings(BaseSettings):
     mail_from: str
     frontend_base_url: str
 
-    # aws s3
-    aws_region: str
-    s3_bucket: str
+    # aws s3 (not needed with STORAGE_BACKEND=local; boto3 also finds credentials in the env or a role)
+    aws_region: str = "eu-north-1"
+    s3_bucket: str = "aidx-annotation-app-prod"
     s3_prefix: str = "images"
-    aws_access_key_id: str
-    aws_secret_access_key: str
+    aws_access_key_id: str | None = None
+    aws_secret_access_key: str | None = None
 
         # Pydantic Settings config (v2-stijl)
     model_config = SettingsConfigDict(
@@ -1,4 +1,5 @@
 import os, boto3
+from botocore.config import Config
 from dotenv import load_dotenv, find_dotenv
 from backend.config import settings
 
@@ -9,9 +10,31 @@ AWS_REGION = os.getenv("AWS_REGION", "eu-north-1")
 S3_BUCKET = os.getenv("S3_BUCKET", "aidx-annotation-app-prod")
 S3_PREFIX = os.getenv("S3_PREFIX", "images").strip("/")
 
-session = boto3.session.Session(region_name = AWS_REGION)
-s3 = session.client("s3")  # uses env creds or role
+# connection pool must cover every worker thread of the S3 gateway, otherwise threads wait on urllib3
+S3_MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "32"))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", str(S3_MAX_WORKERS + 8)))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "5"))
+
+def new_s3_client():
+    # also used by worker processes: a client (and its connection pool) must not be shared across a fork
+    session = boto3.session.Session(region_name = AWS_REGION)
+    return session.client(
+        "s3",
+        config=Config(
+            max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+            retries={"max_attempts": S3_MAX_ATTEMPTS, "mode": "adaptive"},
+        ),
+    )  # uses env creds or role
+
+s3 = new_s3_client()
 
 def s3_key(filename: str) -> str:
     # safe join for "uploads/yourfile.png"
-    return f"{S3_PREFIX}/{filename.lstrip('/')}"
\ No newline at end of file
+    return f"{S3_PREFIX}/{filename.lstrip('/')}"
+
+def derived_key(original_key: str, name: str) -> str:
+    # "images/{datasetId}/{uuid}.tif" -> "images/_derived/{datasetId}/{uuid}/{name}"
+    # derived objects (renditions, tiles) live outside the dataset prefix of the originals
+    relative = original_key[len(S3_PREFIX) + 1:] if original_key.startswith(f"{S3_PREFIX}/") else original_key
+    stem = relative.rsplit(".", 1)[0]
+    return f"{S3_PREFIX}/_derived/{stem}/{name}"
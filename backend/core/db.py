@@ -11,20 +11,19 @@ load_dotenv()
 # client = AsyncIOMotorClient("mongodb://localhost:27017")
 # db = client["AiDX_Medical"] # database name
 
-user = os.getenv("atlas_USERNAME")
-pw = quote_plus(os.getenv("atlas_PASSWORD"))
-cluster = os.getenv("atlas_CLUSTER")
 db_name = os.getenv("atlas_DB")
 
-uri = f"mongodb+srv://{user}:{pw}@{cluster}/{db_name}?retryWrites=true&w=majority&appName=AiDxMedical"
-client = AsyncIOMotorClient(uri)
-db = client[db_name]
-
-# MONGODB_URL = os.getenv("atlas_URL")
-
-# client = AsyncIOMotorClient(MONGODB_URL)
-
-# db = client["AiDxMedical"]
+# atlas_URL overrides the Atlas credentials, e.g. a local/scratch mongod for benchmarks
+MONGODB_URL = os.getenv("atlas_URL")
 
+if MONGODB_URL:
+    client = AsyncIOMotorClient(MONGODB_URL)
+else:
+    user = os.getenv("atlas_USERNAME")
+    pw = quote_plus(os.getenv("atlas_PASSWORD"))
+    cluster = os.getenv("atlas_CLUSTER")
 
+    uri = f"mongodb+srv://{user}:{pw}@{cluster}/{db_name}?retryWrites=true&w=majority&appName=AiDxMedical"
+    client = AsyncIOMotorClient(uri)
 
+db = client[db_name]
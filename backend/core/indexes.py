@@ -0,0 +1,111 @@
+# backend/core/indexes.py
+import logging
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+from backend.core.db import db
+
+logger = logging.getLogger(__name__)
+
+
+def _key_spec(keys) -> tuple:
+    if isinstance(keys, str):
+        return ((keys, 1),)
+    # servers may report directions as floats (1.0)
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in keys)
+
+
+def _index_name(keys: tuple) -> str:
+    # same name pymongo generates
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+class IndexRegistry:
+    """
+    Declarative list of the indexes every collection needs. Each repository module
+    declares the indexes of its own queries at import time; apply() creates them at startup.
+    create_index is a no-op for an index that already exists, so applying is idempotent.
+    """
+
+    def __init__(self):
+        # collection -> {index name: {"keys": ((field, direction), ...), "options": {...}}}
+        self._declared: dict[str, dict[str, dict]] = {}
+
+    def declare(self, collection: str, keys, **options):
+        spec = _key_spec(keys)
+        name = options.pop("name", None) or _index_name(spec)
+        self._declared.setdefault(collection, {})[name] = {"keys": spec, "options": options}
+
+    def declared(self) -> dict[str, dict[str, dict]]:
+        return self._declared
+
+    async def apply(self) -> dict:
+        """
+        Create every declared index. A failing index (e.g. conflicting options) is logged, not fatal;
+        neither is an unreachable server at startup: the app still comes up, the next start applies them.
+        """
+        report = {"ensured": [], "failed": []}
+        for collection, indexes in self._declared.items():
+            for name, index in indexes.items():
+                try:
+                    await db[collection].create_index(list(index["keys"]), name=name, **index["options"])
+                    report["ensured"].append(f"{collection}.{name}")
+                except ConnectionFailure as e:
+                    # no point waiting out the server selection timeout for every other index
+                    logger.warning(f"Indexes not applied, MongoDB is not reachable: {e}")
+                    report["unreachable"] = str(e)
+                    return report
+                except PyMongoError as e:
+                    logger.warning(f"Could not create index {collection}.{name}: {e}")
+                    report["failed"].append({"index": f"{collection}.{name}", "error": str(e)})
+        return report
+
+    async def usage_report(self) -> list[dict]:
+        """
+        Per collection: declared indexes, the ones actually present, and $indexStats usage
+        (operations since the last restart of the mongod), so missing and unused indexes stand out.
+        """
+        collections = set(self._declared) | set(await db.list_collection_names())
+        report = []
+        for collection in sorted(collections):
+            declared = self._declared.get(collection, {})
+            present = await db[collection].index_information()
+
+            try:
+                stats = {
+                    doc["name"]: {"ops": doc["accesses"]["ops"], "since": doc["accesses"]["since"]}
+                    async for doc in db[collection].aggregate([{"$indexStats": {}}])
+                }
+            except OperationFailure:
+                # $indexStats needs the clusterMonitor role (or is unsupported by the server)
+                stats = None
+
+            present_specs = {name: _key_spec(info["key"]) for name, info in present.items()}
+            missing = [
+                name for name, index in declared.items()
+                if index["keys"] not in present_specs.values()
+            ]
+            declared_specs = [index["keys"] for index in declared.values()]
+            undeclared = [
+                name for name, spec in present_specs.items()
+                if name != "_id_" and spec not in declared_specs
+            ]
+
+            report.append({
+                "collection": collection,
+                "declared": [
+                    {"name": name, "keys": dict(index["keys"]), **index["options"]}
+                    for name, index in declared.items()
+                ],
+                "present": [
+                    {"name": name, "keys": dict(present_specs[name]), "usage": (stats or {}).get(name)}
+                    for name in present
+                ],
+                "missing": missing,
+                "undeclared": undeclared,
+                "unused": [name for name, usage in (stats or {}).items() if name != "_id_" and usage["ops"] == 0],
+                "indexStatsAvailable": stats is not None,
+            })
+        return report
+
+
+# Global singleton instance
+index_registry = IndexRegistry()
@@ -0,0 +1,441 @@
+# backend/core/local_storage.py
+import os
+import json
+import hmac
+import time
+import uuid
+import base64
+import shutil
+import asyncio
+import hashlib
+import logging
+import secrets
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.core.storage_backend import (
+    StorageBackend, StorageError, NoSuchKeyError, NoSuchUploadError, STREAM_CHUNK_SIZE, parse_byte_range
+)
+
+logger = logging.getLogger(__name__)
+
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "./storage-data")
+# base url of this API as the browser sees it, signed urls point at /storage/local/... on it
+STORAGE_PUBLIC_URL = os.getenv("STORAGE_PUBLIC_URL", "http://localhost:8000").rstrip("/")
+STORAGE_LOCAL_WORKERS = int(os.getenv("STORAGE_LOCAL_WORKERS", "16"))
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _local_secret() -> bytes:
+    secret = os.getenv("STORAGE_LOCAL_SECRET")
+    if secret:
+        return secret.encode()
+    # fine for a single process; with several workers every process needs the same secret
+    logger.warning("STORAGE_LOCAL_SECRET is not set, signed storage urls only work in this process")
+    return secrets.token_bytes(32)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Filesystem storage backend for development and air-gapped deployments.
+
+    Layout under the root:
+      objects/<key>           the bytes
+      meta/<key>.json         content type, cache control, ETag (md5 like S3)
+      multipart/<uploadId>/   one file per uploaded part until the upload completes
+
+    Presigned urls are HMAC-signed, expiring urls served by the /storage router,
+    so the browser still uploads and downloads directly, without going through the services.
+    Writes go to a temp file first and are renamed into place.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = STORAGE_LOCAL_ROOT, public_url: str = STORAGE_PUBLIC_URL,
+                 secret: bytes | None = None, max_workers: int = STORAGE_LOCAL_WORKERS):
+        self.root = Path(root).resolve()
+        self.public_url = public_url
+        self.max_workers = max_workers
+        self._secret = secret or _local_secret()
+        self._objects = self.root / "objects"
+        self._meta = self.root / "meta"
+        self._multipart = self.root / "multipart"
+        for path in (self._objects, self._meta, self._multipart):
+            path.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="local-storage")
+
+        self._lock = threading.Lock()
+        self._ops: dict[str, dict] = {}
+
+
+    # ---------- internals ----------
+    async def _run(self, op: str, fn, *args):
+        def run():
+            started = time.perf_counter()
+            failed = False
+            try:
+                return fn(*args)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    stats = self._ops.setdefault(op, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+                    stats["calls"] += 1
+                    stats["errors"] += int(failed)
+                    stats["total_ms"] += elapsed_ms
+                    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, run)
+
+    def _object_path(self, key: str) -> Path:
+        parts = key.split("/")
+        if not key or key.startswith("/") or any(part in ("", ".", "..") for part in parts):
+            raise StorageError(f"Invalid key: {key}")
+        return self._objects.joinpath(*parts)
+
+    def _meta_path(self, key: str) -> Path:
+        return self._meta.joinpath(*key.split("/")).with_name(key.rsplit("/", 1)[-1] + ".json")
+
+    def _upload_dir(self, upload_id: str) -> Path:
+        if not upload_id.isalnum():
+            raise NoSuchUploadError(upload_id)
+        return self._multipart / upload_id
+
+    def _read_meta(self, key: str) -> dict:
+        try:
+            return json.loads(self._meta_path(key).read_text())
+        except FileNotFoundError:
+            return {}
+
+    def _commit(self, key: str, tmp_path: str, meta: dict):
+        path = self._object_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta_path = self._meta_path(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+        meta_path.write_text(json.dumps(meta))
+
+    def _temp_file(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, prefix=".tmp-", delete=False)
+
+    def _put(self, key: str, body: bytes, content_type: str, cache_control: str | None = None) -> dict:
+        path = self._object_path(key)
+        with self._temp_file(path.parent) as tmp:
+            tmp.write(body)
+        etag = hashlib.md5(body).hexdigest()
+        self._commit(key, tmp.name, {"ContentType": content_type, "CacheControl": cache_control, "ETag": etag})
+        return {"ETag": f'"{etag}"'}
+
+    def _head(self, key: str) -> dict:
+        path = self._object_path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise NoSuchKeyError(key)
+        meta = self._read_meta(key)
+        head = {
+            "ContentLength": stat.st_size,
+            "ContentType": meta.get("ContentType") or "binary/octet-stream",
+            "ETag": f'"{meta.get("ETag", "")}"',
+            "LastModified": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+        }
+        if meta.get("CacheControl"):
+            head["CacheControl"] = meta["CacheControl"]
+        return head
+
+    def _read(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        try:
+            with open(self._object_path(key), "rb") as f:
+                f.seek(start)
+                return f.read() if end is None else f.read(end - start + 1)
+        except FileNotFoundError:
+            raise NoSuchKeyError(key)
+
+    def _delete(self, key: str):
+        for path in (self._object_path(key), self._meta_path(key)):
+            path.unlink(missing_ok=True)
+
+    def _delete_many(self, keys: list[str]) -> dict:
+        errors = []
+        for key in keys:
+            try:
+                self._delete(key)
+            except (OSError, StorageError) as e:
+                errors.append({"Key": key, "Code": type(e).__name__, "Message": str(e)})
+        return {"Errors": errors} if errors else {}
+
+    def _iter_keys(self, directory: Path, relative: str, prefix: str, after: str):
+        # S3 lists in key order: a directory sorts as "name/", and subtrees that
+        # are entirely before `after` or outside the prefix are never walked
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name + "/" if e.is_dir() else e.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            key = relative + entry.name
+            if entry.is_dir():
+                subtree = key + "/"
+                if not (prefix.startswith(subtree) or subtree.startswith(prefix)):
+                    continue
+                if subtree < after and not after.startswith(subtree):
+                    continue
+                yield from self._iter_keys(Path(entry.path), subtree, prefix, after)
+            elif not entry.name.startswith(".tmp-") and key.startswith(prefix) and key > after:
+                yield key, entry
+
+    def _list(self, prefix: str, continuation_token: str | None, max_keys: int, start_after: str | None) -> dict:
+        after = continuation_token or start_after or ""
+        contents = []
+        truncated = False
+        for key, entry in self._iter_keys(self._objects, "", prefix, after):
+            if len(contents) == max_keys:
+                truncated = True
+                break
+            stat = entry.stat()
+            contents.append({
+                "Key": key,
+                "Size": stat.st_size,
+                "LastModified": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                "ETag": f'"{self._read_meta(key).get("ETag", "")}"',
+            })
+        response = {"Prefix": prefix, "KeyCount": len(contents), "Contents": contents, "IsTruncated": truncated}
+        if truncated:
+            response["NextContinuationToken"] = contents[-1]["Key"]
+        return response
+
+
+    # ---------- object operations ----------
+    async def head_object(self, key: str) -> dict:
+        return await self._run("head_object", self._head, key)
+
+    async def delete_object(self, key: str) -> dict:
+        await self._run("delete_object", self._delete, key)
+        return {}
+
+    async def get_object_bytes(self, key: str) -> bytes:
+        return await self._run("get_object", self._read, key)
+
+    async def get_object_range(self, key: str, start: int, end: int) -> bytes:
+        return await self._run("get_object_range", self._read, key, start, end)
+
+    async def get_object_stream(self, key: str, range_header: str | None = None, chunk_size: int = STREAM_CHUNK_SIZE):
+        head = await self.head_object(key)
+        size = head["ContentLength"]
+        byte_range = parse_byte_range(range_header, size)
+        start, end = byte_range or (0, size - 1)
+        response = {**head, "ContentLength": end - start + 1 if size else 0}
+        if byte_range:
+            response["ContentRange"] = f"bytes {start}-{end}/{size}"
+
+        async def chunks():
+            position = start
+            while position <= end:
+                chunk = await self._run("get_object", self._read, key, position, min(position + chunk_size, end + 1) - 1)
+                if not chunk:
+                    break
+                position += len(chunk)
+                yield chunk
+
+        return response, chunks()
+
+    async def list_objects_page(
+        self,
+        prefix: str,
+        continuation_token: str | None = None,
+        max_keys: int = 1000,
+        start_after: str | None = None,
+    ) -> dict:
+        return await self._run("list_objects_v2", self._list, prefix, continuation_token, max_keys, start_after)
+
+    async def delete_objects(self, keys: list[str]) -> dict:
+        return await self._run("delete_objects", self._delete_many, keys)
+
+    async def put_object(self, key: str, body: bytes, content_type: str, cache_control: str | None = None) -> dict:
+        return await self._run("put_object", self._put, key, body, content_type, cache_control)
+
+
+    # ---------- streamed writes (the /storage router) ----------
+    async def write_stream(
+        self,
+        key: str,
+        chunks,
+        content_type: str | None = None,
+        checksum_sha256: str | None = None,
+        upload_id: str | None = None,
+        part_number: int | None = None,
+    ) -> str:
+        """
+        Writes an async iterable of chunks to a temp file, verifies the signed checksum and
+        renames it into place (the object, or a part of a multipart upload). returns the md5 ETag.
+        """
+        if upload_id:
+            directory = self._upload_dir(upload_id)
+            if not (directory / "upload.json").exists():
+                raise NoSuchUploadError(upload_id)
+        else:
+            directory = self._object_path(key).parent
+
+        tmp = await self._run("open", self._temp_file, directory)
+        md5, sha256 = hashlib.md5(), hashlib.sha256()
+        try:
+            async for chunk in chunks:
+                md5.update(chunk)
+                sha256.update(chunk)
+                await self._run("write", tmp.write, chunk)
+            await self._run("close", tmp.close)
+
+            if checksum_sha256 and base64.b64encode(sha256.digest()).decode() != checksum_sha256:
+                raise StorageError("BadDigest: the sha256 of the body does not match the signed checksum")
+
+            etag = md5.hexdigest()
+            if upload_id:
+                await self._run("upload_part", os.replace, tmp.name, str(directory / f"{part_number:05d}"))
+            else:
+                meta = {"ContentType": content_type or "binary/octet-stream", "CacheControl": None, "ETag": etag}
+                await self._run("put_object", self._commit, key, tmp.name, meta)
+            return etag
+        except BaseException:
+            tmp.close()
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+
+    def open_object(self, key: str) -> tuple[Path, dict]:
+        """path and HeadObject-style metadata of a stored object, for FileResponse"""
+        return self._object_path(key), self._head(key)
+
+
+    # ---------- multipart uploads ----------
+    def _create_upload(self, key: str, content_type: str) -> str:
+        self._object_path(key)
+        upload_id = uuid.uuid4().hex
+        directory = self._upload_dir(upload_id)
+        directory.mkdir(parents=True)
+        (directory / "upload.json").write_text(json.dumps({"Key": key, "ContentType": content_type}))
+        return upload_id
+
+    def _upload_info(self, key: str, upload_id: str) -> tuple[Path, dict]:
+        directory = self._upload_dir(upload_id)
+        try:
+            info = json.loads((directory / "upload.json").read_text())
+        except FileNotFoundError:
+            raise NoSuchUploadError(upload_id)
+        if info["Key"] != key:
+            raise NoSuchUploadError(upload_id)
+        return directory, info
+
+    def _list_parts(self, key: str, upload_id: str) -> list[dict]:
+        directory, _ = self._upload_info(key, upload_id)
+        parts = []
+        for path in sorted(directory.iterdir()):
+            if not path.name.isdigit():
+                continue
+            md5 = hashlib.md5()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+                    md5.update(chunk)
+            parts.append({"PartNumber": int(path.name), "ETag": f'"{md5.hexdigest()}"', "Size": path.stat().st_size})
+        return parts
+
+    def _complete_upload(self, key: str, upload_id: str, parts: list[dict]) -> dict:
+        directory, info = self._upload_info(key, upload_id)
+        uploaded = {part["PartNumber"]: part for part in self._list_parts(key, upload_id)}
+        numbers = [part["PartNumber"] for part in parts]
+        if numbers != sorted(set(numbers)):
+            raise StorageError("InvalidPartOrder")
+        for part in parts:
+            found = uploaded.get(part["PartNumber"])
+            if found is None or found["ETag"].strip('"') != part["ETag"].strip('"'):
+                raise StorageError(f"InvalidPart: {part['PartNumber']}")
+
+        # S3 style multipart ETag: md5 over the part digests, suffixed with the part count
+        digests = b"".join(bytes.fromhex(uploaded[n]["ETag"].strip('"')) for n in numbers)
+        etag = f"{hashlib.md5(digests).hexdigest()}-{len(numbers)}"
+        path = self._object_path(key)
+        with self._temp_file(path.parent) as tmp:
+            for number in numbers:
+                with open(directory / f"{number:05d}", "rb") as part_file:
+                    shutil.copyfileobj(part_file, tmp, COPY_CHUNK_SIZE)
+        self._commit(key, tmp.name, {"ContentType": info["ContentType"], "CacheControl": None, "ETag": etag})
+        shutil.rmtree(directory, ignore_errors=True)
+        return {"Key": key, "ETag": f'"{etag}"'}
+
+    def _abort_upload(self, key: str, upload_id: str) -> dict:
+        directory, _ = self._upload_info(key, upload_id)
+        shutil.rmtree(directory, ignore_errors=True)
+        return {}
+
+    async def create_multipart_upload(self, key: str, content_type: str) -> str:
+        return await self._run("create_multipart_upload", self._create_upload, key, content_type)
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> dict:
+        return await self._run("complete_multipart_upload", self._complete_upload, key, upload_id, parts)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> dict:
+        return await self._run("abort_multipart_upload", self._abort_upload, key, upload_id)
+
+    async def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        return await self._run("list_parts", self._list_parts, key, upload_id)
+
+
+    # ---------- presigning (HMAC, verified by the /storage router) ----------
+    def _signature(self, key: str, params: dict) -> str:
+        canonical = key + "?" + urlencode(sorted((k, v) for k, v in params.items() if k != "X-Signature"))
+        digest = hmac.new(self._secret, canonical.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+    def _sign(self, key: str, op: str, expires_in: int, **extra) -> str:
+        params = {"op": op, "X-Expires": str(int(time.time()) + expires_in)}
+        params.update({k: str(v) for k, v in extra.items() if v is not None})
+        params["X-Signature"] = self._signature(key, params)
+        return f"{self.public_url}/storage/local/{quote(key)}?{urlencode(params)}"
+
+    def verify(self, key: str, params: dict, ops: tuple[str, ...]) -> dict:
+        """checks the signature and expiry of a presigned url; returns its signed params"""
+        signature = params.get("X-Signature", "")
+        if not hmac.compare_digest(signature, self._signature(key, params)):
+            raise StorageError("SignatureDoesNotMatch")
+        if params.get("op") not in ops:
+            raise StorageError("SignatureDoesNotMatch")
+        if int(params.get("X-Expires", "0")) < time.time():
+            raise StorageError("Request has expired")
+        return params
+
+    def presign_put(self, key: str, content_type: str, expires_in: int = 60*5, checksum_sha256: str | None = None) -> str:
+        return self._sign(key, "put", expires_in, ct=content_type, cs=checksum_sha256)
+
+    def presign_upload_part(self, key: str, upload_id: str, part_number: int, expires_in: int = 60*60) -> str:
+        return self._sign(key, "part", expires_in, uploadId=upload_id, partNumber=part_number)
+
+    def presign_get(self, key: str, expires_in: int = 60*30, cache_control: str | None = None) -> str:
+        return self._sign(key, "get", expires_in, cc=cache_control)
+
+
+    # ---------- blocking, for worker processes ----------
+    def download_fileobj(self, key: str, fileobj) -> None:
+        try:
+            with open(self._object_path(key), "rb") as f:
+                shutil.copyfileobj(f, fileobj, COPY_CHUNK_SIZE)
+        except FileNotFoundError:
+            raise NoSuchKeyError(key)
+
+    def put_object_sync(self, key: str, body: bytes, content_type: str, cache_control: str | None = None) -> dict:
+        return self._put(key, body, content_type, cache_control)
+
+
+    # ---------- counters ----------
+    def stats(self) -> dict:
+        with self._lock:
+            ops = {
+                op: {**s, "avg_ms": round(s["total_ms"] / s["calls"], 2) if s["calls"] else 0.0}
+                for op, s in self._ops.items()
+            }
+        return {"backend": self.name, "root": str(self.root), "max_workers": self.max_workers, "operations": ops}
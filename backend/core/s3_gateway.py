@@ -0,0 +1,269 @@
+# backend/core/s3_gateway.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.core.aws import s3, S3_BUCKET, S3_MAX_WORKERS
+from botocore.exceptions import ClientError
+
+from backend.core.storage_backend import StorageBackend, NoSuchKeyError, NoSuchUploadError, InvalidRangeError, STREAM_CHUNK_SIZE
+
+
+def _upload_error(e: ClientError, upload_id: str) -> Exception:
+    # a completed or aborted upload: the same error type for every backend
+    if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+        return NoSuchUploadError(upload_id)
+    return e
+
+
+class S3Gateway(StorageBackend):
+    """
+    S3 storage backend: async wrapper around the (blocking) boto3 S3 client.
+
+    Every network call runs on a bounded thread pool, so a slow S3 request never
+    blocks the uvicorn event loop. Presigning is a local HMAC and runs inline.
+    Counters (in flight, queued, latency per operation) are available via stats().
+    """
+
+    name = "s3"
+
+    def __init__(self, client=s3, bucket: str = S3_BUCKET, max_workers: int = S3_MAX_WORKERS):
+        self.client = client
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-gateway")
+
+        # updated from the worker threads, so guarded by a lock
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._ops: dict[str, dict] = {}
+
+
+    # ---------- internals ----------
+    def _record(self, op: str, wait_s: float, run_s: float, failed: bool):
+        stats = self._ops.setdefault(op, {
+            "calls": 0, "errors": 0,
+            "total_ms": 0.0, "max_ms": 0.0, "queue_wait_ms": 0.0,
+        })
+        stats["calls"] += 1
+        stats["errors"] += int(failed)
+        stats["total_ms"] += run_s * 1000
+        stats["max_ms"] = max(stats["max_ms"], run_s * 1000)
+        stats["queue_wait_ms"] += wait_s * 1000
+
+    async def _call(self, op: str, **params):
+        return await self._call_fn(op, lambda client, **kw: getattr(client, op)(**kw), **params)
+
+    async def _call_fn(self, op: str, fn, **params):
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._in_flight += 1
+            failed = False
+            try:
+                return fn(self.client, Bucket=self.bucket, **params)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._record(op, started - submitted, time.perf_counter() - started, failed)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, run)
+
+
+    # ---------- object operations ----------
+    async def head_object(self, key: str) -> dict:
+        return await self._call("head_object", Key=key)
+
+    async def delete_object(self, key: str) -> dict:
+        return await self._call("delete_object", Key=key)
+
+    async def get_object_bytes(self, key: str) -> bytes:
+        # read the body inside the worker thread too, that is where the actual transfer happens
+        def read(client, Bucket, Key):
+            return client.get_object(Bucket=Bucket, Key=Key)["Body"].read()
+        return await self._call_fn("get_object", read, Key=key)
+
+    async def get_object_range(self, key: str, start: int, end: int) -> bytes:
+        """bytes start..end (inclusive) of an object, S3 clamps end to the object size"""
+        def read(client, Bucket, Key, Range):
+            return client.get_object(Bucket=Bucket, Key=Key, Range=Range)["Body"].read()
+        return await self._call_fn("get_object_range", read, Key=key, Range=f"bytes={start}-{end}")
+
+    async def get_object_stream(self, key: str, range_header: str | None = None, chunk_size: int = STREAM_CHUNK_SIZE):
+        """The Range header goes to S3 unchanged; the body is read chunk by chunk on the gateway pool."""
+        params = {"Key": key}
+        if range_header:
+            params["Range"] = range_header
+        try:
+            response = await self._call("get_object", **params)
+        except ClientError as e:
+            error = e.response.get("Error", {})
+            if error.get("Code") == "InvalidRange":
+                raise InvalidRangeError(int(error.get("ActualObjectSize", 0)))
+            if error.get("Code") in ("NoSuchKey", "404"):
+                raise NoSuchKeyError(key)
+            raise
+
+        body = response.pop("Body")
+        loop = asyncio.get_running_loop()
+
+        async def chunks():
+            try:
+                while True:
+                    chunk = await loop.run_in_executor(self._executor, body.read, chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                # also on a client disconnect, returns the connection to the pool
+                body.close()
+
+        return response, chunks()
+
+    async def list_objects_page(
+        self,
+        prefix: str,
+        continuation_token: str | None = None,
+        max_keys: int = 1000,
+        start_after: str | None = None,
+    ) -> dict:
+        params = {"Prefix": prefix, "MaxKeys": max_keys}
+        if continuation_token:
+            params["ContinuationToken"] = continuation_token
+        if start_after:
+            params["StartAfter"] = start_after
+        return await self._call("list_objects_v2", **params)
+
+    async def delete_objects(self, keys: list[str]) -> dict:
+        # S3 accepts at most 1000 keys per request
+        return await self._call(
+            "delete_objects",
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+
+    async def put_object(self, key: str, body: bytes, content_type: str, cache_control: str | None = None) -> dict:
+        params = {"Key": key, "Body": body, "ContentType": content_type}
+        if cache_control:
+            params["CacheControl"] = cache_control
+        return await self._call("put_object", **params)
+
+
+    # ---------- multipart uploads ----------
+    async def create_multipart_upload(self, key: str, content_type: str) -> str:
+        response = await self._call("create_multipart_upload", Key=key, ContentType=content_type)
+        return response["UploadId"]
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> dict:
+        """parts: [{PartNumber, ETag}] in ascending part number order"""
+        try:
+            return await self._call(
+                "complete_multipart_upload",
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except ClientError as e:
+            raise _upload_error(e, upload_id)
+
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> dict:
+        return await self._call("abort_multipart_upload", Key=key, UploadId=upload_id)
+
+    async def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        # every part S3 has received so far, across all pages
+        def read(client, Bucket, Key, UploadId):
+            parts = []
+            marker = 0
+            while True:
+                page = client.list_parts(Bucket=Bucket, Key=Key, UploadId=UploadId, PartNumberMarker=marker)
+                parts.extend(page.get("Parts", []))
+                if not page.get("IsTruncated"):
+                    return parts
+                marker = page["NextPartNumberMarker"]
+        try:
+            return await self._call_fn("list_parts", read, Key=key, UploadId=upload_id)
+        except ClientError as e:
+            raise _upload_error(e, upload_id)
+
+
+    # ---------- presigning (local, no request to S3) ----------
+    def presign_put(self, key: str, content_type: str, expires_in: int = 60*5, checksum_sha256: str | None = None) -> str:
+        params = {"Key": key, "ContentType": content_type}
+        if checksum_sha256:
+            # signed as x-amz-checksum-sha256 header, S3 rejects a body with a different hash
+            params["ChecksumSHA256"] = checksum_sha256
+        return self._presign("put_object", params, expires_in)
+
+    def presign_upload_part(self, key: str, upload_id: str, part_number: int, expires_in: int = 60*60) -> str:
+        return self._presign(
+            "upload_part",
+            {"Key": key, "UploadId": upload_id, "PartNumber": part_number},
+            expires_in
+        )
+
+    def presign_get(self, key: str, expires_in: int = 60*30, cache_control: str | None = None) -> str:
+        params = {"Key": key}
+        if cache_control:
+            # S3 echoes this as the Cache-Control header of the GET response
+            params["ResponseCacheControl"] = cache_control
+        return self._presign("get_object", params, expires_in)
+
+    def _presign(self, client_method: str, params: dict, expires_in: int) -> str:
+        started = time.perf_counter()
+        failed = False
+        try:
+            return self.client.generate_presigned_url(
+                ClientMethod=client_method,
+                Params={"Bucket": self.bucket, **params},
+                ExpiresIn=expires_in
+            )
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._record(f"presign_{client_method}", 0.0, time.perf_counter() - started, failed)
+
+
+    # ---------- blocking, for worker processes (give them their own client) ----------
+    def download_fileobj(self, key: str, fileobj) -> None:
+        self.client.download_fileobj(self.bucket, key, fileobj)
+
+    def put_object_sync(self, key: str, body: bytes, content_type: str, cache_control: str | None = None) -> dict:
+        params = {"Bucket": self.bucket, "Key": key, "Body": body, "ContentType": content_type}
+        if cache_control:
+            params["CacheControl"] = cache_control
+        return self.client.put_object(**params)
+
+
+    # ---------- counters ----------
+    def stats(self) -> dict:
+        with self._lock:
+            ops = {}
+            for op, s in self._ops.items():
+                calls = s["calls"] or 1
+                ops[op] = {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "avg_ms": round(s["total_ms"] / calls, 2),
+                    "max_ms": round(s["max_ms"], 2),
+                    "avg_queue_wait_ms": round(s["queue_wait_ms"] / calls, 2),
+                }
+            return {
+                "backend": self.name,
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "operations": ops,
+            }
+
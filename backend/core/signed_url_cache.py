@@ -0,0 +1,75 @@
+# backend/core/signed_url_cache.py
+import os
+import time
+from collections import OrderedDict
+from typing import Callable
+
+SIGNED_URL_TTL_SECONDS = int(os.getenv("SIGNED_URL_TTL_SECONDS", str(60*30)))
+SIGNED_URL_SAFETY_MARGIN_SECONDS = int(os.getenv("SIGNED_URL_SAFETY_MARGIN_SECONDS", str(60*5)))
+SIGNED_URL_CACHE_SIZE = int(os.getenv("SIGNED_URL_CACHE_SIZE", "20000"))
+
+
+class SignedUrlCache:
+    """
+    In-process LRU of presigned GET urls, keyed by s3Key.
+
+    Every signature is unique, so a freshly signed url defeats the browser cache.
+    Handing back the same url until shortly before it expires lets the browser
+    reuse the image bytes for the whole session.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SIGNED_URL_CACHE_SIZE,
+        ttl_seconds: int = SIGNED_URL_TTL_SECONDS,
+        safety_margin_seconds: int = SIGNED_URL_SAFETY_MARGIN_SECONDS,
+    ):
+        if safety_margin_seconds >= ttl_seconds:
+            raise ValueError("safety margin must be smaller than the url ttl")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.safety_margin_seconds = safety_margin_seconds
+
+        # s3Key -> (url, expires_at)
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_sign(self, key: str, sign: Callable[[int], str]) -> str:
+        """sign(expires_in) is only called when there is no url left with enough lifetime."""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry and entry[1] - self.safety_margin_seconds > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        url = sign(self.ttl_seconds)
+        # measured from before signing, so we never overestimate the lifetime
+        self._entries[key] = (url, now + self.ttl_seconds)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return url
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global singleton, shared by every request in this process
+signed_url_cache = SignedUrlCache()
@@ -0,0 +1,26 @@
+# backend/core/storage.py
+import os
+
+from backend.core.storage_backend import StorageBackend
+
+# "s3" (default) or "local" (filesystem, see local_storage.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3").lower()
+
+
+def create_storage(for_worker_process: bool = False) -> StorageBackend:
+    """
+    Builds the configured backend. Worker processes must call this themselves
+    (for_worker_process=True), an S3 client and its connection pool must not be shared across a fork.
+    """
+    if STORAGE_BACKEND == "local":
+        from backend.core.local_storage import LocalStorage
+        return LocalStorage()
+    if STORAGE_BACKEND == "s3":
+        from backend.core.aws import new_s3_client
+        from backend.core.s3_gateway import S3Gateway
+        return S3Gateway(client=new_s3_client()) if for_worker_process else S3Gateway()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+# Global singleton, shares one thread pool (and for S3 one connection pool) across all services
+storage = create_storage()
@@ -0,0 +1,129 @@
+# backend/core/storage_backend.py
+import re
+from abc import ABC, abstractmethod
+
+# chunk size of streamed reads (the image content proxy)
+STREAM_CHUNK_SIZE = 256 * 1024
+
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class StorageError(Exception):
+    """An object-store request was rejected (bad part, bad signature, missing upload, ...)."""
+
+class NoSuchKeyError(StorageError):
+    pass
+
+class NoSuchUploadError(StorageError):
+    """The multipart upload doesn't exist (any more): aborted, or already completed."""
+
+class InvalidRangeError(StorageError):
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for an object of {size} bytes")
+        self.size = size
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    (start, end inclusive) of a single-range Range header, like S3 does it:
+    a malformed or multi-range header is ignored (None, whole object),
+    a range that starts past the end raises InvalidRangeError.
+    """
+    match = BYTE_RANGE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # suffix range: the last n bytes
+        if int(last) == 0:
+            raise InvalidRangeError(size)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise InvalidRangeError(size)
+    return start, end
+
+
+class StorageBackend(ABC):
+    """
+    What the services need from an object store. Return values follow the S3 API shapes
+    (HeadObject, ListObjectsV2, DeleteObjects, ListParts), so callers don't care which backend runs.
+
+    Async methods do the I/O off the event loop. Presigning is local and synchronous.
+    download_fileobj / put_object_sync are blocking and meant for worker processes.
+    """
+
+    name: str
+
+    # ---------- objects ----------
+    @abstractmethod
+    async def head_object(self, key: str) -> dict: ...
+
+    @abstractmethod
+    async def get_object_bytes(self, key: str) -> bytes: ...
+
+    @abstractmethod
+    async def get_object_range(self, key: str, start: int, end: int) -> bytes: ...
+
+    @abstractmethod
+    async def get_object_stream(self, key: str, range_header: str | None = None, chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        (GetObject-style response dict without Body, async iterator of chunks).
+        range_header is passed through as is; the dict has ContentRange when it was honoured.
+        raises NoSuchKeyError / InvalidRangeError.
+        """
+
+    @abstractmethod
+    async def put_object(self, key: str, body: bytes, content_type: str, cache_control: str | None = None) -> dict: ...
+
+    @abstractmethod
+    async def delete_object(self, key: str) -> dict: ...
+
+    @abstractmethod
+    async def delete_objects(self, keys: list[str]) -> dict: ...
+
+    @abstractmethod
+    async def list_objects_page(
+        self,
+        prefix: str,
+        continuation_token: str | None = None,
+        max_keys: int = 1000,
+        start_after: str | None = None,
+    ) -> dict: ...
+
+    # ---------- multipart uploads ----------
+    @abstractmethod
+    async def create_multipart_upload(self, key: str, content_type: str) -> str: ...
+
+    @abstractmethod
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]) -> dict: ...
+
+    @abstractmethod
+    async def abort_multipart_upload(self, key: str, upload_id: str) -> dict: ...
+
+    @abstractmethod
+    async def list_parts(self, key: str, upload_id: str) -> list[dict]: ...
+
+    # ---------- presigning ----------
+    @abstractmethod
+    def presign_put(self, key: str, content_type: str, expires_in: int = 60*5, checksum_sha256: str | None = None) -> str: ...
+
+    @abstractmethod
+    def presign_upload_part(self, key: str, upload_id: str, part_number: int, expires_in: int = 60*60) -> str: ...
+
+    @abstractmethod
+    def presign_get(self, key: str, expires_in: int = 60*30, cache_control: str | None = None) -> str: ...
+
+    # ---------- blocking, for worker processes ----------
+    @abstractmethod
+    def download_fileobj(self, key: str, fileobj) -> None: ...
+
+    @abstractmethod
+    def put_object_sync(self, key: str, body: bytes, content_type: str, cache_control: str | None = None) -> dict: ...
+
+    # ---------- counters ----------
+    @abstractmethod
+    def stats(self) -> dict: ...
@@ -1,4 +1,5 @@
 from typing import Union, List
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from backend.src.services.user_service import UserService
 from backend.src.models.user import UserDto, User
@@ -11,10 +12,27 @@ from backend.src.router.remark_router import router as remark_router
 from fastapi.middleware.cors import CORSMiddleware
 from backend.src.router.guest_router import router as guest_router
 from backend.src.router.log_router import router as log_router
+from backend.src.router.storage_router import router as storage_router
+from backend.core.storage import storage
+from backend.src.router.admin_router import router as admin_router
+from backend.core.indexes import index_registry
+from backend.core.json_response import FastJSONResponse
+from backend.src.services.dataset_stats_service import dataset_stats_service
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the repositories (imported by the routers above) have declared their indexes by now;
+    # create_index is a no-op when the index already exists
+    await index_registry.apply()
+    # periodic recount of the dataset image counters (DATASET_RECOUNT_INTERVAL_HOURS, 0 = off)
+    dataset_stats_service.start_schedule()
+    yield
+    await dataset_stats_service.stop_schedule()
 
-app = FastAPI()
+
+# orjson-backed JSON for every route (ObjectId / datetime / date handled by the encoder)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 
 
@@ -26,6 +44,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # multipart uploads read the ETag of every uploaded part, paginated lists return X-Next-Cursor
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 app.include_router(guest_router, prefix="/guest",tags=["guest"])
@@ -44,6 +64,12 @@ app.include_router(remark_router, prefix="/remark", tags=["remark"])
 
 app.include_router(log_router, prefix="/log", tags=["log"])
 
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
+
+# presigned urls of the local storage backend point here
+if storage.name == "local":
+    app.include_router(storage_router, prefix="/storage", tags=["storage"])
+
 @app.get("/")
 def read_root():
     return {"Hello": "Welcome tot Python FastAPI World"}
@@ -11,7 +11,9 @@ class PyObjectId(ObjectId):
         # Vertel Pydantic dat dit eigenlijk een string is
         return core_schema.json_or_python_schema(
             json_schema=core_schema.str_schema(),
-            python_schema=core_schema.no_info_plain_validator_function(cls.validate)
+            python_schema=core_schema.no_info_plain_validator_function(cls.validate),
+            # JSON output is the hex string; model_dump() (python mode) keeps the ObjectId for Mongo
+            serialization=core_schema.plain_serializer_function_ser_schema(str, when_used="json"),
         )
 
     @classmethod
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+
+from backend.src.helpers.helpers import ValidationError
+
+
+# Opaque keyset cursor: urlsafe base64 of the last row's [sort value, _id]
+def encode_cursor(sort_value, last_id) -> str:
+    if isinstance(sort_value, ObjectId):
+        sort_value = str(sort_value)
+    raw = json.dumps([sort_value, str(last_id)], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+# Rows after (value, last_id) in (field, _id) order. Mongo sorts a missing / null field before every value
+# (after them, descending), so a row without the field pages too: its cursor carries None.
+def keyset_after(field: str, value, last_id: ObjectId, descending: bool = False) -> dict:
+    op = "$lt" if descending else "$gt"
+    if value is None:
+        clauses = [{field: None, "_id": {op: last_id}}]
+        if not descending:
+            clauses.append({field: {"$ne": None}})
+    else:
+        clauses = [{field: {op: value}}, {field: value, "_id": {op: last_id}}]
+        if descending:
+            clauses.append({field: None})
+    return {"$or": clauses}
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return sort_value, ObjectId(last_id)
+    except Exception:
+        raise ValidationError("Invalid cursor")
+
+
+# For a datetime sort key: the cursor carries it as its string, the query needs the datetime back
+def decode_datetime_cursor(cursor: str) -> tuple:
+    sort_value, last_id = decode_cursor(cursor)
+    try:
+        return (datetime.fromisoformat(sort_value) if sort_value is not None else None), last_id
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid cursor")
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+
+from backend.src.helpers.helpers import ValidationError
+
+
+# ?fields=id,fileName,thumbKey  ->  Mongo projection of only those DTO fields
+def parse_fields(fields: str | None, dto: type[BaseModel]) -> tuple[str, ...] | None:
+    """None (all fields) when not given; ValidationError for a field the DTO doesn't have."""
+    if not fields:
+        return None
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in dto.model_fields]
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+    return requested or None
+
+
+def to_projection(fields: tuple[str, ...], *extra: str) -> dict:
+    # _id is always returned by Mongo; extra fields are needed internally (e.g. the sort key of a cursor)
+    return {("_id" if f == "id" else f): 1 for f in (*fields, *extra)}
@@ -0,0 +1,50 @@
+from datetime import date, datetime
+from functools import lru_cache
+from bson import ObjectId
+from pydantic import BaseModel
+from backend.core.json_response import dumps
+
+
+# Trusted read path for large lists: raw Mongo documents straight to JSON bytes.
+# The documents come from our own collections (written through the models), so they are not
+# validated again; only the DTO's field list and defaults are applied.
+
+def _is_date_field(annotation) -> bool:
+    # date (not datetime) fields are stored as datetimes, the DTO returns the date part
+    return annotation is date or date in getattr(annotation, "__args__", ())
+
+
+@lru_cache(maxsize=64)
+def _layout(dto: type[BaseModel], fields: tuple[str, ...]) -> tuple:
+    layout = []
+    for name in fields:
+        field = dto.model_fields[name]
+        if field.default_factory is not None:
+            default, factory = None, field.default_factory
+        else:
+            default, factory = (None if field.is_required() else field.default), None
+        source = "_id" if name == "id" else name
+        layout.append((name, source, default, factory, _is_date_field(field.annotation)))
+    return tuple(layout)
+
+
+def to_rows(docs: list[dict], dto: type[BaseModel], fields: tuple[str, ...] | None = None) -> list[dict]:
+    """Documents reshaped to the DTO (or the selected fields of it): _id -> id, missing fields -> defaults."""
+    layout = _layout(dto, fields or tuple(dto.model_fields))
+    rows = []
+    for doc in docs:
+        row = {}
+        for name, source, default, factory, is_date in layout:
+            value = doc.get(source, default if factory is None else factory())
+            if isinstance(value, ObjectId):
+                value = str(value)
+            elif is_date and isinstance(value, datetime):
+                value = value.date()
+            row[name] = value
+        rows.append(row)
+    return rows
+
+
+def encode_docs(docs: list[dict], dto: type[BaseModel], fields: tuple[str, ...] | None = None) -> bytes:
+    # nested values (e.g. tiles, assignedTo) may still hold ObjectIds / datetimes, the encoder maps them
+    return dumps(to_rows(docs, dto, fields))
@@ -57,10 +57,24 @@ class ImageAnnotations(BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
         arbitrary_types_allowed=True,
-        json_encoders={PyObjectId: str}
     )
 
 
+# ---- Partial update (PATCH) ----
+class AnnotationOperation(BaseModel):
+    op: Literal["add", "replace", "remove"]
+    id: Optional[str] = None                    # annotation to replace / remove
+    annotation: Optional[Annotation] = None     # the new shape for add / replace
+
+
+class AnnotationPatch(BaseModel):
+    operations: List[AnnotationOperation]
+
+
+class AnnotationPatchResult(BaseModel):
+    added: List[str]  # ids of the added annotations, in the order of the add operations (generated when not sent)
+
+
 # ---- Annotation model Dto ----
 class AnnotationDto(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4())) 
@@ -87,7 +101,6 @@ class ImageAnnotationsDto(BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
         arbitrary_types_allowed=True,
-        json_encoders={PyObjectId: str}
     )
 
 
@@ -22,7 +22,6 @@ class Dataset(BaseModel):
     class Config:
         populate_by_name = True
         arbitrary_types_allowed = True
-        json_encoders = {PyObjectId: str}
 
 
 
@@ -3,6 +3,18 @@ from typing import Optional, Literal
 from backend.src.helpers.helpers import PyObjectId
 from datetime import datetime
 
+# Deep-zoom (DZI) tile pyramid of a large image
+class TilePyramid(BaseModel):
+    status: Literal["pending", "ready", "failed"] = "pending"
+    rootKey: Optional[str] = None  # "{rootKey}.dzi" + "{rootKey}_files/{level}/{col}_{row}.{format}"
+    tileSize: Optional[int] = None
+    overlap: Optional[int] = None
+    format: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    maxLevel: Optional[int] = None
+
+
 class ImageMetadata(BaseModel):
     id: Optional[PyObjectId] = Field(default=None, alias="_id")
     datasetId: Optional[str] = None
@@ -23,6 +35,16 @@ class ImageMetadata(BaseModel):
     status: Literal["pending", "ready", "failed"] = "pending"
     # why? we'll create metadata rows before upload(status = "pending"), then mark them "ready" on /complete after verifying the object in S3
 
+    # multipart uploads (large files), cleared again once the upload is complete
+    uploadId: Optional[str] = None
+    partSize: Optional[int] = None
+    uploadParts: Optional[dict[str, str]] = None  # part number -> ETag of the parts the client finished
+
+    # renditions, written after the upload is ready
+    thumbKey: Optional[str] = None    # small WebP for the dataset grid
+    previewKey: Optional[str] = None  # medium WebP for the viewer
+    tiles: Optional[TilePyramid] = None  # only for images that are tiled
+
 
     
     uploadedAt: Optional[datetime] = None
@@ -31,7 +53,6 @@ class ImageMetadata(BaseModel):
     model_config = {
         "populate_by_name": True,
         "arbitrary_types_allowed": True,
-        "json_encoders": {PyObjectId: str},
         "extra": "ignore",   # ignore unexpected keys like stray "id"
     }
 
@@ -55,6 +76,9 @@ class ImageMetadataDto(BaseModel):
     etag: Optional[str] = None
     checksum: Optional[str] = None
     status: Optional[str] = None
+    thumbKey: Optional[str] = None
+    previewKey: Optional[str] = None
+    tiles: Optional[TilePyramid] = None
 
     uploadedAt: Optional[datetime] = None
     is_active: bool
@@ -76,6 +100,8 @@ class ImageMetadataUpdate(BaseModel):
     etag: Optional[str] = None
     checksum: Optional[str] = None
     status: Optional[str] = None
+    thumbKey: Optional[str] = None
+    previewKey: Optional[str] = None
 
     uploadedAt: Optional[datetime] = None
     is_active: Optional[bool] = None
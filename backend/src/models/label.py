@@ -10,8 +10,7 @@ class Label(BaseModel):
 
     model_config = {
         "populate_by_name": True,
-        "arbitrary_types_allowed": True,
-        "json_encoders": {PyObjectId: str}
+        "arbitrary_types_allowed": True
     }
 
 class LabelDto(BaseModel):
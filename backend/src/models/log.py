@@ -15,7 +15,6 @@ class Log(BaseModel):
     class Config:
         populate_by_name = True
         arbitrary_types_allowed = True
-        json_encoders = {PyObjectId: str}
 
 
 class LogDto(BaseModel):
@@ -17,11 +17,6 @@ class Remark(BaseModel):
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
 
-    class Config:
-        json_encoders = {
-            PyObjectId: str
-        }
-
 class RemarkDTO(BaseModel):
     id: Optional[str] = None
     imageId: Optional[str] = None
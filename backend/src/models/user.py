@@ -35,7 +35,6 @@ class User(BaseModel):
     class Config:
         populate_by_name = True
         arbitrary_types_allowed = True
-        json_encoders = {PyObjectId: str}
 
 class UserUpdate(BaseModel):
     id : Optional[str] = None
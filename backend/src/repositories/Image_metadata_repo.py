@@ -1,8 +1,35 @@
 
+import re
+from datetime import datetime, timezone
 from backend.src.helpers.helpers import PyObjectId
+from backend.src.helpers.pagination import keyset_after
 from backend.core.db import db
+from backend.core.indexes import index_registry
+from pymongo.errors import BulkWriteError
+from pymongo import UpdateOne
+from bson import ObjectId
 from backend.src.models.imageMetadata import ImageMetadata
 
+SIGNING_PROJECTION = {"s3Key": 1, "contentType": 1, "thumbKey": 1, "previewKey": 1, "etag": 1}
+# what a purge needs to remove the objects of a row
+PURGE_PROJECTION = {"s3Key": 1, "thumbKey": 1, "previewKey": 1, "tiles.rootKey": 1, "uploadId": 1}
+# what the reconciliation sweeper compares against the S3 listing
+RECONCILE_PROJECTION = {"s3Key": 1, "status": 1, "uploadedAt": 1, "uploadId": 1}
+# what a deduplicated row can take over from another row with the same object
+SHARED_OBJECT_PROJECTION = {"s3Key": 1, "width": 1, "height": 1, "thumbKey": 1, "previewKey": 1, "tiles": 1, "etag": 1}
+# sort keys of the image listing (each is backed by a datasetId, key, _id index)
+IMAGE_SORT_FIELDS = ("_id", "fileName", "uploadedAt")
+
+# datasetId lookups use the prefix of the listing indexes
+index_registry.declare("imageMetadata", [("datasetId", 1), ("_id", 1)])
+# fileName sort, and the fileName prefix filter (anchored regex)
+index_registry.declare("imageMetadata", [("datasetId", 1), ("fileName", 1), ("_id", 1)])
+index_registry.declare("imageMetadata", [("datasetId", 1), ("uploadedAt", 1), ("_id", 1)])
+# the annotator views (active, completed / not yet) and the status filter, in _id order
+index_registry.declare("imageMetadata", [("datasetId", 1), ("is_active", 1), ("is_completed", 1), ("_id", 1)])
+index_registry.declare("imageMetadata", [("datasetId", 1), ("status", 1), ("_id", 1)])
+index_registry.declare("imageMetadata", "s3Key")
+
 
 class ImageMetadataRepo:
 
@@ -23,6 +50,24 @@ class ImageMetadataRepo:
         return ImageMetadata(**created_doc)
 
     
+    # Create many image metadata rows in one unordered insert_many
+    # docs must already carry their "_id"; returns {index: error message} for the rows that failed
+    async def create_many_image_metadata(self, docs: list[dict]) -> dict[int, str]:
+        if not docs:
+            return {}
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            return {err["index"]: err.get("errmsg", "insert failed") for err in e.details.get("writeErrors", [])}
+        return {}
+
+    # Delete many image metadata rows by id
+    async def delete_many_image_metadata(self, image_ids: list[str]) -> int:
+        if not image_ids:
+            return 0
+        result = await self.collection.delete_many({"_id": {"$in": [PyObjectId(i) for i in image_ids]}})
+        return result.deleted_count
+
     # Get image metadata by id
     async def get_image_metadata_by_id(self, image_metadata_id: str) -> ImageMetadata:
         image_metadata = await self.collection.find_one({"_id": PyObjectId(image_metadata_id)})
@@ -33,6 +78,231 @@ class ImageMetadataRepo:
             **image_metadata
         )
     
+    # Get many image metadata rows with a single $in query (invalid ids are skipped)
+    async def get_images_by_ids(self, image_ids: list[str]) -> list[ImageMetadata]:
+        object_ids = [ObjectId(i) for i in image_ids if ObjectId.is_valid(i)]
+        if not object_ids:
+            return []
+        docs = await self.collection.find({"_id": {"$in": object_ids}}).to_list(length=None)
+        return [ImageMetadata(**doc) for doc in docs]
+
+    # Only the fields needed to sign a GET url, for many ids at once
+    async def get_signing_info_by_ids(self, image_ids: list[str]) -> list[dict]:
+        object_ids = [ObjectId(i) for i in image_ids if ObjectId.is_valid(i)]
+        if not object_ids:
+            return []
+        cursor = self.collection.find(
+            {"_id": {"$in": object_ids}, "status": "ready"},
+            SIGNING_PROJECTION
+        )
+        return await cursor.to_list(length=None)
+
+    # Same for one page of a dataset, keyset paginated on _id
+    async def get_signing_info_by_dataset(self, dataset_id: str, after_id: ObjectId | None, limit: int) -> list[dict]:
+        # soft-deleted images are not shown, don't sign them (rows without the field count as active)
+        query = {"datasetId": dataset_id, "status": "ready", "is_active": {"$ne": False}}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        cursor = self.collection.find(query, SIGNING_PROJECTION).sort("_id", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    # What the ready rows of each s3Key know about it (rows can share an object after deduplication)
+    async def get_ready_by_s3_keys(self, keys: list[str]) -> dict[str, dict]:
+        if not keys:
+            return {}
+        cursor = self.collection.find({"s3Key": {"$in": keys}, "status": "ready"}, SHARED_OBJECT_PROJECTION)
+        merged = {}
+        async for doc in cursor:
+            known = merged.setdefault(doc["s3Key"], {})
+            for field, value in doc.items():
+                if value and not known.get(field):
+                    known[field] = value
+        return merged
+
+    # Soft-deleted rows of a dataset, keyset paginated on _id
+    async def get_inactive_for_purge(self, dataset_id: str, after_id: ObjectId | None, limit: int) -> list[dict]:
+        query = {"datasetId": dataset_id, "is_active": False}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        cursor = self.collection.find(query, PURGE_PROJECTION).sort("_id", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    # Delete the rows that are still soft-deleted; a row restored since it was selected stays.
+    # returns the ids that were actually removed
+    async def delete_inactive_images(self, image_ids: list[str]) -> list[str]:
+        if not image_ids:
+            return []
+        ids = [PyObjectId(i) for i in image_ids]
+        await self.collection.delete_many({"_id": {"$in": ids}, "is_active": False})
+        kept = {str(doc["_id"]) for doc in await self.collection.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(length=None)}
+        return [i for i in image_ids if i not in kept]
+
+    async def dataset_has_images(self, dataset_id: str) -> bool:
+        return await self.collection.find_one({"datasetId": dataset_id}, {"_id": 1}) is not None
+
+    # Rows under an s3Key prefix, streamed in s3Key order (anchored regex, so it walks the s3Key index)
+    def stream_by_s3_prefix(self, prefix: str, batch_size: int = 1000):
+        return self.collection.find(
+            {"s3Key": {"$regex": f"^{re.escape(prefix)}"}},
+            RECONCILE_PROJECTION
+        ).sort("s3Key", 1).batch_size(batch_size)
+
+    async def mark_failed(self, image_ids: list, only_pending: bool = True) -> int:
+        if not image_ids:
+            return 0
+        query = {"_id": {"$in": [PyObjectId(i) for i in image_ids]}}
+        if only_pending:
+            query["status"] = "pending"
+        result = await self.collection.update_many(
+            query,
+            {"$set": {"status": "failed", "updatedAt": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    # Ready rows that still have no dimensions, keyset paginated on _id
+    async def get_unprobed_images(self, after_id: ObjectId | None, limit: int) -> list[dict]:
+        query = {
+            "status": "ready",
+            "$or": [{"width": {"$in": [0, None]}}, {"height": {"$in": [0, None]}}],
+        }
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        cursor = self.collection.find(query, {"s3Key": 1, "sizeBytes": 1}).sort("_id", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    # Apply a $set patch per image id with one unordered bulk_write
+    async def bulk_update_image_metadata(self, patches: dict[str, dict]) -> int:
+        if not patches:
+            return 0
+        operations = [
+            UpdateOne({"_id": PyObjectId(image_id)}, {"$set": patch})
+            for image_id, patch in patches.items()
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    # Apply the ready patches only to rows that aren't ready yet: parallel completes of an image flip it once.
+    # returns how many rows this call flipped
+    async def mark_images_ready(self, patches: dict[str, dict]) -> int:
+        if not patches:
+            return 0
+        operations = [
+            UpdateOne({"_id": PyObjectId(image_id), "status": {"$ne": "ready"}}, {"$set": patch})
+            for image_id, patch in patches.items()
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    # Mark rows failed whose object is missing, but never a row that is already ready:
+    # a retried complete must not flip an image that is already counted
+    async def mark_images_failed(self, image_ids: list[str]) -> int:
+        if not image_ids:
+            return 0
+        result = await self.collection.update_many(
+            {"_id": {"$in": [PyObjectId(i) for i in image_ids]}, "status": {"$ne": "ready"}},
+            {"$set": {"status": "failed", "updatedAt": datetime.now(timezone.utc)}},
+        )
+        return result.modified_count
+
+    # Record one finished part of a multipart upload, atomic so parallel parts don't overwrite each other
+    async def set_upload_part(self, image_id: str, upload_id: str, part_number: int, etag: str) -> bool:
+        result = await self.collection.update_one(
+            {"_id": PyObjectId(image_id), "uploadId": upload_id, "status": "pending"},
+            {"$set": {f"uploadParts.{part_number}": etag}}
+        )
+        return result.matched_count > 0
+
+    # Bulk soft-delete (active=False) / restore (active=True) of a dataset's images, optionally only image_ids.
+    # Returns (rows changed, of which completed) for the dataset counters: one aggregation and one
+    # update_many over the same filter instead of a read and several writes per image.
+    async def set_images_active(self, dataset_id: str, active: bool, image_ids: list[str] | None = None) -> tuple[int, int, int]:
+        # rows without the field count as active (model default)
+        filters = {"datasetId": dataset_id, "is_active": False if active else {"$ne": False}}
+        if image_ids is not None:
+            filters["_id"] = {"$in": [ObjectId(i) for i in image_ids if ObjectId.is_valid(i)]}
+
+        # every matching row is switched, but the dataset counters only hold ready images
+        ready = {"$eq": ["$status", "ready"]}
+        counts = await self.collection.aggregate([
+            {"$match": filters},
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "ready": {"$sum": {"$cond": [ready, 1, 0]}},
+                "completed": {"$sum": {"$cond": [{"$and": [ready, {"$eq": ["$is_completed", True]}]}, 1, 0]}},
+            }},
+        ]).to_list(length=1)
+        if not counts or not counts[0]["total"]:
+            return 0, 0, 0
+
+        result = await self.collection.update_many(filters, {"$set": {"is_active": active}})
+        # a row switched by a concurrent request between the two steps is not counted twice
+        changed = result.modified_count
+        ready_changed = min(counts[0]["ready"], changed)
+        return changed, ready_changed, min(counts[0]["completed"], ready_changed)
+
+    # Counts per status, completion and activity of a dataset's rows (matching filters) in one $facet query
+    async def count_image_facets(self, dataset_id: str, filters: dict | None = None) -> dict:
+        docs = await self.collection.aggregate([
+            {"$match": {"datasetId": dataset_id, **(filters or {})}},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                "completed": [{"$group": {"_id": {"$eq": ["$is_completed", True]}, "count": {"$sum": 1}}}],
+                "active": [{"$group": {"_id": {"$ne": ["$is_active", False]}, "count": {"$sum": 1}}}],
+            }},
+        ]).to_list(length=1)
+        facets = docs[0] if docs else {}
+        total = facets.get("total") or [{"count": 0}]
+        return {
+            "total": total[0]["count"],
+            # rows without a status predate the upload flow
+            "status": {(g["_id"] or "unknown"): g["count"] for g in facets.get("status", [])},
+            "completed": {
+                "completed": 0, "uncompleted": 0,
+                **{("completed" if g["_id"] else "uncompleted"): g["count"] for g in facets.get("completed", [])},
+            },
+            "active": {
+                "active": 0, "inactive": 0,
+                **{("active" if g["_id"] else "inactive"): g["count"] for g in facets.get("active", [])},
+            },
+        }
+
+    # What total_Images / completed_Images should be: {datasetId: (ready active images, of which completed)}
+    # in one $group; datasets without such images are absent
+    async def count_images_by_dataset(self, dataset_id: str | None = None) -> dict[str, tuple[int, int]]:
+        # rows without is_active count as active, like everywhere else
+        match = {"is_active": {"$ne": False}, "status": "ready"}
+        if dataset_id:
+            match["datasetId"] = dataset_id
+        cursor = self.collection.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": "$datasetId",
+                "total": {"$sum": 1},
+                "completed": {"$sum": {"$cond": [{"$eq": ["$is_completed", True]}, 1, 0]}},
+            }},
+        ])
+        return {str(doc["_id"]): (doc["total"], doc["completed"]) async for doc in cursor}
+
+    # Flip is_active of one image only if it isn't already in that state.
+    # Returns the state before the change (None when nothing changed), so the caller adjusts the counters once.
+    async def switch_image_active(self, image_id: str, active: bool) -> dict | None:
+        return await self.collection.find_one_and_update(
+            {"_id": PyObjectId(image_id), "is_active": False if active else {"$ne": False}},
+            {"$set": {"is_active": active}},
+            projection={"is_completed": 1, "datasetId": 1, "is_active": 1, "status": 1},
+        )
+
+    # Same for is_completed
+    async def switch_image_completed(self, image_id: str, completed: bool) -> dict | None:
+        return await self.collection.find_one_and_update(
+            # a missing is_completed counts as False
+            {"_id": PyObjectId(image_id), "is_completed": {"$ne": True} if completed else True},
+            {"$set": {"is_completed": completed}},
+            projection={"is_completed": 1, "datasetId": 1, "is_active": 1, "status": 1},
+        )
+
     # Get image state
     async def get_image_state(self, image_id: str):
         image = await self.collection.find_one({"_id": PyObjectId(image_id)}, {"is_completed": 1, "datasetId": 1, "is_active": 1})
@@ -59,11 +329,41 @@ class ImageMetadataRepo:
         dataset_id: str,
         limit: int | None,
         offset: int,
+        after: tuple | None = None,
+        sort: str = "_id",
     ) -> list[ImageMetadata]:
-        query = self.collection.find({"datasetId": dataset_id})
+        docs = await self.get_image_docs_by_dataset_id(dataset_id, limit, offset, after, sort)
+        return [ImageMetadata(**doc) for doc in docs]
+
+    async def get_image_docs_by_dataset_id(
+        self,
+        dataset_id: str,
+        limit: int | None,
+        offset: int,
+        after: tuple | None = None,
+        sort: str = "_id",
+        projection: dict | None = None,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        """
+        Raw documents of a dataset in (sort, _id) order, only the projected fields if given.
+        filters: extra conditions on the rows (see image_filters in the metadata service).
+        after = (sort value, _id) of the last row of the previous page: the (datasetId, sort, _id)
+        index seeks straight to it, so a deep page costs the same as the first one.
+        offset (skip) still works for old clients, but walks every skipped entry.
+        """
+        filters = {"datasetId": dataset_id, **(filters or {})}
+        if after is not None:
+            value, last_id = after
+            if sort == "_id":
+                filters["_id"] = {"$gt": last_id}
+            else:
+                filters.update(keyset_after(sort, value, last_id))
+        order = [("_id", 1)] if sort == "_id" else [(sort, 1), ("_id", 1)]
+        query = self.collection.find(filters, projection).sort(order)
 
         # offset toepassen als hij > 0 is
-        if offset:
+        if offset and after is None:
             query = query.skip(offset)
 
         # limit alleen als hij niet None is
@@ -74,7 +374,7 @@ class ImageMetadataRepo:
             # alle results (vanaf offset)
             docs = await query.to_list(length=None)
 
-        return [ImageMetadata(**doc) for doc in docs]
+        return docs
 
      
 
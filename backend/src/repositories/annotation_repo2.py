@@ -1,8 +1,14 @@
 
 from backend.core.db import db
+from backend.core.indexes import index_registry
+from pymongo.errors import BulkWriteError
+from pymongo import ReturnDocument
 from backend.src.models.annotation2 import ImageAnnotations, Annotation
 from typing import List
 
+index_registry.declare("imageAnnotations", "imageId")
+
+
 class ImageAnnotationsRepo:
     def __init__(self):
         self.collection = db["imageAnnotations"]  # Collection voor images met embedded annotations
@@ -12,7 +18,17 @@ class ImageAnnotationsRepo:
         result = await self.collection.insert_one(image_annotations)
         return str(result.inserted_id)
 
-   
+    # Create many image annotation docs in one unordered insert_many
+    # returns {index: error message} for the docs that failed
+    async def create_many_image_annotations(self, docs: list[dict]) -> dict[int, str]:
+        if not docs:
+            return {}
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            return {err["index"]: err.get("errmsg", "insert failed") for err in e.details.get("writeErrors", [])}
+        return {}
+
     # Get image annotation
     async def get_image_annotation(self, image_id: str) -> ImageAnnotations:
         doc = await self.collection.find_one({"imageId" : str(image_id)})
@@ -29,6 +45,65 @@ class ImageAnnotationsRepo:
 
         return result.modified_count >= 0 and result.acknowledged
 
+    # Add / replace / remove single annotations (by id) in one pipeline update_one.
+    # $push, positional $set and $pull can't touch the same array in one update, a pipeline can:
+    # remove -> $filter, replace -> $map, add -> $concatArrays, and only the changed shapes are sent.
+    # The filter requires every targeted id to exist and no added id to exist yet.
+    # Returns the document after the update with only its first annotation (enough to know if it has any),
+    # None when nothing matched.
+    async def patch_image_annotation(
+        self,
+        image_id: str,
+        add: list[dict],
+        replace: dict[str, dict],
+        remove: list[str],
+    ) -> dict | None:
+        annotations = {"$ifNull": ["$annotations", []]}
+        if remove:
+            annotations = {"$filter": {
+                "input": annotations,
+                "as": "a",
+                "cond": {"$not": [{"$in": ["$$a.id", {"$literal": remove}]}]},
+            }}
+        if replace:
+            annotations = {"$map": {
+                "input": annotations,
+                "as": "a",
+                "in": {"$switch": {
+                    "branches": [
+                        {"case": {"$eq": ["$$a.id", {"$literal": annotation_id}]}, "then": {"$literal": annotation}}
+                        for annotation_id, annotation in replace.items()
+                    ],
+                    "default": "$$a",
+                }},
+            }}
+        if add:
+            # $literal: label strings starting with "$" stay strings
+            annotations = {"$concatArrays": [annotations, {"$literal": add}]}
+
+        query = {"imageId": str(image_id)}
+        ids = {}
+        if replace or remove:
+            ids["$all"] = [*replace, *remove]
+        if add:
+            ids["$nin"] = [annotation["id"] for annotation in add]
+        if ids:
+            query["annotations.id"] = ids
+
+        return await self.collection.find_one_and_update(
+            query,
+            [{"$set": {"annotations": annotations}}],
+            projection={"annotations": {"$slice": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    # Ids of the annotations of an image (to explain a patch that didn't match)
+    async def get_annotation_ids(self, image_id: str) -> list[str] | None:
+        doc = await self.collection.find_one({"imageId": str(image_id)}, {"annotations.id": 1})
+        if not doc:
+            return None
+        return [annotation.get("id") for annotation in doc.get("annotations") or []]
+
     # # Get all image annotations
     # async def get_all_image_annotations(self) -> list[ImageAnnotations]:
     #     cursor = self.collection.find()
@@ -42,6 +117,13 @@ class ImageAnnotationsRepo:
         result = await self.collection.delete_one({"imageId": str(image_id)})
         return result.deleted_count > 0
 
+    # Delete the annotation docs of many images
+    async def delete_many_image_annotations(self, image_ids: list[str]) -> int:
+        if not image_ids:
+            return 0
+        result = await self.collection.delete_many({"imageId": {"$in": [str(i) for i in image_ids]}})
+        return result.deleted_count
+
 
     
     # # delete a sigle annotation from  image_annotaions
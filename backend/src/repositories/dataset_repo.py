@@ -1,6 +1,16 @@
 from backend.src.models.dataset import Dataset
 from backend.src.helpers.helpers import PyObjectId
+from backend.src.helpers.pagination import keyset_after
 from backend.core.db import db
+from backend.core.indexes import index_registry
+from pymongo import UpdateOne
+import re
+
+# the listing: per caller (assignedTo is multikey, one entry per "userId - role") or everything for admins,
+# then is_active and the (updatedAt, _id) keyset order
+index_registry.declare("dataset", [("assignedTo", 1), ("is_active", 1), ("updatedAt", -1), ("_id", -1)])
+index_registry.declare("dataset", [("createdBy", 1), ("is_active", 1), ("updatedAt", -1), ("_id", -1)])
+index_registry.declare("dataset", [("is_active", 1), ("updatedAt", -1), ("_id", -1)])
 
 
 class DatasetRepo:
@@ -22,6 +32,45 @@ class DatasetRepo:
         )
 
     # Get all datasets
+    # Raw documents (only the projected fields if given)
+    async def get_all_dataset_docs(self, projection: dict | None = None) -> list[dict]:
+        return await self.collection.find({}, projection).to_list(length=None)
+
+    async def get_dataset_docs(
+        self,
+        user_id: str | None = None,
+        is_active: bool | None = None,
+        limit: int | None = None,
+        after: tuple | None = None,
+        descending: bool = True,
+        projection: dict | None = None,
+    ) -> list[dict]:
+        """
+        Raw documents in (updatedAt, _id) order, only the projected fields if given.
+        user_id: only the datasets assigned to (assignedTo entry starting with the id) or created by that user;
+        None lists all of them. after = (updatedAt, _id) of the last row of the previous page.
+        """
+        clauses = []
+        if user_id is not None:
+            # anchored regex: an index prefix scan over the assignedTo entries
+            clauses.append({"$or": [
+                {"assignedTo": {"$regex": f"^{re.escape(user_id)}"}},
+                {"createdBy": user_id},
+            ]})
+        if is_active is not None:
+            clauses.append({"is_active": is_active})
+        if after is not None:
+            value, last_id = after
+            # datasets without updatedAt page too (their cursor carries None)
+            clauses.append(keyset_after("updatedAt", value, last_id, descending))
+
+        query = {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+        direction = -1 if descending else 1
+        cursor = self.collection.find(query, projection).sort([("updatedAt", direction), ("_id", direction)])
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
     async def get_all_datasets(self) -> list[Dataset]:
         dataset_cursor = self.collection.find()
         datasets = []
@@ -45,21 +94,46 @@ class DatasetRepo:
 
         return result.modified_count > 0
     
-    async def update_dataset_state(self, dataset_id: str, delta_completed: int) -> bool:
-        dataset = await self.get_dataset_by_id(dataset_id)
-        if not dataset:
+    # ---------- counters ----------
+    # total_Images / completed_Images change with one pipeline update_one: the addition runs on the server,
+    # so parallel uploads and saves can't overwrite each other, and the result is floored at 0.
+    # updatedAt is left alone: it is the listing's keyset, an annotation save must not move a dataset between pages
+    async def increment_dataset_counters(self, dataset_id: str, total_delta: int = 0, completed_delta: int = 0) -> bool:
+        changes = {
+            field: {"$max": [0, {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}]}
+            for field, delta in (("total_Images", total_delta), ("completed_Images", completed_delta))
+            if delta
+        }
+        if not changes:
             return False
 
-        new_completed_count = (dataset.completed_Images or 0) + delta_completed
-        if new_completed_count < 0:
-            new_completed_count = 0
+        result = await self.collection.update_one({"_id": PyObjectId(dataset_id)}, [{"$set": changes}])
+        return result.matched_count > 0
 
-        updated_data = {
-            "completed_Images": new_completed_count
-        }
-        print(new_completed_count)
-        
+    async def increment_total_images(self, dataset_id: str, delta: int) -> bool:
+        return await self.increment_dataset_counters(dataset_id, total_delta=delta)
 
-        result = await self.collection.update_one({"_id": PyObjectId(dataset_id)}, {"$set": updated_data})
-        return result.modified_count > 0
+    async def increment_completed_images(self, dataset_id: str, delta: int) -> bool:
+        return await self.increment_dataset_counters(dataset_id, completed_delta=delta)
+
+    # Stored counters of one or all datasets
+    async def get_dataset_counters(self, dataset_id: str | None = None) -> list[dict]:
+        query = {"_id": PyObjectId(dataset_id)} if dataset_id else {}
+        return await self.collection.find(query, {"total_Images": 1, "completed_Images": 1}).to_list(length=None)
+
+    # Overwrite recounted counters in one unordered bulk_write. Each write only applies while the stored
+    # values are still the ones the recount saw, so an increment that landed in between is not lost.
+    # fixes: [(dataset_id, (old total, old completed), (new total, new completed))]
+    async def set_dataset_counters(self, fixes: list[tuple]) -> int:
+        if not fixes:
+            return 0
+        operations = [
+            UpdateOne(
+                {"_id": PyObjectId(dataset_id), "total_Images": old[0], "completed_Images": old[1]},
+                {"$set": {"total_Images": new[0], "completed_Images": new[1]}},
+            )
+            for dataset_id, old, new in fixes
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
 
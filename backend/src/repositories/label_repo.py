@@ -2,9 +2,13 @@
 from backend.src.helpers.helpers import PyObjectId
 from backend.src.models.label import Label
 from backend.core.db import db
+from backend.core.indexes import index_registry
 
 
 
+index_registry.declare("label", "datasetId")
+
+
 class LabelRepo:
     def __init__(self):
         self.collection = db["label"]
@@ -42,6 +46,10 @@ class LabelRepo:
         return result.deleted_count > 0
 
     # Get all labels
+    # Raw documents (only the projected fields if given)
+    async def get_label_docs(self, dataset_id: str, projection: dict | None = None) -> list[dict]:
+        return await self.collection.find({"datasetId": dataset_id}, projection).to_list(length=None)
+
     async def get_all_labels(self, dataset_id: str) -> list[Label]:
         labels_cursor = self.collection.find({"datasetId": dataset_id})
         labels = []
@@ -2,8 +2,10 @@ from backend.src.models.log import Log
 from backend.src.helpers.helpers import PyObjectId
 from datetime import datetime, timezone
 from backend.core.db import db
+from backend.core.indexes import index_registry
 
 
+index_registry.declare("logger", [("timestamp", -1)])
 
 
 class LogRepository:
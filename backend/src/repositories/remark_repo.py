@@ -1,6 +1,10 @@
 from backend.src.helpers.helpers import PyObjectId
 from backend.src.models.remark import Remark
 from backend.core.db import db
+from backend.core.indexes import index_registry
+
+index_registry.declare("remark", "datasetId")
+
 
 class RemarkRepo:
     def __init__(self):
@@ -12,6 +16,10 @@ class RemarkRepo:
             return None
         return Remark(**doc)
 
+    # Raw documents (only the projected fields if given)
+    async def get_remark_docs(self, dataset_id: str, projection: dict | None = None) -> list[dict]:
+        return await self.collection.find({"datasetId": dataset_id}, projection).to_list(length=None)
+
     async def get_all_remarks(self, dataset_id: str) -> list[Remark]:
         cursor = self.collection.find({"datasetId": dataset_id})
         results = []
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from backend.core.db import db
+from backend.core.indexes import index_registry
+
+index_registry.declare("storageRefs", [("checksum", 1), ("status", 1)])
+
+
+class StorageRefRepo:
+    """
+    One document per S3 object that can be shared by several image rows:
+    {_id: s3Key, checksum, refs, status, createdAt}
+
+    Only objects uploaded with an S3-verified checksum get a document, so a checksum
+    found here really belongs to the bytes behind the key.
+    """
+
+    def __init__(self):
+        self.collection = db["storageRefs"]
+
+    # Create the refs of newly uploaded objects ({s3Key: (checksum, refs)})
+    async def create_refs(self, refs: dict[str, tuple[str, int]]) -> int:
+        if not refs:
+            return 0
+        now = datetime.now(timezone.utc)
+        docs = [
+            {"_id": key, "checksum": checksum, "refs": count, "status": "pending", "createdAt": now}
+            for key, (checksum, count) in refs.items()
+        ]
+        try:
+            result = await self.collection.insert_many(docs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            return e.details.get("nInserted", 0)
+
+    # The object is in S3, from now on it can be reused
+    async def mark_ready(self, keys: list[str]) -> int:
+        if not keys:
+            return 0
+        result = await self.collection.update_many(
+            {"_id": {"$in": keys}, "status": "pending"},
+            {"$set": {"status": "ready"}}
+        )
+        return result.modified_count
+
+    # One $in query: checksum -> s3Key of an uploaded object with those bytes
+    async def find_ready_by_checksums(self, checksums: list[str]) -> dict[str, str]:
+        if not checksums:
+            return {}
+        cursor = self.collection.find(
+            {"checksum": {"$in": checksums}, "status": "ready", "refs": {"$gt": 0}},
+            {"checksum": 1}
+        )
+        return {doc["checksum"]: doc["_id"] async for doc in cursor}
+
+    # Only succeeds while the object is still referenced, never revives one that is being deleted
+    async def add_refs(self, key: str, count: int) -> bool:
+        result = await self.collection.update_one(
+            {"_id": key, "status": "ready", "refs": {"$gt": 0}},
+            {"$inc": {"refs": count}}
+        )
+        return result.matched_count > 0
+
+    async def release(self, key: str) -> bool | None:
+        """
+        Drop one reference.
+        returns None when the key isn't shared (delete it), True when this was the last
+        reference (delete it), False when other rows still point at it (keep it).
+        """
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            {"$inc": {"refs": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            return None
+        if doc["refs"] > 0:
+            return False
+        # guarded on refs, an add_refs that slipped in between keeps the object alive
+        result = await self.collection.delete_one({"_id": key, "refs": {"$lte": 0}})
+        return result.deleted_count > 0
+
+    # Which of these keys are shared objects at all
+    async def get_tracked(self, keys: list[str]) -> set[str]:
+        if not keys:
+            return set()
+        cursor = self.collection.find({"_id": {"$in": keys}}, {"_id": 1})
+        return {doc["_id"] async for doc in cursor}
+
+    async def release_many(self, counts: dict[str, int]) -> set[str]:
+        """Drop references in bulk ({s3Key: n}). returns the keys whose last reference went."""
+        if not counts:
+            return set()
+        await self.collection.bulk_write(
+            [UpdateOne({"_id": key}, {"$inc": {"refs": -count}}) for key, count in counts.items()],
+            ordered=False
+        )
+        # add_refs never touches a key at 0, so these can't be revived before the delete
+        cursor = self.collection.find({"_id": {"$in": list(counts)}, "refs": {"$lte": 0}}, {"_id": 1})
+        gone = [doc["_id"] async for doc in cursor]
+        if gone:
+            await self.collection.delete_many({"_id": {"$in": gone}, "refs": {"$lte": 0}})
+        return set(gone)
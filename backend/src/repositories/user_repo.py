@@ -2,9 +2,17 @@
 from backend.src.models.user import User
 from backend.src.helpers.helpers import PyObjectId
 from backend.core.db import db
+from backend.core.indexes import index_registry
 from typing import Optional
 
 
+index_registry.declare("user", "username")
+index_registry.declare("user", "email")
+# tokens only exist while an invite or reset is open
+index_registry.declare("user", "invite_token", sparse=True)
+index_registry.declare("user", "reset_token", sparse=True)
+
+
 class UserRepo:
     def __init__(self):
         self.collection = db["user"]
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from backend.src.models.user import UserDto
+from backend.src.helpers.auth_helper import require_roles
+from backend.core.indexes import index_registry
+
+
+router = APIRouter()
+
+
+# Declared vs present indexes per collection, with $indexStats usage (missing / unused indexes)
+@router.get("/indexes")
+async def get_indexes(current_user: UserDto = Depends(require_roles(["admin"]))):
+    return await index_registry.usage_report()
+
+
+# Create missing declared indexes without a restart
+@router.post("/indexes/apply")
+async def apply_indexes(current_user: UserDto = Depends(require_roles(["admin"]))):
+    return await index_registry.apply()
@@ -2,7 +2,7 @@ from backend.src.helpers.auth_helper import require_roles, is_guest_user
 from fastapi import APIRouter, HTTPException, Depends
 from backend.src.models.user import UserDto
 from typing import List
-from backend.src.models.annotation2 import ImageAnnotations, Annotation, ImageAnnotationsDto, AnnotationDto
+from backend.src.models.annotation2 import ImageAnnotations, Annotation, ImageAnnotationsDto, AnnotationDto, AnnotationPatch, AnnotationPatchResult
 from backend.src.services.annotation_service2 import ImageAnnotationsService
 from backend.src.helpers.helpers import NotFoundError, ValidationError
 from backend.src.services.guest_session_service import guest_session_service
@@ -63,6 +63,20 @@ async def update_image_annotation(image_id: str, updated_data: ImageAnnotations,
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Add / replace / remove single annotations by id, without sending the whole list
+@router.patch("/{image_id}/image-annotation", response_model=AnnotationPatchResult)
+async def patch_image_annotation(image_id: str, patch: AnnotationPatch, current_user: UserDto = Depends(require_roles(["admin", "user"]))):
+    try:
+        if is_guest_user(current_user):
+            return guest_session_service.patch_image_annotation(current_user.id, image_id, patch.operations)
+        return await annotation_service.patch_image_annotation(image_id, patch.operations, current_user)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # # Add a single annotation to an image
 # @router.post("/{image_id}/add", response_model=bool)
 # async def add_annotation_to_image(image_id: str, annotation: Annotation, current_user: UserDto = Depends(require_roles(["admin", "user"]))):
@@ -1,11 +1,14 @@
 from backend.src.services.dataset_service import DatasetService
 from backend.src.models.dataset import Dataset, DatasetUpdate, DatasetDto
 from backend.src.models.user import UserDto
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from backend.src.helpers.helpers import NotFoundError
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from backend.src.helpers.helpers import NotFoundError, ValidationError
 from backend.src.helpers.auth_helper import require_roles, is_guest_user
 from backend.src.services.guest_session_service import guest_session_service
+from backend.src.services.dataset_stats_service import dataset_stats_service
+from backend.src.services.job_service import job_registry
+from bson import ObjectId
 
 
 router = APIRouter()
@@ -25,14 +28,51 @@ async def create_dataset(dataset: Dataset, current_user: UserDto = Depends(requi
         raise HTTPException(status_code=400, detail=str(e))
 
 
-# Get all datasets
+# Get all datasets: admins see all of them, other users the ones assigned to or created by them
+# Pages (only with a limit): pass the X-Next-Cursor header of a response back as `after`
 @router.get("/all-datasets", response_model=List[DatasetDto])
-async def get_all_datasets(current_user: UserDto = Depends(require_roles(["admin","user"]))):
+async def get_all_datasets(
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    after: Optional[str] = None,
+    sort: Literal["updatedAt", "-updatedAt"] = "-updatedAt",
+    is_active: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="comma separated DTO fields, e.g. id,name,total_Images"),
+    current_user: UserDto = Depends(require_roles(["admin","user"])),
+):
     
     if is_guest_user(current_user):
         return list(guest_session_service._get_session(current_user.id)["datasets"].values())
-    
-    return await dataset_service.get_all_datasets(current_user)
+
+    try:
+        content, next_cursor = await dataset_service.get_all_datasets_json(
+            fields, current_user, limit=limit, after=after, sort=sort, is_active=is_active,
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+# Recount total_Images / completed_Images of one dataset or all of them from imageMetadata
+# and repair the drifted ones (dryRun only reports); runs as a background job
+@router.post("/recount", status_code=202)
+async def start_recount(
+    datasetId: Optional[str] = None,
+    dryRun: bool = False,
+    current_user: UserDto = Depends(require_roles(["admin"])),
+):
+    if datasetId and not ObjectId.is_valid(datasetId):
+        raise HTTPException(status_code=422, detail="Invalid datasetId")
+    return dataset_stats_service.start(datasetId, dryRun)
+
+
+# Latest recount (manual or scheduled) with its drift report
+@router.get("/recount")
+async def get_recount(current_user: UserDto = Depends(require_roles(["admin"]))):
+    job = job_registry.latest("dataset_recount")
+    if not job:
+        raise HTTPException(status_code=404, detail="No recount has run yet")
+    return job
 
 
 # Get dataset by ID
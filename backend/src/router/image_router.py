@@ -1,15 +1,23 @@
 
 from backend.src.models.user import UserDto
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Query
-from backend.src.helpers.helpers import NotFoundError
-from backend.src.services.imageMetadata_service import MetadataService
+from typing import List, Optional, Literal
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Query, Request
+from fastapi.responses import StreamingResponse
+from backend.src.helpers.helpers import NotFoundError, ValidationError
+from backend.src.services.imageMetadata_service import MetadataService, image_filters
 from backend.src.services.image_service import ImageService
+from backend.src.services.tile_service import tile_service
+from backend.src.services.probe_service import probe_service
+from backend.src.services.job_service import job_registry
+from backend.src.services.reconcile_service import reconcile_service
 from backend.src.models.imageMetadata import ImageMetadataDto
 from backend.src.helpers.auth_helper import require_roles, is_guest_user, require_guest_user, require_normal_user
 from backend.src.services.guest_session_service import guest_session_service
 from pydantic import BaseModel, Field, ConfigDict
 from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
+from backend.core.storage import storage
+from backend.core.storage_backend import InvalidRangeError
+from backend.core.signed_url_cache import signed_url_cache
 
 
 router = APIRouter()
@@ -19,11 +27,26 @@ image_service = ImageService()
 metadata_service = MetadataService()
 image_repo = ImageMetadataRepo()
 
+# Filter query parameters shared by the listing and its counts
+def list_filters(
+    is_completed: Optional[bool] = None,
+    status: Optional[Literal["pending", "ready", "failed"]] = None,
+    is_active: Optional[bool] = None,
+    fileName: Optional[str] = Query(None, description="file name prefix"),
+    fileType: Optional[str] = None,
+) -> dict:
+    return image_filters(is_completed, status, is_active, fileName, fileType)
+
+
+# thumb / preview are WebP renditions made after upload, original is the uploaded file
+Variant = Literal["thumb", "preview", "original"]
+
 
 class PresignFile(BaseModel):
     filename: str
     size: int
     contentType: str 
+    checksum: str | None = None  # hex SHA-256 of the file, identical bytes are not uploaded twice
 
     model_config = ConfigDict(populate_by_name=True)
 
@@ -37,8 +60,75 @@ async def presign_images(dataset_id: str, body: PresignRequest, current_user: Us
         return await image_service.presign_upload(dataset_id, [f.model_dump() for f in body.files], current_user)
     except Exception as e:
         raise HTTPException(400, str(e))
+
+
+# Bulk presign: one insert_many per collection, per-file errors instead of failing the batch
+@router.post("/{dataset_id}/images/presign-bulk")
+async def presign_images_bulk(dataset_id: str, body: PresignRequest, current_user: UserDto = Depends(require_normal_user())):
+    try:
+        return await image_service.presign_upload_bulk(dataset_id, [f.model_dump() for f in body.files], current_user)
+    except Exception as e:
+        raise HTTPException(400, str(e))
     
     
+class PresignMultipartRequest(PresignRequest):
+    partSize: int | None = Field(default=None, ge=5 * 1024 * 1024)  # bytes, default 16 MiB
+
+# Multipart presign for large files: starts the S3 uploads, part urls are signed on demand
+@router.post("/{dataset_id}/images/presign-multipart")
+async def presign_images_multipart(dataset_id: str, body: PresignMultipartRequest, current_user: UserDto = Depends(require_normal_user())):
+    try:
+        return await image_service.presign_upload_multipart(dataset_id, [f.model_dump() for f in body.files], current_user, body.partSize)
+    except Exception as e:
+        raise HTTPException(400, str(e))
+
+
+class PresignPartsRequest(BaseModel):
+    partNumbers: List[int] = Field(min_length=1, max_length=1000)
+
+@router.post("/images/{image_id}/parts/presign")
+async def presign_image_parts(image_id: str, body: PresignPartsRequest, current_user: UserDto = Depends(require_normal_user())):
+    try:
+        return await image_service.presign_upload_parts(image_id, body.partNumbers, current_user)
+    except NotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValidationError as e:
+        raise HTTPException(409, str(e))
+
+
+class UploadPartRequest(BaseModel):
+    partNumber: int = Field(ge=1, le=10000)
+    etag: str  # ETag response header of the part PUT
+
+# Record a finished part, so an interrupted upload can resume where it stopped
+@router.post("/images/{image_id}/parts")
+async def record_image_part(image_id: str, body: UploadPartRequest, current_user: UserDto = Depends(require_normal_user())):
+    try:
+        return await image_service.record_upload_part(image_id, body.partNumber, body.etag, current_user)
+    except NotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValidationError as e:
+        raise HTTPException(409, str(e))
+
+@router.get("/images/{image_id}/parts")
+async def get_image_parts(image_id: str, current_user: UserDto = Depends(require_normal_user())):
+    try:
+        return await image_service.get_upload_parts(image_id, current_user)
+    except NotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValidationError as e:
+        raise HTTPException(409, str(e))
+
+@router.delete("/images/{image_id}/multipart")
+async def abort_image_multipart(image_id: str, current_user: UserDto = Depends(require_normal_user())):
+    try:
+        return await image_service.abort_multipart_upload(image_id, current_user)
+    except NotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValidationError as e:
+        raise HTTPException(409, str(e))
+
+
 class CompleteRequest(BaseModel):
     imageId: str
     checksum: str | None = None
@@ -51,6 +141,8 @@ async def complete_image(body: CompleteRequest, current_user: UserDto = Depends(
         return await image_service.complete_upload(body.imageId,current_user, body.checksum, body.width, body.height)
     except NotFoundError as e:
         raise HTTPException(404, str(e))
+    except ValidationError as e:
+        raise HTTPException(409, str(e))
     
 @router.post("/images/complete-bulk")
 async def complete_images_bulk(items: List[CompleteRequest], current_user: UserDto = Depends(require_roles(["admin","user"]))):
@@ -61,22 +153,163 @@ async def complete_images_bulk(items: List[CompleteRequest], current_user: UserD
 
 
 @router.get("/images/{image_id}/signed-url")
-async def get_signed_url(image_id: str, current_user: UserDto = Depends(require_roles(["admin","user"]))):
+async def get_signed_url(image_id: str, variant: Variant = "original", current_user: UserDto = Depends(require_roles(["admin","user"]))):
     try:
-        return await image_service.get_signed_url(image_id, current_user)
+        return await image_service.get_signed_url(image_id, current_user, variant)
     except NotFoundError as e:
         raise HTTPException(404, str(e))
 
 
+# The image bytes through the backend, for networks that block the object store (Range requests supported)
+@router.get("/images/{image_id}/content")
+async def get_image_content(
+    image_id: str,
+    request: Request,
+    variant: Variant = "original",
+    current_user: UserDto = Depends(require_roles(["admin","user"])),
+):
+    range_header = request.headers.get("range")
+    if_none_match = request.headers.get("if-none-match")
+    if_range = request.headers.get("if-range")
+    try:
+        if is_guest_user(current_user):
+            data, content_type = guest_session_service.get_image(current_user.id, image_id)
+            content = image_service.get_bytes_content(data, content_type, range_header, if_none_match, if_range)
+        else:
+            content = await image_service.get_image_content(image_id, variant, range_header, if_none_match, if_range)
+    except (NotFoundError, ValueError) as e:
+        raise HTTPException(404, str(e))
+    except InvalidRangeError as e:
+        raise HTTPException(416, str(e), headers={"Content-Range": f"bytes */{e.size}"})
+
+    if content["body"] is None:
+        return Response(status_code=304, headers=content["headers"])
+    return StreamingResponse(
+        content["body"],
+        status_code=content["status"],
+        media_type=content["contentType"],
+        headers=content["headers"],
+    )
+
+
+# Build a deep-zoom tile pyramid for an image (large images are tiled automatically)
+@router.post("/images/{image_id}/tiles")
+async def request_image_tiles(image_id: str, current_user: UserDto = Depends(require_normal_user())):
+    try:
+        return await tile_service.request_tiles(image_id)
+    except NotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValidationError as e:
+        raise HTTPException(409, str(e))
+
+
+# Signed tile urls for one viewport (full-resolution pixel coordinates) at one zoom level
+@router.get("/images/{image_id}/tiles")
+async def get_image_tiles(
+    image_id: str,
+    level: Optional[int] = Query(None, ge=0),
+    x: int = Query(0, ge=0),
+    y: int = Query(0, ge=0),
+    width: Optional[int] = Query(None, ge=1),
+    height: Optional[int] = Query(None, ge=1),
+    current_user: UserDto = Depends(require_normal_user()),
+):
+    try:
+        return await tile_service.get_viewport_tiles(image_id, level, x, y, width, height)
+    except NotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValidationError as e:
+        raise HTTPException(422, str(e))
+
+
+class SignedUrlsRequest(BaseModel):
+    imageIds: List[str] | None = Field(default=None, max_length=500)
+    datasetId: str | None = None
+    after: str | None = None  # next_cursor of the previous page (dataset mode)
+    limit: int = Field(default=200, ge=1, le=500)
+    variant: Variant = "original"
+
+# Signed GET urls for a whole gallery page in one request
+@router.post("/signed-urls")
+async def get_signed_urls(body: SignedUrlsRequest, current_user: UserDto = Depends(require_roles(["admin","user"]))):
+    try:
+        return await image_service.get_signed_urls(current_user, body.imageIds, body.datasetId, body.after, body.limit, body.variant)
+    except ValidationError as e:
+        raise HTTPException(422, str(e))
+
+
+# Storage backend counters (in flight, queued, latency per operation) and signed url cache hits/misses
+@router.get("/storage/stats")
+async def get_storage_stats(current_user: UserDto = Depends(require_roles(["admin"]))):
+    return {**storage.stats(), "signed_url_cache": signed_url_cache.stats()}
+
+
+# Fill in width/height of existing rows that were stored as 0x0, runs in the background
+@router.post("/probe/backfill")
+async def start_probe_backfill(current_user: UserDto = Depends(require_roles(["admin"]))):
+    return probe_service.start_backfill()
+
+@router.get("/probe/backfill")
+async def get_probe_backfill(current_user: UserDto = Depends(require_roles(["admin"]))):
+    job = job_registry.latest("probe_backfill")
+    if not job:
+        raise HTTPException(status_code=404, detail="No backfill has run yet")
+    return job
+
+
+# Reconcile S3 with imageMetadata for one dataset or the whole bucket (dry run by default)
+@router.post("/reconcile", status_code=202)
+async def start_reconcile(
+    datasetId: Optional[str] = None,
+    dryRun: bool = True,
+    current_user: UserDto = Depends(require_roles(["admin"])),
+):
+    return reconcile_service.start(datasetId, dryRun)
+
+
 # Get images from dataset
+# Pages: pass the X-Next-Cursor header of a response back as `after` (offset still works, but slows down with depth)
+# Filters are applied in Mongo: is_completed, status, is_active, fileName (prefix) and fileType
+# Guest datasets live in the session and only return the whole list (422 with any of these parameters)
 @router.get("/{dataset_id}/all-images", response_model=list[ImageMetadataDto])
-async def get_images(dataset_id: str, limit: Optional[int] = Query(None, ge=1, le=200) , offset: int = Query(0, ge=0) ,current_user: UserDto = Depends(require_roles(["admin","user"]))):
+async def get_images(
+    dataset_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    after: Optional[str] = None,
+    sort: Literal["_id", "fileName", "uploadedAt"] = "_id",
+    fields: Optional[str] = Query(None, description="comma separated DTO fields, e.g. id,fileName,is_completed,thumbKey"),
+    filters: dict = Depends(list_filters),
+    current_user: UserDto = Depends(require_roles(["admin","user"])),
+):
     try:
         if is_guest_user(current_user):
+            # guest images live in the session and come back whole, rather a 422 than a silently unfiltered list
+            if filters or after or limit is not None or offset or sort != "_id" or fields:
+                raise ValidationError("Filters, sort, fields and paging are not supported for guest datasets")
             return guest_session_service.get_images_by_dataset(current_user.id, dataset_id)
-        return await metadata_service.get_images_by_dataset(dataset_id=dataset_id, current_user=current_user, limit=limit, offset=offset,)
+        content, next_cursor = await metadata_service.get_images_json_by_dataset(
+            dataset_id=dataset_id, current_user=current_user, limit=limit, offset=offset, after=after, sort=sort, fields=fields,
+            filters=filters,
+        )
+        # already JSON: response_model only documents the shape, it isn't validated again
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return Response(content=content, media_type="application/json", headers=headers)
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# Number of images per status, completed / uncompleted and active / inactive, in one query
+# (same filters as all-images, e.g. the counts of a fileName search); guest images live in their session
+@router.get("/{dataset_id}/counts")
+async def get_image_counts(
+    dataset_id: str,
+    filters: dict = Depends(list_filters),
+    current_user: UserDto = Depends(require_normal_user()),
+):
+    return await metadata_service.get_image_counts(dataset_id, filters, current_user)
     
 
 # Soft delete images for user and hard delete for guest
@@ -143,6 +376,23 @@ async def hard_delete_dataset_images(dataset_id: str, current_user: UserDto = De
         raise HTTPException(status_code=404, detail=str(e))
     
 
+# Same purge as a background job, poll GET /jobs/{job_id} for progress
+@router.post("/dataset/{dataset_id}/purge", status_code=202)
+async def purge_dataset_images(dataset_id: str, current_user: UserDto = Depends(require_roles(["admin", "user"]))):
+    try:
+        return await image_service.start_dataset_purge(dataset_id, current_user)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: UserDto = Depends(require_roles(["admin", "user"]))):
+    job = job_registry.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
 # For guest users
 
 @router.post("/guest-datasets/{dataset_id}/images")
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from backend.src.models.label import Label, LabelUpdate, LabelDto
 from backend.src.services.label_service import LabelService
-from backend.src.helpers.helpers import NotFoundError
+from backend.src.helpers.helpers import NotFoundError, ValidationError
 from backend.src.models.user import UserDto
 from backend.src.helpers.auth_helper import require_roles, is_guest_user
 from backend.src.services.guest_session_service import guest_session_service
@@ -23,11 +24,18 @@ async def create_label(dataset_id: str, label: Label, current_user: UserDto = De
 
 # Get all labels
 @router.get("/all-labels", response_model=list[LabelDto])
-async def get_all_labels(dataset_id: str, current_user: UserDto = Depends(require_roles(["admin", "user"]))):
+async def get_all_labels(
+    dataset_id: str,
+    fields: Optional[str] = Query(None, description="comma separated DTO fields, e.g. id,labelName"),
+    current_user: UserDto = Depends(require_roles(["admin", "user"])),
+):
     try:
         if is_guest_user(current_user):
             return guest_session_service.get_all_labels(current_user.id)
-        return await label_service.get_all_labels(dataset_id, current_user)
+        content = await label_service.get_all_labels_json(dataset_id, fields, current_user)
+        return Response(content=content, media_type="application/json")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -1,7 +1,7 @@
 # backend/src/router/remark_router.py
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional
 from backend.src.models.user import UserDto
 from backend.src.models.remark import Remark, RemarkDTO
 from backend.src.services.remark_service import RemarkService
@@ -25,11 +25,18 @@ async def create_remark(remark: Remark, current_user: UserDto = Depends(require_
 
 # Get all remarks
 @router.get("/all-remark", response_model=List[RemarkDTO])
-async def get_all_remarks(dataset_id, current_user: UserDto = Depends(require_roles(["admin","user"]))):
+async def get_all_remarks(
+    dataset_id,
+    fields: Optional[str] = Query(None, description="comma separated DTO fields, e.g. id,message,status"),
+    current_user: UserDto = Depends(require_roles(["admin","user"])),
+):
     try:
-        return await remark_service.get_all_remarks(dataset_id, current_user)
+        content = await remark_service.get_all_remarks_json(dataset_id, fields, current_user)
+        return Response(content=content, media_type="application/json")
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
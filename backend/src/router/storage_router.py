@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from backend.core.storage import storage
+from backend.core.storage_backend import StorageError
+
+
+# Target of the presigned urls of the local storage backend; only mounted when STORAGE_BACKEND=local.
+# Like S3, these routes are authorized by the url signature, not by a login.
+router = APIRouter()
+
+
+def _verify(key: str, request: Request, ops: tuple[str, ...]) -> dict:
+    try:
+        return storage.verify(key, dict(request.query_params), ops)
+    except StorageError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+# Download. FileResponse answers Range requests and hands the file to the server (pathsend) when it can
+@router.get("/local/{key:path}")
+async def get_object(key: str, request: Request):
+    params = _verify(key, request, ("get",))
+    try:
+        path, head = storage.open_object(key)
+    except StorageError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    headers = {"ETag": head["ETag"]}
+    cache_control = params.get("cc") or head.get("CacheControl")
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return FileResponse(path, media_type=head["ContentType"], headers=headers)
+
+
+# Upload of a whole object (presign_put) or of one part of a multipart upload (presign_upload_part)
+@router.put("/local/{key:path}")
+async def put_object(key: str, request: Request):
+    params = _verify(key, request, ("put", "part"))
+
+    upload_id, part_number = None, None
+    if params["op"] == "part":
+        upload_id = params.get("uploadId")
+        part_number = int(params.get("partNumber", "0"))
+        if not 1 <= part_number <= 10000:
+            raise HTTPException(status_code=400, detail="Invalid part number")
+    else:
+        # signed headers, like S3: the upload must use the content type and checksum it was presigned for
+        if params.get("ct") and request.headers.get("content-type") != params["ct"]:
+            raise HTTPException(status_code=403, detail="Content-Type does not match the signed url")
+        if params.get("cs") and request.headers.get("x-amz-checksum-sha256") != params["cs"]:
+            raise HTTPException(status_code=403, detail="Checksum header does not match the signed url")
+
+    try:
+        etag = await storage.write_stream(
+            key,
+            request.stream(),
+            content_type=params.get("ct"),
+            checksum_sha256=params.get("cs"),
+            upload_id=upload_id,
+            part_number=part_number,
+        )
+    except StorageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(status_code=200, headers={"ETag": f'"{etag}"'})
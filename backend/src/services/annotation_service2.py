@@ -1,4 +1,4 @@
-from backend.src.models.annotation2 import ImageAnnotations, Annotation, ImageAnnotationsDto, AnnotationDto
+from backend.src.models.annotation2 import ImageAnnotations, Annotation, ImageAnnotationsDto, AnnotationDto, AnnotationOperation, AnnotationPatchResult
 from backend.src.repositories.annotation_repo2 import ImageAnnotationsRepo
 from backend.src.helpers.helpers import NotFoundError, ValidationError
 from typing import List
@@ -40,25 +40,35 @@ class ImageAnnotationsService:
         
         # Decide if there are annotations present
         has_annotations = len(updated_image_annotation.annotations) > 0
-        
-        image = await self.image_repo.get_image_state(image_id)
-
-
-        old_completed = bool(image.get("is_completed", False))
-        new_completed = has_annotations
-
-        if old_completed != new_completed:
-            # Update the is_completed field in image metadata
-            await self.image_repo.update_image_metadata(
-                image_id,
-                {"is_completed": new_completed}
-            )
-
-            delta = 1 if new_completed else -1
-            await self.dataset_repo.update_dataset_state(dataset_id=str(image.get("datasetId")), delta_completed=delta)
+        await self._update_completion(image_id, has_annotations)
         
         return image_annotation
 
+    # Add / replace / remove single annotations; only the new shapes are sent and validated
+    async def patch_image_annotation(self, image_id: str, operations: List[AnnotationOperation], current_user: UserDto | None = None) -> AnnotationPatchResult:
+        add, replace, remove = split_operations(operations)
+
+        doc = await self.repo.patch_image_annotation(image_id, add, replace, remove)
+        if doc is None:
+            existing = await self.repo.get_annotation_ids(image_id)
+            if existing is None:
+                raise NotFoundError(f"Image annotation with id {image_id} not found")
+            check_operation_ids(existing, add, replace, remove)
+            # the ids were fine a moment later: a parallel patch got in between
+            raise ValidationError("Annotations changed during the update, retry")
+
+        await self._update_completion(image_id, bool(doc.get("annotations")))
+        # the client needs the ids generated for shapes it added without one, to patch them later
+        return AnnotationPatchResult(added=[annotation["id"] for annotation in add])
+
+    async def _update_completion(self, image_id: str, has_annotations: bool):
+        # flip is_completed only if it changes: parallel saves count the image once
+        image = await self.image_repo.switch_image_completed(image_id, has_annotations)
+        # only ready, active images are in the dataset counters
+        if image and image.get("is_active", True) and image.get("status") == "ready":
+            delta = 1 if has_annotations else -1
+            await self.dataset_repo.increment_completed_images(str(image.get("datasetId")), delta)
+
         
         
     
@@ -131,3 +141,43 @@ class ImageAnnotationsService:
                 ann.id = str(ann.id)
 
         return dto
+
+
+# PATCH operations -> (annotations to add, {id: replacement}, ids to remove), ValidationError for a malformed one
+def split_operations(operations: List[AnnotationOperation]) -> tuple[list[dict], dict[str, dict], list[str]]:
+    if not operations:
+        raise ValidationError("No operations given")
+
+    add, replace, remove = [], {}, []
+    seen = set()
+    for operation in operations:
+        if operation.op in ("add", "replace") and operation.annotation is None:
+            raise ValidationError(f"'{operation.op}' needs an annotation")
+        if operation.op in ("replace", "remove") and not operation.id:
+            raise ValidationError(f"'{operation.op}' needs the id of the annotation")
+
+        annotation_id = operation.annotation.id if operation.op == "add" else operation.id
+        if annotation_id in seen:
+            raise ValidationError(f"More than one operation for annotation {annotation_id}")
+        seen.add(annotation_id)
+
+        if operation.op == "add":
+            add.append(operation.annotation.model_dump())
+        elif operation.op == "replace":
+            # a replaced annotation keeps its id
+            replace[annotation_id] = {**operation.annotation.model_dump(), "id": annotation_id}
+        else:
+            remove.append(annotation_id)
+    return add, replace, remove
+
+
+# Why a patch can't apply to these annotation ids: NotFoundError for a missing target, ValidationError for a taken id
+def check_operation_ids(existing: list[str], add: list[dict], replace: dict[str, dict], remove: list[str]):
+    present = set(existing)
+    missing = [annotation_id for annotation_id in (*replace, *remove) if annotation_id not in present]
+    if missing:
+        raise NotFoundError(f"Annotations not found: {', '.join(missing)}")
+    taken = [annotation["id"] for annotation in add if annotation["id"] in present]
+    if taken:
+        raise ValidationError(f"Annotations already exist: {', '.join(taken)}")
+
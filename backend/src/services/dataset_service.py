@@ -1,6 +1,9 @@
 from backend.src.models.dataset import Dataset, DatasetUpdate, DatasetDto
 from backend.src.repositories.dataset_repo import DatasetRepo
 from backend.src.helpers.helpers import NotFoundError, SerializeHelper
+from backend.src.helpers.projection import parse_fields, to_projection
+from backend.src.helpers.pagination import encode_cursor, decode_datetime_cursor
+from backend.src.helpers.raw_json import encode_docs
 from backend.src.repositories.user_repo import UserRepo
 from backend.src.models.user import UserDto
 from backend.src.services.log_service import LogService
@@ -85,6 +88,36 @@ class DatasetService:
         # Gewoon elk model → DTO
         return [to_dto(dataset) for dataset in datasets]
 
+    # JSON array of DatasetDto straight from the documents; fields ("id,name,total_Images") projects in Mongo
+    async def get_all_datasets_json(
+        self,
+        fields: str | None = None,
+        current_user: UserDto | None = None,
+        limit: int | None = None,
+        after: str | None = None,
+        sort: str = "-updatedAt",
+        is_active: bool | None = None,
+    ) -> tuple[bytes, str | None]:
+        """
+        returns (JSON array of DatasetDto, next_cursor). Admins get every dataset, other users only the
+        ones assigned to or created by them. Ordered on updatedAt ("-updatedAt": newest first);
+        with a limit next_cursor is set when the page is full, pass it back as `after` for the next page.
+        """
+        selected = parse_fields(fields, DatasetDto)
+        user_id = None if current_user is None or current_user.role == "admin" else str(current_user.id)
+        docs = await self.dataset_repo.get_dataset_docs(
+            user_id=user_id,
+            is_active=is_active,
+            limit=limit,
+            after=decode_datetime_cursor(after) if after else None,
+            descending=sort.startswith("-"),
+            projection=to_projection(selected, "updatedAt") if selected else None,
+        )
+        next_cursor = None
+        if limit is not None and docs and len(docs) == limit:
+            next_cursor = encode_cursor(docs[-1].get("updatedAt"), docs[-1]["_id"])
+        return encode_docs(docs, DatasetDto, selected), next_cursor
+
         
 
 
@@ -256,6 +289,7 @@ class DatasetService:
 
     # Checks on status (not done)
     
+
 def to_dto (dataset) :
 
     return DatasetDto(
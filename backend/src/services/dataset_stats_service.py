@@ -0,0 +1,86 @@
+import os
+import asyncio
+import logging
+
+from backend.src.repositories.dataset_repo import DatasetRepo
+from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
+from backend.src.services.job_service import job_registry
+
+logger = logging.getLogger(__name__)
+
+# hours between two scheduled recounts of all datasets, 0 turns the schedule off
+RECOUNT_INTERVAL_HOURS = float(os.getenv("DATASET_RECOUNT_INTERVAL_HOURS", "24"))
+
+
+class DatasetStatsService:
+    """
+    Recounts total_Images / completed_Images of one or all datasets from imageMetadata.
+
+    The counters are kept incrementally in many code paths and can drift. One $group aggregation
+    over the ready, active images gives the real counts; only the datasets whose stored
+    counters differ are written, and every drift is reported.
+    """
+
+    def __init__(self):
+        self.dataset_repo = DatasetRepo()
+        self.image_repo = ImageMetadataRepo()
+        self._schedule: asyncio.Task | None = None
+
+    def start(self, dataset_id: str | None = None, dry_run: bool = False) -> dict:
+        return job_registry.start(
+            "dataset_recount",
+            lambda job: self.recount(dataset_id, dry_run, job["progress"]),
+            target=dataset_id or "*"
+        )
+
+    async def recount(self, dataset_id: str | None = None, dry_run: bool = False, report: dict | None = None) -> dict:
+        report = report if report is not None else {}
+        report.update({"datasetId": dataset_id, "dryRun": dry_run, "datasets": 0, "drifted": 0, "fixed": 0, "drifts": []})
+
+        counts = await self.image_repo.count_images_by_dataset(dataset_id)
+        stored = await self.dataset_repo.get_dataset_counters(dataset_id)
+        report["datasets"] = len(stored)
+
+        fixes = []
+        for doc in stored:
+            key = str(doc["_id"])
+            old = (doc.get("total_Images"), doc.get("completed_Images"))
+            new = counts.get(key, (0, 0))
+            if old == new:
+                continue
+            fixes.append((key, old, new))
+            report["drifts"].append({
+                "datasetId": key,
+                "total_Images": {"stored": old[0], "counted": new[0], "drift": (old[0] or 0) - new[0]},
+                "completed_Images": {"stored": old[1], "counted": new[1], "drift": (old[1] or 0) - new[1]},
+            })
+        report["drifted"] = len(fixes)
+
+        if not dry_run:
+            # a dataset changed by a request meanwhile is skipped (not fixed), the next run picks it up
+            report["fixed"] = await self.dataset_repo.set_dataset_counters(fixes)
+        return report
+
+    # ---------- schedule ----------
+    def start_schedule(self, interval_hours: float = RECOUNT_INTERVAL_HOURS):
+        if interval_hours > 0 and self._schedule is None:
+            self._schedule = asyncio.create_task(self._run_schedule(interval_hours * 3600))
+
+    async def stop_schedule(self):
+        if self._schedule is not None:
+            self._schedule.cancel()
+            try:
+                await self._schedule
+            except asyncio.CancelledError:
+                pass
+            self._schedule = None
+
+    async def _run_schedule(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            job = self.start()
+            logger.info(f"Scheduled dataset recount started: job {job['id']}")
+
+
+# Global singleton instance
+dataset_stats_service = DatasetStatsService()
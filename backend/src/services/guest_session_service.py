@@ -2,7 +2,9 @@ from backend.src.models.user import UserDto
 import uuid, base64, io, mimetypes
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta, timezone
-from backend.src.models.annotation2 import ImageAnnotations, Annotation
+from backend.src.models.annotation2 import ImageAnnotations, Annotation, AnnotationOperation, AnnotationPatchResult
+from backend.src.services.annotation_service2 import split_operations, check_operation_ids
+from backend.src.helpers.helpers import NotFoundError
 from backend.src.models.dataset import Dataset, DatasetUpdate
 from backend.src.models.label import Label, LabelDto
 import asyncio
@@ -539,6 +541,34 @@ class GuestSessionService:
         return False
   
     
+    def patch_image_annotation(
+        self,
+        guest_id: str,
+        image_id: str,
+        operations: List[AnnotationOperation]
+    ) -> AnnotationPatchResult:
+        """
+        Add / replace / remove losse annotaties (op id), zelfde regels als voor users.
+        Returnt de ids van de toegevoegde annotaties.
+        """
+        add, replace, remove = split_operations(operations)
+        session = self._get_session(guest_id)
+
+        for ann in session.get("annotations", {}).values():
+            if ann.get("imageId") == image_id:
+                current = ann.get("annotations") or []
+                check_operation_ids([a.get("id") for a in current], add, replace, remove)
+
+                removed = set(remove)
+                ann["annotations"] = [
+                    replace.get(a.get("id"), a) for a in current if a.get("id") not in removed
+                ] + add
+                self._set_image_completion(session, image_id, len(ann["annotations"]) > 0)
+                return AnnotationPatchResult(added=[a["id"] for a in add])
+
+        raise NotFoundError(f"Image annotation with id {image_id} not found")
+
+    
     def delete_image_annotations(self, guest_id: str, image_id: str) -> bool:
         """Delete all annotations for an image."""
         session = self._get_session(guest_id)
@@ -1,11 +1,39 @@
+import re
 
 from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
 from typing import List
-from backend.src.models.imageMetadata import ImageMetadata, ImageMetadataDto, ImageMetadataUpdate
+from backend.src.models.imageMetadata import ImageMetadata, ImageMetadataDto
 from backend.src.helpers.helpers import NotFoundError
+from backend.src.helpers.pagination import encode_cursor, decode_cursor, decode_datetime_cursor
+from backend.src.helpers.projection import parse_fields, to_projection
+from backend.src.helpers.raw_json import encode_docs
 from backend.src.repositories.dataset_repo import DatasetRepo
 from backend.src.models.user import UserDto
-from backend.src.services.dataset_service import DatasetService
+
+
+# Query parameters of the image listing -> conditions on imageMetadata; None means no condition
+def image_filters(
+    is_completed: bool | None = None,
+    status: str | None = None,
+    is_active: bool | None = None,
+    file_name: str | None = None,
+    file_type: str | None = None,
+) -> dict:
+    filters = {}
+    if is_completed is not None:
+        # rows without the field are not completed
+        filters["is_completed"] = True if is_completed else {"$ne": True}
+    if status is not None:
+        filters["status"] = status
+    if is_active is not None:
+        # rows without the field are active
+        filters["is_active"] = {"$ne": False} if is_active else False
+    if file_name:
+        # anchored and case sensitive, so it stays a range scan of the (datasetId, fileName) index
+        filters["fileName"] = {"$regex": f"^{re.escape(file_name)}"}
+    if file_type:
+        filters["fileType"] = file_type
+    return filters
 
 
 class MetadataService:
@@ -13,21 +41,47 @@ class MetadataService:
     def __init__(self ):
         self.image_repo = ImageMetadataRepo()
         self.dataset_repo = DatasetRepo()
-        self.dataset_service = DatasetService()
 
   
 #-----------------------------------------------------------------------------------------------------------------------
 
-    async def get_images_by_dataset(self, dataset_id: str, current_user: UserDto | None, limit: int | None, offset: int) -> List[ImageMetadataDto]:
-        images = await self.image_repo.get_image_by_dataset_id(dataset_id, limit, offset)
-        if not images:
-            return []
+    async def get_images_json_by_dataset(
+        self,
+        dataset_id: str,
+        current_user: UserDto | None,
+        limit: int | None,
+        offset: int,
+        after: str | None = None,
+        sort: str = "_id",
+        fields: str | None = None,
+        filters: dict | None = None,
+    ) -> tuple[bytes, str | None]:
+        """
+        returns (JSON array of ImageMetadataDto, next_cursor). next_cursor is only set when the page
+        is full, pass it back as `after` for the next page (offset is ignored then).
+        With fields ("id,fileName,thumbKey") only those are read from Mongo and returned.
+        filters (from image_filters) narrow the rows on the server.
+        The documents go straight to JSON bytes, no model is built per row.
+        """
+        selected = parse_fields(fields, ImageMetadataDto)
+        if after:
+            after = decode_datetime_cursor(after) if sort == "uploadedAt" else decode_cursor(after)
+        docs = await self.image_repo.get_image_docs_by_dataset_id(
+            dataset_id, limit, offset,
+            after=after,
+            sort=sort,
+            projection=to_projection(selected, sort) if selected else None,
+            filters=filters,
+        )
+        next_cursor = None
+        if limit is not None and docs and len(docs) == limit:
+            # rows from before the field have no value: the cursor carries None
+            next_cursor = encode_cursor(docs[-1].get(sort), docs[-1]["_id"])
+        return encode_docs(docs, ImageMetadataDto, selected), next_cursor
 
-        images_dto = [
-            self.to_dto(image)   
-            for image in images
-        ]
-        return images_dto
+    # Counts per status / completion / activity of the dataset's images (matching filters), one $facet query
+    async def get_image_counts(self, dataset_id: str, filters: dict | None = None, current_user: UserDto | None = None) -> dict:
+        return await self.image_repo.count_image_facets(dataset_id, filters)
 
     
     # -------------------soft delete
@@ -42,33 +96,21 @@ class MetadataService:
         - dataset.total_Images --
         - als image.is_completed == True: dataset.completed_Images --
         """
-        image = await self.image_repo.get_image_metadata_by_id(image_id)
+        # one conditional write: two parallel deletes can't both count the image
+        image = await self.image_repo.switch_image_active(image_id, False)
         if not image:
-            raise NotFoundError(f"Image with id {image_id} not found")
-
-        # al inactive? dan niets doen
-        if not image.is_active:
-            return False
-
-        was_completed = bool(getattr(image, "is_completed", False))
-
-        # 1. image zelf soft-deleten
-        soft_delete = ImageMetadataUpdate(is_active=False)
-        soft_metadata = soft_delete.model_dump(exclude_unset=True)
-        success = await self.image_repo.update_image_metadata(image_id, soft_metadata)
-        if not success:
+            if not await self.image_repo.get_image_state(image_id):
+                raise NotFoundError(f"Image with id {image_id} not found")
+            # al inactive? dan niets doen
             return False
 
-        # 2. total_Images --
-        await self.update_dataset_image_count(image.datasetId, -1, current_user)
-
-        # 3. completed_Images -- als hij meetelde als completed
-        if was_completed:
-            await self.dataset_repo.update_dataset_state(
-                dataset_id=str(image.datasetId),
-                delta_completed=-1,
+        # pending / failed uploads were never counted
+        if image.get("status") == "ready":
+            await self.dataset_repo.increment_dataset_counters(
+                str(image["datasetId"]),
+                total_delta=-1,
+                completed_delta=-1 if image.get("is_completed") else 0,
             )
-
         return True
     
     
@@ -78,34 +120,14 @@ class MetadataService:
         dataset_id: str,
         current_user: UserDto | None = None
     ) -> int:
-
+        """
+        Soft delete every active image of the dataset with one update_many;
+        total_Images / completed_Images drop by the same amounts in one $inc.
+        """
         if not dataset_id:
             raise ValueError("dataset_id is required")
 
-        # haal alle images van de dataset
-        images_in_dataset = await self.image_repo.get_image_by_dataset_id(
-            dataset_id,
-            limit=None,
-            offset=0
-        )
-        if not images_in_dataset:
-            raise NotFoundError(f"Images with dataset id: {dataset_id} not found")
-
-        # soft-delete alle actieve images in de dataset
-        images_to_delete = [image for image in images_in_dataset if image.is_active]
-
-        if not images_to_delete:
-            return 0
-
-        deleted = 0
-        for image in images_to_delete:
-            succes = await self.soft_delete_image(str(image.id))
-            if succes:
-                deleted += 1
-            
-
-
-        return deleted
+        return await self._set_images_active(dataset_id, False)
 
     # -------------------restore
     async def restore_image(
@@ -119,66 +141,47 @@ class MetadataService:
         - dataset.total_Images ++
         - als image.is_completed == True: dataset.completed_Images ++
         """
-        image = await self.image_repo.get_image_metadata_by_id(image_id)
+        image = await self.image_repo.switch_image_active(image_id, True)
         if not image:
-            raise NotFoundError(f"Image with id {image_id} not found")
-
-        # al actief? niets meer te doen
-        if image.is_active:
-            return False
-
-        was_completed = bool(getattr(image, "is_completed", False))
-
-        restore = ImageMetadataUpdate(is_active=True)
-        restore_metadata = restore.model_dump(exclude_unset=True)
-        success = await self.image_repo.update_image_metadata(image_id, restore_metadata)
-        if not success:
+            if not await self.image_repo.get_image_state(image_id):
+                raise NotFoundError(f"Image with id {image_id} not found")
+            # al actief? niets meer te doen
             return False
 
-        # total_Images ++
-        await self.update_dataset_image_count(image.datasetId, 1, current_user)
-
-        # completed_Images ++ als deze image een completed image is
-        if was_completed:
-            await self.dataset_repo.update_dataset_state(
-                dataset_id=str(image.datasetId),
-                delta_completed=1,
+        # pending / failed uploads were never counted
+        if image.get("status") == "ready":
+            await self.dataset_repo.increment_dataset_counters(
+                str(image["datasetId"]),
+                total_delta=1,
+                completed_delta=1 if image.get("is_completed") else 0,
             )
-
         return True
 
     
     # restore all images
     async def restore_images(self, image_ids: list[str] | None = None, dataset_id: str | None = None, current_user: UserDto | None = None) -> int:
-        
+        """
+        Restore the inactive images of the dataset (all of them, or only image_ids) with one update_many;
+        the dataset counters go up in one $inc.
+        """
         if not dataset_id:
             raise ValueError("dataset_id is required")
 
-        # haal alle images van de dataset
-        images_in_dataset = await self.image_repo.get_image_by_dataset_id(dataset_id, limit=None, offset=0)
-        if not images_in_dataset:
-            raise NotFoundError(f"Images with dataset id: {dataset_id} not found")
-        
-        if image_ids is None:
-            # restore alle inactive images in de dataset
-            images_to_restore = [image for image in images_in_dataset if not image.is_active]
-        else:
-            # restore alleen de opgegeven images die in de dataset zitten en inactive zijn
-            images_to_restore = [
-                image for image in images_in_dataset
-                if str(image.id) in image_ids and not image.is_active
-            ]
-
-        if not images_to_restore:
-            return 0
+        return await self._set_images_active(dataset_id, True, image_ids)
 
-        count = 0
-        for image in images_to_restore:
-            succes = await self.restore_image(str(image.id))
-            if succes:
-                count += 1
+    async def _set_images_active(self, dataset_id: str, active: bool, image_ids: list[str] | None = None) -> int:
+        changed, ready, completed = await self.image_repo.set_images_active(dataset_id, active, image_ids)
+        if not changed:
+            if not await self.image_repo.dataset_has_images(dataset_id):
+                raise NotFoundError(f"Images with dataset id: {dataset_id} not found")
+            return 0
 
-        return count
+        if ready:
+            sign = 1 if active else -1
+            await self.dataset_repo.increment_dataset_counters(
+                dataset_id, total_delta=sign * ready, completed_delta=sign * completed
+            )
+        return changed
 
     
     #--------------------------helpers----------------------------------------------------------------
@@ -199,22 +202,9 @@ class MetadataService:
             etag=image.etag,
             checksum=image.checksum,
             status=image.status,
+            thumbKey=image.thumbKey,
+            previewKey=image.previewKey,
+            tiles=image.tiles,
             uploadedAt=image.uploadedAt,
             is_active=image.is_active
         )
-    
-    async def update_dataset_image_count(self, dataset_id: str, change: int, current_user: UserDto | None = None):
-        dataset = await self.dataset_repo.get_dataset_by_id(dataset_id)
-        if not dataset:
-            raise NotFoundError(f"Dataset with id {dataset_id} not found")
-        
-        dataset.total_Images += change
-
-        dataset.total_Images = max(dataset.total_Images, 0)
-        await self.dataset_service.update_dataset(dataset_id, dataset, current_user=current_user)
-
-  
-        
-
-
-
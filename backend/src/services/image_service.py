@@ -1,131 +1,462 @@
+import os
+import re
+import math
 import uuid
+import base64
+import hashlib
+from collections import Counter
+import asyncio
+from bson import ObjectId
+from botocore.exceptions import ClientError
 from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
 from typing import List
 from datetime import datetime, timezone
 from backend.src.models.imageMetadata import ImageMetadata
-from backend.src.helpers.helpers import NotFoundError
-from backend.core.aws import s3, S3_BUCKET, S3_PREFIX
+from backend.src.helpers.helpers import NotFoundError, ValidationError
+from backend.src.helpers.pagination import encode_cursor, decode_cursor
+from backend.core.aws import S3_PREFIX
+from backend.core.storage import storage
+from backend.core.storage_backend import StorageError, NoSuchKeyError, NoSuchUploadError, STREAM_CHUNK_SIZE, parse_byte_range
+from backend.core.signed_url_cache import signed_url_cache
 from backend.src.models.user import UserDto
 from datetime import datetime, timezone
-from backend.src.services.imageMetadata_service import MetadataService
 from backend.src.models.annotation2 import ImageAnnotations
 from backend.src.services.annotation_service2 import ImageAnnotationsService
+from backend.src.repositories.annotation_repo2 import ImageAnnotationsRepo
+from backend.src.repositories.dataset_repo import DatasetRepo
+from backend.src.repositories.storage_ref_repo import StorageRefRepo
+from backend.src.services.rendition_service import rendition_service
+from backend.src.services.tile_service import tile_service
+from backend.src.services.probe_service import probe_service
+from backend.src.services.job_service import job_registry
 
 ALLOWED_TYPES = {"image/jpeg", "image/png", "image/tiff", "image/webp", "image/jpg"}
 
+# client-computed content hash for deduplication (hex SHA-256, what crypto.subtle.digest gives)
+SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+# signed-url variants -> (metadata field, content type override); missing renditions fall back to the original
+VARIANTS = {
+    "original": ("s3Key", None),
+    "thumb": ("thumbKey", "image/webp"),
+    "preview": ("previewKey", "image/webp"),
+}
+
+# content proxy: objects are never overwritten (a new upload gets a new key), so the bytes behind an url never change
+CONTENT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# dataset purge: rows per batch, keys per DeleteObjects request (S3 maximum) and parallel requests
+PURGE_BATCH_SIZE = 5000
+S3_DELETE_CHUNK = 1000
+PURGE_DELETE_CONCURRENCY = 4
+
+# max parallel S3 HEADs per complete-bulk request (the gateway pool is shared with other users)
+COMPLETE_HEAD_CONCURRENCY = 16
+
+# multipart uploads: S3 needs parts of at least 5 MiB (except the last) and at most 10000 parts
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+MULTIPART_PART_SIZE = int(os.getenv("MULTIPART_PART_SIZE", str(16 * 1024 * 1024)))
+MULTIPART_MAX_PARTS = 10000
+# part urls are signed on demand, so they only have to outlive one part on a slow connection
+MULTIPART_URL_TTL_SECONDS = int(os.getenv("MULTIPART_URL_TTL_SECONDS", str(60*60)))
+
 class ImageService:
 
     def __init__(self):
         self.image_repo = ImageMetadataRepo()
-        self.metadata_service = MetadataService()
         self.ann_service = ImageAnnotationsService()
+        self.ann_repo = ImageAnnotationsRepo()
+        self.dataset_repo = DatasetRepo()
+        self.storage_ref_repo = StorageRefRepo()
 
  
     # ---------- presign upload ----------
     async def presign_upload(self, dataset_id: str, files: List[dict], current_user):
         """
-        files: [{filename, size, contentType}]
-        returns: [{imageId, s3Key, putUrl, headers}]
+        files: [{filename, size, contentType, checksum?}]
+        returns: [{imageId, s3Key, putUrl, headers, deduplicated}]
         """
-        now = datetime.now(timezone.utc)
-        out = []
         for f in files:
             if f["contentType"].lower().strip() not in ALLOWED_TYPES:
                 raise ValueError(f"Unsupported content type: {f['contentType']}")
-            # create s3 key
+
+        result = await self.presign_upload_bulk(dataset_id, files, current_user)
+        if result["errors"]:
+            raise ValueError(result["errors"][0]["error"])
+        return [{k: v for k, v in item.items() if k != "index"} for item in result["items"]]
+    
+    # ---------- presign upload in bulk ----------
+    async def presign_upload_bulk(self, dataset_id: str, files: List[dict], current_user):
+        """
+        files: [{filename, size, contentType}]
+        returns: {items: [{index, imageId, s3Key, putUrl, headers}], errors: [{index, filename, error}]}
+
+        Builds every metadata + empty annotation row up front (ids are generated here),
+        writes them with one unordered insert_many per collection and signs the PUT urls locally.
+        A bad file only fails itself, not the whole batch.
+        """
+        planned, errors = self._plan_pending_images(dataset_id, files)
+        reused = await self._deduplicate(planned)
+        created = await self._insert_pending_images(planned, errors)
+
+        created_ids = {row["imageId"] for row in created}
+        # give back the references taken for rows that didn't get written
+        await asyncio.gather(*(
+            self.storage_ref_repo.release(row["key"])
+            for row in planned if row["imageId"] not in created_ids and row["key"] in reused
+        ))
+
+        items = []
+        new_refs = {}
+        for row in created:
+            key = row["key"]
+            content_type = row["file"]["contentType"]
+            checksum = row["meta"].get("checksum")
+
+            if key in reused or key in new_refs:
+                # the bytes are (or are about to be) in S3 already, just complete this row
+                if key in new_refs:
+                    new_refs[key] = (checksum, new_refs[key][1] + 1)
+                items.append({
+                    "index": row["index"],
+                    "imageId": row["imageId"],
+                    "s3Key": key,
+                    "putUrl": None,
+                    "headers": {},
+                    "deduplicated": True,
+                })
+                continue
+
+            headers = {"Content-Type": content_type}
+            checksum_b64 = None
+            if checksum:
+                new_refs[key] = (checksum, 1)
+                checksum_b64 = base64.b64encode(bytes.fromhex(checksum)).decode()
+                headers["x-amz-checksum-sha256"] = checksum_b64
+
+            # presigning is a local HMAC, no request to S3
+            put_url = storage.presign_put(key, content_type, expires_in=60*5, checksum_sha256=checksum_b64)
+            items.append({
+                "index": row["index"],
+                "imageId": row["imageId"],
+                "s3Key": key,
+                "putUrl": put_url,
+                "headers": headers,
+                "deduplicated": False,
+            })
+
+        await self.storage_ref_repo.create_refs(new_refs)
+        return {"items": items, "errors": self._format_errors(files, errors)}
+
+    async def _deduplicate(self, planned: list[dict]) -> set[str]:
+        """
+        Points rows whose checksum is already known at the existing object (one reference
+        taken per row), and repeated checksums within the batch at the first row's key.
+        returns the existing keys that were reused.
+        """
+        by_checksum = {}
+        for row in planned:
+            checksum = row["meta"].get("checksum")
+            if checksum:
+                by_checksum.setdefault(checksum, []).append(row)
+        if not by_checksum:
+            return set()
+
+        existing = await self.storage_ref_repo.find_ready_by_checksums(list(by_checksum))
+        # fails if the last reference went away since the lookup, those rows upload normally
+        taken = await asyncio.gather(*(
+            self.storage_ref_repo.add_refs(key, len(by_checksum[checksum]))
+            for checksum, key in existing.items()
+        ))
+        reused = {key for key, ok in zip(existing.values(), taken) if ok}
+        sources = await self.image_repo.get_ready_by_s3_keys(list(reused))
+
+        for checksum, rows in by_checksum.items():
+            key = existing.get(checksum)
+            if key not in reused:
+                key = rows[0]["key"]
+            source = sources.get(key, {})
+            for row in rows:
+                row["key"] = key
+                row["meta"]["s3Key"] = key
+                # same bytes, so the same dimensions and renditions
+                for field in ("width", "height", "thumbKey", "previewKey", "etag"):
+                    if source.get(field):
+                        row["meta"][field] = source[field]
+                if (source.get("tiles") or {}).get("status") == "ready":
+                    row["meta"]["tiles"] = source["tiles"]
+        return reused
+
+    def _plan_pending_images(self, dataset_id: str, files: List[dict]) -> tuple[list[dict], dict[int, str]]:
+        """Validates the files and builds the pending metadata + annotation rows, nothing is written yet."""
+        now = datetime.now(timezone.utc)
+        errors = {}
+        planned = []
+
+        for index, f in enumerate(files):
+            content_type = f["contentType"].lower().strip()
+            if content_type not in ALLOWED_TYPES:
+                errors[index] = f"Unsupported content type: {f['contentType']}"
+                continue
+
+            checksum = (f.get("checksum") or "").lower().strip() or None
+            if checksum and not SHA256_HEX.fullmatch(checksum):
+                errors[index] = "checksum must be the hex SHA-256 of the file"
+                continue
+
             ext = f["filename"].rsplit(".",1)[-1].lower() if "." in f["filename"] else "bin"
             key = f"{S3_PREFIX}/{dataset_id}/{uuid.uuid4()}.{ext}"
-            
+            image_id = ObjectId()
 
-            # create metadata row as pending
             meta = ImageMetadata(
+                id=image_id,
                 datasetId=str(dataset_id),
                 fileName=f["filename"],
-                folderPath="",  # legacy field; no local path in S3 mode
-                width=0, height=0,  # fill later if you parse
+                folderPath="",
+                width=0, height=0,
                 fileType=ext,
                 s3Key=key,
                 contentType=f["contentType"],
                 sizeBytes=f.get("size", 0),
+                checksum=checksum,
                 status="pending",
                 uploadedAt=now,
                 is_active=True
             )
+            ann = ImageAnnotations(
+                for_remark=False,
+                imageId=str(image_id),
+                annotations=[]
+            ).model_dump()
+            ann.pop("id", None)
+
+            planned.append({
+                "index": index,
+                "file": f,
+                "imageId": str(image_id),
+                "key": key,
+                "meta": meta.model_dump(by_alias=True, exclude_none=True),
+                "ann": ann,
+            })
 
-           
-
-            saved = await self.image_repo.create_image_metadata(meta.model_dump(
-                by_alias=True,
-                exclude_none=True,
-                exclude={"id"}
-            ))
-            
-            ann_data = ImageAnnotations(
-                    for_remark=False,
-                    imageId=str(saved.id),
-                    annotations=[]
-            )
+        return planned, errors
 
-            
-            if (ann_data):
-                await self.ann_service.create_image_annotations(
-                        saved.id,
-                        ann_data
-                )
-           
-
-            
-            
-            put_url = s3.generate_presigned_url(
-                ClientMethod="put_object",
-                Params={
-                    "Bucket": S3_BUCKET,
-                    "Key": key,
-                    "ContentType": f["contentType"]
-        
-                },
-                
-                ExpiresIn=60*5
-            )
-            out.append({
-                "imageId": str(saved.id),
-                "s3Key": key,
-                "putUrl": put_url,
-                "headers": {"Content-Type": f["contentType"]}
+    async def _insert_pending_images(self, planned: list[dict], errors: dict[int, str]) -> list[dict]:
+        """Writes the planned rows, one insert_many per collection in parallel. Failures go into errors."""
+        meta_failed, ann_failed = await asyncio.gather(
+            self.image_repo.create_many_image_metadata([row["meta"] for row in planned]),
+            self.ann_repo.create_many_image_annotations([row["ann"] for row in planned]),
+        )
+
+        # a file only counts when both rows exist; clean up the half that did get written
+        orphan_metadata = [planned[i]["imageId"] for i in ann_failed if i not in meta_failed]
+        orphan_annotations = [planned[i]["imageId"] for i in meta_failed if i not in ann_failed]
+        if orphan_metadata:
+            await self.image_repo.delete_many_image_metadata(orphan_metadata)
+        if orphan_annotations:
+            await self.ann_repo.delete_many_image_annotations(orphan_annotations)
+
+        created = []
+        for pos, row in enumerate(planned):
+            if pos in meta_failed or pos in ann_failed:
+                errors[row["index"]] = meta_failed.get(pos) or ann_failed.get(pos)
+                continue
+            created.append(row)
+        return created
+
+    @staticmethod
+    def _format_errors(files: List[dict], errors: dict[int, str]) -> list[dict]:
+        return [
+            {"index": index, "filename": files[index]["filename"], "error": error}
+            for index, error in sorted(errors.items())
+        ]
+
+
+    # ---------- presign multipart upload (large files) ----------
+    async def presign_upload_multipart(self, dataset_id: str, files: List[dict], current_user, part_size: int | None = None):
+        """
+        files: [{filename, size, contentType}]
+        returns: {items: [{index, imageId, s3Key, uploadId, partSize, partCount}], errors: [...]}
+
+        Starts one S3 multipart upload per file and stores it on the pending row.
+        Part urls are signed on demand (presign_upload_parts), finished parts are recorded
+        with record_upload_part, and complete_upload stitches the parts together.
+        S3 can't verify a whole-file checksum of a multipart upload, so these are never deduplicated.
+        """
+        part_size = max(part_size or MULTIPART_PART_SIZE, MULTIPART_MIN_PART_SIZE)
+        planned, errors = self._plan_pending_images(dataset_id, files)
+
+        valid = []
+        for row in planned:
+            row["meta"].pop("checksum", None)
+            size = row["file"].get("size", 0)
+            # S3 allows at most 10000 parts per upload
+            row_part_size = max(part_size, math.ceil(size / MULTIPART_MAX_PARTS))
+            if size <= 0:
+                errors[row["index"]] = "File size is required for a multipart upload"
+                continue
+            row["meta"]["partSize"] = row_part_size
+            valid.append(row)
+
+        async def start(row):
+            try:
+                return await storage.create_multipart_upload(row["key"], row["file"]["contentType"])
+            except Exception as e:
+                errors[row["index"]] = f"Could not start multipart upload: {e}"
+                return None
+
+        upload_ids = await asyncio.gather(*(start(row) for row in valid))
+        started = []
+        for row, upload_id in zip(valid, upload_ids):
+            if upload_id:
+                row["meta"]["uploadId"] = upload_id
+                row["meta"]["uploadParts"] = {}
+                started.append(row)
+
+        created = await self._insert_pending_images(started, errors)
+        created_ids = {row["imageId"] for row in created}
+        # no row to track it, so the upload can never be completed
+        await asyncio.gather(*(
+            storage.abort_multipart_upload(row["key"], row["meta"]["uploadId"])
+            for row in started if row["imageId"] not in created_ids
+        ), return_exceptions=True)
+
+        items = [
+            {
+                "index": row["index"],
+                "imageId": row["imageId"],
+                "s3Key": row["key"],
+                "uploadId": row["meta"]["uploadId"],
+                "partSize": row["meta"]["partSize"],
+                "partCount": math.ceil(row["file"]["size"] / row["meta"]["partSize"]),
+            }
+            for row in created
+        ]
+        return {"items": items, "errors": self._format_errors(files, errors)}
+
+    async def _get_multipart_image(self, image_id: str) -> ImageMetadata:
+        doc = await self.image_repo.get_image_metadata_by_id(image_id)
+        if not doc:
+            raise NotFoundError(f"Image metadata with id {image_id} not found")
+        if not doc.uploadId or doc.status != "pending":
+            raise ValidationError(f"Image {image_id} has no multipart upload in progress")
+        return doc
+
+    async def presign_upload_parts(self, image_id: str, part_numbers: List[int], current_user):
+        """returns: {uploadId, parts: [{partNumber, url}]}"""
+        doc = await self._get_multipart_image(image_id)
+        max_part = math.ceil((doc.sizeBytes or 0) / doc.partSize) if doc.partSize else MULTIPART_MAX_PARTS
+        parts = []
+        for number in sorted(set(part_numbers)):
+            if not 1 <= number <= max_part:
+                raise ValidationError(f"Part number must be between 1 and {max_part}")
+            parts.append({
+                "partNumber": number,
+                "url": storage.presign_upload_part(doc.s3Key, doc.uploadId, number, expires_in=MULTIPART_URL_TTL_SECONDS),
             })
-            
+        return {"uploadId": doc.uploadId, "parts": parts}
+
+    async def record_upload_part(self, image_id: str, part_number: int, etag: str, current_user):
+        doc = await self._get_multipart_image(image_id)
+        recorded = await self.image_repo.set_upload_part(image_id, doc.uploadId, part_number, etag.strip('"'))
+        if not recorded:
+            raise ValidationError(f"Image {image_id} has no multipart upload in progress")
+        return {"ok": True}
+
+    async def get_upload_parts(self, image_id: str, current_user):
+        """What a client needs to resume: the part size and the parts that are already done."""
+        doc = await self._get_multipart_image(image_id)
+        done = sorted(int(number) for number in (doc.uploadParts or {}))
+        return {
+            "uploadId": doc.uploadId,
+            "partSize": doc.partSize,
+            "partCount": math.ceil((doc.sizeBytes or 0) / doc.partSize) if doc.partSize else None,
+            "completedParts": done,
+        }
+
+    async def abort_multipart_upload(self, image_id: str, current_user):
+        doc = await self._get_multipart_image(image_id)
+        await storage.abort_multipart_upload(doc.s3Key, doc.uploadId)
+        await self.image_repo.update_image_metadata(image_id, {
+            "status": "failed",
+            "uploadId": None,
+            "uploadParts": None,
+            "updatedAt": datetime.now(timezone.utc),
+        })
+        return {"ok": True}
+
+    async def _finish_multipart(self, doc: ImageMetadata):
+        """
+        Stitch the recorded parts together. Falls back to S3's own part list if the client didn't record them.
+        Every part 1..partCount has to be there, otherwise the row stays pending and the client can resume.
+        An upload that no longer exists may have been completed by an earlier call whose row update
+        didn't land: if the object is there, the completion carries on.
+        """
+        try:
+            if doc.uploadParts:
+                parts = [{"PartNumber": int(n), "ETag": f'"{etag}"'} for n, etag in doc.uploadParts.items()]
+            else:
+                listed = await storage.list_parts(doc.s3Key, doc.uploadId)
+                parts = [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in listed]
+            check_part_numbers(doc, [p["PartNumber"] for p in parts])
+            parts.sort(key=lambda p: p["PartNumber"])
+            await storage.complete_multipart_upload(doc.s3Key, doc.uploadId, parts)
+        except NoSuchUploadError:
+            try:
+                await storage.head_object(doc.s3Key)
+            except Exception:
+                raise ValidationError(f"Multipart upload of image {doc.id} no longer exists")
+        except (ClientError, StorageError) as e:
+            # e.g. InvalidPart / EntityTooSmall: the upload itself is still there to retry
+            raise ValidationError(f"Could not complete multipart upload: {e}")
+
 
-        return out
-    
     # ----------  complete upload ----------
     async def complete_upload(self, image_id: str,current_user, checksum: str | None = None, width: int | None = None, height: int | None = None):
         doc = await self.image_repo.get_image_metadata_by_id(image_id)
         if not doc:
             raise NotFoundError(f"Image metadata with id {image_id} not found")
-        
-        prev_status = doc.status if hasattr(doc, "status") else None
+
         # ensure object exists in S3
+        if doc.uploadId:
+            # missing or bad parts leave the row pending, so the client can still resume
+            await self._finish_multipart(doc)
         try:
-            head = s3.head_object(Bucket=S3_BUCKET, Key=doc.s3Key)
+            head = await storage.head_object(doc.s3Key)
         except Exception:
-            # mark failed
-            await self.image_repo.update_image_metadata(image_id, {"status":"failed", "updatedAt": datetime.now(timezone.utc)})
+            # mark failed (unless a parallel complete made it ready)
+            await self.image_repo.mark_images_failed([image_id])
             raise
 
+        # dimensions read from the object header, the client's values are only a fallback
+        probed = None
+        if not (doc.width and doc.height):
+            probed = await probe_service.probe(doc.s3Key, head.get("ContentLength"))
+
         patch = {
             "status": "ready",
             "updatedAt": datetime.now(timezone.utc),
             "etag": head.get("ETag","").strip('"'),
             "sizeBytes": head.get("ContentLength"),
         }
-        if checksum: patch["checksum"] = checksum
+        if doc.uploadId:
+            patch.update({"uploadId": None, "uploadParts": None})
+        # a checksum given at presign was verified by S3, keep that one
+        if checksum and not doc.checksum: patch["checksum"] = checksum
         if width is not None: patch["width"] = width
         if height is not None: patch["height"] = height
+        if probed: patch.update(probed)
+
+        # increment only if this call flipped the row, a parallel or repeated complete doesn't
+        if await self.image_repo.mark_images_ready({image_id: patch}):
+            await self.dataset_repo.increment_total_images(doc.datasetId, 1)
+        if doc.checksum:
+            await self.storage_ref_repo.mark_ready([doc.s3Key])
 
-        await self.image_repo.update_image_metadata(image_id, patch)
-        # increment only once
-        if prev_status != "ready":
-            await self.metadata_service.update_dataset_image_count(doc.datasetId, 1, current_user=None)
+        if not doc.thumbKey:
+            rendition_service.schedule([{"imageId": image_id, "s3Key": doc.s3Key}])
+        if not doc.tiles and tile_service.should_tile(patch.get("width", doc.width), patch.get("height", doc.height)):
+            await tile_service.schedule(image_id, doc.s3Key)
 
         return {"ok": True}
     
@@ -134,69 +465,258 @@ class ImageService:
     async def complete_upload_bulk(self, items: List[dict], current_user):
         """
         items: [{imageId, checksum, width, height}]
-        """
-        updated_count_by_dataset = {}
+        returns: {ok, results: {imageId: "ready" | "failed" | "missing" | "incomplete"}}
+        ("incomplete": a multipart upload that can't be finished yet, the row stays pending)
 
+        One $in query for the metadata, HEADs (+ header probes) with bounded concurrency,
+        one bulk_write of the ready patches per dataset and one $inc by the rows it flipped.
+        """
+        docs = await self.image_repo.get_images_by_ids([item["imageId"] for item in items])
+        docs_by_id = {str(doc.id): doc for doc in docs}
+
+        results = {}
+        semaphore = asyncio.Semaphore(COMPLETE_HEAD_CONCURRENCY)
+        INCOMPLETE = object()
+        probes = {}
+
+        async def head(doc):
+            async with semaphore:
+                if doc.uploadId:
+                    try:
+                        await self._finish_multipart(doc)
+                    except ValidationError:
+                        return INCOMPLETE
+                try:
+                    result = await storage.head_object(doc.s3Key)
+                except Exception:
+                    return None
+                # header probe in the same slot, dimensions from the object instead of the client
+                if not (doc.width and doc.height):
+                    probes[str(doc.id)] = await probe_service.probe(doc.s3Key, result.get("ContentLength"))
+                return result
+
+        to_check = []
         for item in items:
-            image_id = item["imageId"]
-            checksum = item.get("checksum")
-            width = item.get("width")
-            height = item.get("height")
-
-            doc = await self.image_repo.get_image_metadata_by_id(image_id)
+            doc = docs_by_id.get(item["imageId"])
             if not doc:
-                continue  # of raise
+                results[item["imageId"]] = "missing"
+                continue
+            to_check.append((item, doc))
 
-            prev_status = getattr(doc, "status", None)
+        heads = await asyncio.gather(*(head(doc) for _, doc in to_check))
 
-            try:
-                head = s3.head_object(Bucket=S3_BUCKET, Key=doc.s3Key)
-            except Exception:
-                await self.image_repo.update_image_metadata(
-                    image_id,
-                    {"status": "failed", "updatedAt": datetime.now(timezone.utc)}
-                )
+        now = datetime.now(timezone.utc)
+        failed = []
+        ready_by_dataset = {}
+        to_render = {}
+        to_tile = {}
+        shared_ready = set()
+
+        for (item, doc), head_result in zip(to_check, heads):
+            image_id = item["imageId"]
+
+            if head_result is INCOMPLETE:
+                results[image_id] = "incomplete"
+                continue
+            if head_result is None:
+                failed.append(image_id)
+                results[image_id] = "failed"
                 continue
 
             patch = {
                 "status": "ready",
-                "updatedAt": datetime.now(timezone.utc),
-                "etag": head.get("ETag", "").strip('"'),
-                "sizeBytes": head.get("ContentLength"),
+                "updatedAt": now,
+                "etag": head_result.get("ETag", "").strip('"'),
+                "sizeBytes": head_result.get("ContentLength"),
             }
-            if checksum: patch["checksum"] = checksum
-            if width is not None: patch["width"] = width
-            if height is not None: patch["height"] = height
+            if doc.uploadId:
+                patch.update({"uploadId": None, "uploadParts": None})
+            if item.get("checksum") and not doc.checksum: patch["checksum"] = item["checksum"]
+            if item.get("width") is not None: patch["width"] = item["width"]
+            if item.get("height") is not None: patch["height"] = item["height"]
+            if probes.get(image_id): patch.update(probes[image_id])
+
+            ready_by_dataset.setdefault(doc.datasetId, {})[image_id] = patch
+            results[image_id] = "ready"
+            if doc.checksum:
+                shared_ready.add(doc.s3Key)
+            if not doc.thumbKey:
+                to_render[image_id] = doc.s3Key
+            if not doc.tiles and tile_service.should_tile(patch.get("width", doc.width), patch.get("height", doc.height)):
+                to_tile[image_id] = doc.s3Key
+
+        await self.image_repo.mark_images_failed(failed)
+        # one write per dataset: its modified_count is what this call flipped (rows already ready don't match)
+        dataset_ids = list(ready_by_dataset)
+        flipped = await asyncio.gather(*(
+            self.image_repo.mark_images_ready(ready_by_dataset[dataset_id]) for dataset_id in dataset_ids
+        ))
+        await self.storage_ref_repo.mark_ready(list(shared_ready))
+
+        # one atomic $inc per dataset
+        await asyncio.gather(*(
+            self.dataset_repo.increment_dataset_counters(dataset_id, total_delta=count)
+            for dataset_id, count in zip(dataset_ids, flipped) if count
+        ))
+
+        rendition_service.schedule([{"imageId": i, "s3Key": key} for i, key in to_render.items()])
+        for image_id, key in to_tile.items():
+            await tile_service.schedule(image_id, key)
+
+        # keep the order the client sent
+        return {"ok": True, "results": {item["imageId"]: results[item["imageId"]] for item in items}}
 
-            await self.image_repo.update_image_metadata(image_id, patch)
 
-            if prev_status != "ready":
-                updated_count_by_dataset[doc.datasetId] = (
-                    updated_count_by_dataset.get(doc.datasetId, 0) + 1
-                )
 
-        # uiteindelijk één keer per dataset tellen
-        for dataset_id, count in updated_count_by_dataset.items():
-            await self.metadata_service.update_dataset_image_count(
-                dataset_id, count, current_user=None
-            )
+  # ----------  signed GET for display ----------
+    async def get_signed_url(self, image_id: str, current_user, variant: str = "original"):
+        docs = await self.image_repo.get_signing_info_by_ids([image_id])
+        if not docs:
+            raise NotFoundError("Image not found or not ready")
+        return self._signed_variant(docs[0], variant)
+    
 
-        return {"ok": True}
 
+    # same url for the same object until shortly before it expires, so the browser can cache the bytes
+    def _signed_get_url(self, key: str) -> str:
+        return signed_url_cache.get_or_sign(
+            key,
+            lambda expires_in: storage.presign_get(
+                key,
+                expires_in=expires_in,
+                cache_control=f"private, max-age={expires_in}"
+            )
+        )
 
+    def _signed_variant(self, doc: dict, variant: str) -> dict:
+        field, content_type = VARIANTS[variant]
+        if not doc.get(field):
+            field, content_type = VARIANTS["original"]
+        return {
+            "url": self._signed_get_url(doc[field]),
+            "contentType": content_type or doc.get("contentType"),
+            "variant": variant if field != "s3Key" else "original",
+        }
 
-  # ----------  signed GET for display ----------
-    async def get_signed_url(self, image_id: str, current_user):
-        doc = await self.image_repo.get_image_metadata_by_id(image_id)
-        if not doc or doc.status != "ready":
+    # ----------  content proxy (for networks that can't reach the object store) ----------
+    async def get_image_content(
+        self,
+        image_id: str,
+        variant: str = "original",
+        range_header: str | None = None,
+        if_none_match: str | None = None,
+        if_range: str | None = None,
+    ) -> dict:
+        """
+        Streams the object through the backend in chunks, nothing is buffered whole.
+        The Range header goes to the store, so a viewer reading part of a large TIFF only moves those bytes.
+        returns {status, headers, contentType, body}; body is an async iterator, None for a 304.
+        """
+        docs = await self.image_repo.get_signing_info_by_ids([image_id])
+        if not docs:
             raise NotFoundError("Image not found or not ready")
-        url = s3.generate_presigned_url(
-            ClientMethod="get_object",
-            Params={"Bucket": S3_BUCKET, "Key": doc.s3Key},
-            ExpiresIn=60*30
-        )
-        return {"url": url, "contentType": doc.contentType}
-    
+        doc = docs[0]
+        field, content_type = VARIANTS[variant]
+        if not doc.get(field):
+            field, content_type = VARIANTS["original"]
+
+        # the stored etag is the original's; a rendition's comes from the store
+        etag = doc.get("etag") if field == "s3Key" else None
+        if etag and _etag_matches(if_none_match, etag):
+            return {"status": 304, "headers": _content_headers(etag), "contentType": None, "body": None}
+        if if_range and (not etag or if_range.strip() != f'"{etag}"'):
+            # If-Range for another (or an unknown) version: send the whole object
+            range_header = None
+
+        try:
+            response, body = await storage.get_object_stream(doc[field], range_header)
+        except NoSuchKeyError:
+            raise NotFoundError("Image content not found")
+
+        etag = etag or response.get("ETag", "").strip('"')
+        if _etag_matches(if_none_match, etag):
+            await body.aclose()
+            return {"status": 304, "headers": _content_headers(etag), "contentType": None, "body": None}
+
+        headers = {**_content_headers(etag), "Content-Length": str(response["ContentLength"])}
+        if response.get("ContentRange"):
+            headers["Content-Range"] = response["ContentRange"]
+        return {
+            "status": 206 if response.get("ContentRange") else 200,
+            "headers": headers,
+            "contentType": content_type or doc.get("contentType") or response.get("ContentType"),
+            "body": body,
+        }
+
+    def get_bytes_content(
+        self,
+        data: bytes,
+        content_type: str,
+        range_header: str | None = None,
+        if_none_match: str | None = None,
+        if_range: str | None = None,
+    ) -> dict:
+        """Same response for an image that lives in memory (guest sessions)."""
+        etag = hashlib.md5(data).hexdigest()
+        if _etag_matches(if_none_match, etag):
+            return {"status": 304, "headers": _content_headers(etag), "contentType": None, "body": None}
+        if if_range and if_range.strip() != f'"{etag}"':
+            range_header = None
+
+        byte_range = parse_byte_range(range_header, len(data))
+        start, end = byte_range or (0, len(data) - 1)
+
+        async def body():
+            for offset in range(start, end + 1, STREAM_CHUNK_SIZE):
+                yield data[offset:min(offset + STREAM_CHUNK_SIZE, end + 1)]
+
+        headers = {**_content_headers(etag), "Content-Length": str(end - start + 1 if data else 0)}
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return {"status": 206 if byte_range else 200, "headers": headers, "contentType": content_type, "body": body()}
+
+
+    # ----------  signed GETs for a whole gallery page ----------
+    async def get_signed_urls(
+        self,
+        current_user,
+        image_ids: List[str] | None = None,
+        dataset_id: str | None = None,
+        after: str | None = None,
+        limit: int = 200,
+        variant: str = "original",
+    ):
+        """
+        Either a list of image ids, or a dataset id (+ keyset cursor) for one page.
+        One projected query, then every url is signed locally.
+        returns: {items: [{imageId, url, contentType, variant}], missing: [imageId], next_cursor}
+        """
+        next_cursor = None
+        missing = []
+
+        if image_ids:
+            docs = await self.image_repo.get_signing_info_by_ids(image_ids)
+            by_id = {str(doc["_id"]): doc for doc in docs}
+            ordered = []
+            for image_id in image_ids:
+                if image_id in by_id:
+                    ordered.append(by_id[image_id])
+                else:
+                    missing.append(image_id)
+            docs = ordered
+        elif dataset_id:
+            after_id = decode_cursor(after)[1] if after else None
+            docs = await self.image_repo.get_signing_info_by_dataset(dataset_id, after_id, limit)
+            if len(docs) == limit:
+                next_cursor = encode_cursor(docs[-1]["_id"], docs[-1]["_id"])
+        else:
+            raise ValidationError("imageIds or datasetId is required")
+
+        items = [
+            {"imageId": str(doc["_id"]), **self._signed_variant(doc, variant)}
+            for doc in docs
+        ]
+        return {"items": items, "missing": missing, "next_cursor": next_cursor}
 
 
     # -------------------hard delete one image
@@ -208,36 +728,177 @@ class ImageService:
             return False
         
 
-        # NEW: delete from S3 if we have a key (instead of local os.remove)
-        if metadata.s3Key:
-            try:
-                s3.delete_object(Bucket=S3_BUCKET, Key=metadata.s3Key)
-            except Exception:
-                pass
-        
+        # deduplicated uploads share one object, it only goes with the last reference
+        last_reference = await self.storage_ref_repo.release(metadata.s3Key) if metadata.s3Key else None
+        if last_reference is not False:
+            await self._delete_objects(metadata)
+
         deleted = await self.image_repo.delete_image_metadata(image_id)
         if (deleted):
             await self.ann_service.delete_image_annotations(image_id)
         return deleted
 
+    # the original and everything derived from it
+    async def _delete_objects(self, metadata: ImageMetadata):
+        for key in (metadata.s3Key, metadata.thumbKey, metadata.previewKey):
+            if not key:
+                continue
+            try:
+                await storage.delete_object(key)
+                signed_url_cache.invalidate(key)
+            except Exception:
+                pass
+        if metadata.uploadId:
+            # parts of an unfinished upload are stored (and billed) until aborted
+            try:
+                await storage.abort_multipart_upload(metadata.s3Key, metadata.uploadId)
+            except Exception:
+                pass
+        if metadata.tiles and metadata.tiles.rootKey:
+            try:
+                await tile_service.delete_tiles(metadata.tiles.rootKey)
+            except Exception:
+                pass
+
     # hard delete all soft-deleted images of a dataset
     async def hard_delete_dataset_images(self, dataset_id: str, current_user: UserDto | None = None) -> int:
-        images = await self.image_repo.get_image_by_dataset_id(dataset_id, limit=None, offset=0)
-        if not images:
+        if not await self.image_repo.dataset_has_images(dataset_id):
             raise NotFoundError(f"Images with dataset ID: {dataset_id} not found")
-        
-        # filter alleen soft-deleted images
-        images_to_delete = [image for image in images if not image.is_active]
+        report = await self.purge_dataset_images(dataset_id)
+        return report["deleted"]
+
+    # same purge in the background, progress via the job registry
+    async def start_dataset_purge(self, dataset_id: str, current_user: UserDto | None = None) -> dict:
+        if not await self.image_repo.dataset_has_images(dataset_id):
+            raise NotFoundError(f"Images with dataset ID: {dataset_id} not found")
+        return job_registry.start(
+            "dataset_purge",
+            lambda job: self.purge_dataset_images(dataset_id, job["progress"]),
+            target=dataset_id
+        )
+
+    async def purge_dataset_images(self, dataset_id: str, progress: dict | None = None) -> dict:
+        """
+        Set-based purge of the soft-deleted images of a dataset, PURGE_BATCH_SIZE rows at a time:
+        one delete_many for the metadata and one for the annotations, then S3 multi-object
+        deletes in 1000-key chunks with bounded parallelism.
+        returns (and keeps up to date in progress): {deleted, objects, failedChunks: [...]}
+        """
+        progress = progress if progress is not None else {}
+        progress.update({"batches": 0, "deleted": 0, "objects": 0, "failedChunks": []})
+
+        after_id = None
+        while True:
+            rows = await self.image_repo.get_inactive_for_purge(dataset_id, after_id, PURGE_BATCH_SIZE)
+            if not rows:
+                break
+            after_id = rows[-1]["_id"]
+
+            # rows first: an interrupted purge leaves orphan objects, never released-but-still-listed rows.
+            # only what is still soft-deleted goes: an image restored since the select keeps its annotations and objects
+            deleted = set(await self.image_repo.delete_inactive_images([str(row["_id"]) for row in rows]))
+            await self.ann_repo.delete_many_image_annotations(list(deleted))
+            await self._purge_objects([row for row in rows if str(row["_id"]) in deleted], progress)
+
+            progress["batches"] += 1
+            progress["deleted"] += len(deleted)
+
+        return progress
+
+    async def _purge_objects(self, rows: list[dict], progress: dict):
+        # deduplicated objects only go with their last reference
+        keys = [row["s3Key"] for row in rows if row.get("s3Key")]
+        tracked = await self.storage_ref_repo.get_tracked(keys)
+        released = await self.storage_ref_repo.release_many(dict(Counter(k for k in keys if k in tracked)))
+
+        to_delete = []
+        tile_roots = []
+        uploads = []
+        for row in rows:
+            key = row.get("s3Key")
+            if not key or (key in tracked and key not in released):
+                continue
+            to_delete.extend(k for k in (key, row.get("thumbKey"), row.get("previewKey")) if k)
+            if (row.get("tiles") or {}).get("rootKey"):
+                tile_roots.append(row["tiles"]["rootKey"])
+            if row.get("uploadId"):
+                uploads.append((key, row["uploadId"]))
+        # a released key is shared by several rows of this batch
+        to_delete = list(dict.fromkeys(to_delete))
+
+        semaphore = asyncio.Semaphore(PURGE_DELETE_CONCURRENCY)
+
+        async def delete_chunk(number: int, chunk: list[str]):
+            async with semaphore:
+                try:
+                    response = await storage.delete_objects(chunk)
+                except Exception as e:
+                    progress["failedChunks"].append({"chunk": number, "keys": len(chunk), "error": str(e)})
+                    return
+            for key in chunk:
+                signed_url_cache.invalidate(key)
+            errors = response.get("Errors", [])
+            progress["objects"] += len(chunk) - len(errors)
+            if errors:
+                progress["failedChunks"].append({
+                    "chunk": number,
+                    "keys": len(chunk),
+                    "failed": [{"key": e.get("Key"), "error": e.get("Code")} for e in errors],
+                })
+
+        async def delete_tiles(root_key: str):
+            async with semaphore:
+                try:
+                    await tile_service.delete_tiles(root_key)
+                except Exception as e:
+                    progress["failedChunks"].append({"tiles": root_key, "error": str(e)})
+
+        async def abort_upload(key: str, upload_id: str):
+            async with semaphore:
+                try:
+                    await storage.abort_multipart_upload(key, upload_id)
+                except Exception:
+                    pass
+
+        first_chunk = progress.get("chunks", 0)
+        chunks = [to_delete[i:i + S3_DELETE_CHUNK] for i in range(0, len(to_delete), S3_DELETE_CHUNK)]
+        progress["chunks"] = first_chunk + len(chunks)
+        await asyncio.gather(
+            *(delete_chunk(first_chunk + n, chunk) for n, chunk in enumerate(chunks)),
+            *(delete_tiles(root) for root in tile_roots),
+            *(abort_upload(key, upload_id) for key, upload_id in uploads),
+        )
 
-        if not images_to_delete:
-            return 0
 
-        count = 0
-        for image in images_to_delete:
-            succes = await self.hard_delete_image(str(image.id), current_user)
-            if succes:
-                count += 1
+def _content_headers(etag: str) -> dict:
+    headers = {"Cache-Control": CONTENT_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag:
+        headers["ETag"] = f'"{etag}"'
+    return headers
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match or not etag:
+        return False
+    # If-None-Match uses the weak comparison
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or f'"{etag}"' in tags
+
+
+# A multipart upload is only complete with exactly the parts 1..ceil(sizeBytes / partSize)
+def check_part_numbers(doc: ImageMetadata, numbers: list[int]):
+    if not numbers:
+        raise ValidationError(f"No uploaded parts for image {doc.id}")
+    if doc.partSize and doc.sizeBytes:
+        expected = math.ceil(doc.sizeBytes / doc.partSize)
+    else:
+        # size unknown: at least no gaps
+        expected = max(numbers)
+    present = set(numbers)
+    missing = [n for n in range(1, expected + 1) if n not in present]
+    if missing:
+        raise ValidationError(f"Missing parts for image {doc.id}: {', '.join(map(str, missing))}")
+    unexpected = sorted(n for n in present if not 1 <= n <= expected)
+    if unexpected:
+        raise ValidationError(f"Unexpected parts for image {doc.id}: {', '.join(map(str, unexpected))}")
 
-        return count
-    
- 
\ No newline at end of file
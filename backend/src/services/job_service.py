@@ -0,0 +1,85 @@
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# finished jobs kept for their progress endpoint
+MAX_FINISHED_JOBS = 200
+
+
+class JobRegistry:
+    """
+    In-memory registry of background jobs (purges, backfills, sweeps) of this process.
+
+    A job is a plain dict: {id, kind, target, status, progress, startedAt, finishedAt, error}.
+    The job function gets that dict and keeps job["progress"] up to date while it runs,
+    the final progress is the job's report.
+    """
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def start(self, kind: str, run, target: str | None = None) -> dict:
+        """run: async def run(job); one job per (kind, target) at a time."""
+        running = self.find_running(kind, target)
+        if running:
+            return running
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "target": target,
+            "status": "running",
+            "progress": {},
+            "error": None,
+            "startedAt": datetime.now(timezone.utc),
+            "finishedAt": None,
+        }
+        self._jobs[job["id"]] = job
+        task = asyncio.create_task(self._run(job, run))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+        return job
+
+    async def _run(self, job: dict, run):
+        try:
+            await run(job)
+            job["status"] = "done"
+        except Exception as e:
+            logger.warning(f"Job {job['kind']} {job['id']} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        job["finishedAt"] = datetime.now(timezone.utc)
+        self._prune()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] != "running"]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> dict | None:
+        return self._jobs.get(job_id)
+
+    def find_running(self, kind: str, target: str | None = None) -> dict | None:
+        for job in self._jobs.values():
+            if job["kind"] == kind and job["target"] == target and job["status"] == "running":
+                return job
+        return None
+
+    def latest(self, kind: str) -> dict | None:
+        for job in reversed(self._jobs.values()):
+            if job["kind"] == kind:
+                return job
+        return None
+
+    def list(self, kind: str | None = None) -> list[dict]:
+        return [job for job in self._jobs.values() if kind is None or job["kind"] == kind]
+
+
+# Global singleton instance
+job_registry = JobRegistry()
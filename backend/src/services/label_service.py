@@ -1,6 +1,8 @@
 from backend.src.repositories.label_repo import LabelRepo
 from backend.src.models.label import Label, LabelDto, LabelUpdate
 from backend.src.helpers.helpers import NotFoundError
+from backend.src.helpers.projection import parse_fields, to_projection
+from backend.src.helpers.raw_json import encode_docs
 from backend.src.models.user import UserDto
 
 class LabelService:
@@ -23,6 +25,12 @@ class LabelService:
                 self.to_dto(label)
                 )
         return labels_dto
+
+    # JSON array of LabelDto straight from the documents, optionally only some fields
+    async def get_all_labels_json(self, dataset_id: str, fields: str | None = None, current_user: UserDto | None = None) -> bytes:
+        selected = parse_fields(fields, LabelDto)
+        docs = await self.label_repo.get_label_docs(dataset_id, to_projection(selected) if selected else None)
+        return encode_docs(docs, LabelDto, selected)
     
     # Get a label by id
     async def get_label_by_id(self, label_id: str, current_user: UserDto | None = None) -> LabelDto:
@@ -0,0 +1,198 @@
+import io
+import os
+import struct
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from backend.core.storage import storage
+from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
+from backend.src.services.job_service import job_registry
+
+logger = logging.getLogger(__name__)
+
+# first ranged GET; enough for JPEG/PNG/WebP headers and most TIFFs
+PROBE_BLOCK_SIZE = int(os.getenv("PROBE_BLOCK_SIZE", str(16 * 1024)))
+# give up on files whose header is spread further than this (e.g. a JPEG with a huge EXIF block)
+PROBE_MAX_BYTES = int(os.getenv("PROBE_MAX_BYTES", str(1024 * 1024)))
+PROBE_WORKERS = int(os.getenv("PROBE_WORKERS", "8"))
+PROBE_BACKFILL_BATCH = 200
+
+# only the formats we accept for upload (WebP is parsed by hand), no other Pillow plugin runs on these bytes
+PROBE_FORMATS = ("JPEG", "PNG", "TIFF")
+
+
+#------------------------------------------------------------
+class RangedObjectReader(io.RawIOBase):
+    """
+    Seekable read-only file over a stored object. Blocks are fetched with ranged GETs
+    only when Pillow reads them, so a TIFF whose IFD sits at the end of the file
+    costs two small requests instead of a full download.
+    """
+
+    def __init__(self, fetch, size: int, block_size: int = PROBE_BLOCK_SIZE, max_bytes: int = PROBE_MAX_BYTES):
+        self._fetch = fetch  # fetch(start, end_inclusive) -> bytes, blocking
+        self._size = size
+        self._block_size = block_size
+        self._max_bytes = max_bytes
+        self._blocks: dict[int, bytes] = {}
+        self._pos = 0
+        self.fetched = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        end = min(self._pos + len(buffer), self._size)
+        if self._pos >= end:
+            return 0
+        self._load(self._pos // self._block_size, (end - 1) // self._block_size)
+
+        view = memoryview(buffer)
+        written = 0
+        while self._pos < end:
+            block, offset = divmod(self._pos, self._block_size)
+            chunk = self._blocks[block][offset:offset + end - self._pos]
+            view[written:written + len(chunk)] = chunk
+            written += len(chunk)
+            self._pos += len(chunk)
+        return written
+
+    def _load(self, first: int, last: int):
+        missing = [block for block in range(first, last + 1) if block not in self._blocks]
+        if not missing:
+            return
+        start = missing[0] * self._block_size
+        end = min((missing[-1] + 1) * self._block_size, self._size) - 1
+        if self.fetched + end - start + 1 > self._max_bytes:
+            raise OSError("image header is larger than the probe budget")
+
+        # one request for the whole missing span
+        data = self._fetch(start, end)
+        self.fetched += len(data)
+        for block in range(missing[0], missing[-1] + 1):
+            offset = (block - missing[0]) * self._block_size
+            self._blocks[block] = data[offset:offset + self._block_size]
+
+
+def _webp_size(header: bytes) -> tuple[int, int]:
+    # Pillow's WebP plugin reads the whole file, the RIFF header is enough
+    chunk = header[12:16]
+    if chunk == b"VP8X":
+        return 1 + int.from_bytes(header[24:27], "little"), 1 + int.from_bytes(header[27:30], "little")
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        return struct.unpack("<H", header[26:28])[0] & 0x3FFF, struct.unpack("<H", header[28:30])[0] & 0x3FFF
+    if chunk == b"VP8L" and header[20] == 0x2F:
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    raise ValueError("unsupported WebP header")
+
+
+def read_image_header(fp) -> tuple[int, int, str]:
+    """
+    Image.open without the decompression-bomb check: only the header is parsed,
+    pixels are never decoded here, and whole-slide images are legitimately huge.
+    """
+    header = fp.read(30)
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return *_webp_size(header), "WEBP"
+
+    Image.init()
+    prefix = header[:16]
+    for fmt in PROBE_FORMATS:
+        factory, accept = Image.OPEN[fmt]
+        accepted = accept(prefix) if accept else True
+        if isinstance(accepted, str) or not accepted:
+            continue
+        fp.seek(0)
+        try:
+            img = factory(fp, None)
+        except (SyntaxError, IndexError, TypeError, struct.error):
+            continue
+        return img.size[0], img.size[1], img.format
+    raise ValueError("not a supported image")
+#------------------------------------------------------------
+
+
+class ProbeService:
+    """
+    Reads width, height and the real format from the first few KB of an uploaded
+    object, instead of trusting what the client sent. Parsing runs in a thread pool;
+    the ranged GETs go through the shared storage backend.
+    """
+
+    def __init__(self, max_workers: int = PROBE_WORKERS):
+        self.image_repo = ImageMetadataRepo()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+
+    async def probe(self, key: str, size: int | None = None) -> dict | None:
+        """returns {width, height, contentType}, or None when the header can't be read"""
+        try:
+            if not size:
+                size = (await storage.head_object(key))["ContentLength"]
+            loop = asyncio.get_running_loop()
+
+            def fetch(start: int, end: int) -> bytes:
+                # called from the probe thread, the request itself runs on the gateway pool
+                return asyncio.run_coroutine_threadsafe(storage.get_object_range(key, start, end), loop).result()
+
+            width, height, fmt = await loop.run_in_executor(
+                self._executor, read_image_header, RangedObjectReader(fetch, size)
+            )
+        except Exception as e:
+            logger.warning(f"Could not probe {key}: {e}")
+            return None
+
+        probed = {"width": width, "height": height}
+        if fmt in Image.MIME:
+            probed["contentType"] = Image.MIME[fmt]
+        return probed
+
+
+    # ---------- backfill of existing rows ----------
+    def start_backfill(self) -> dict:
+        return job_registry.start("probe_backfill", self._backfill)
+
+    async def _backfill(self, job: dict) -> dict:
+        progress = job["progress"]
+        progress.update({"scanned": 0, "updated": 0, "failed": 0})
+        semaphore = asyncio.Semaphore(PROBE_WORKERS * 2)
+
+        async def probe_row(row):
+            async with semaphore:
+                return await self.probe(row["s3Key"], row.get("sizeBytes"))
+
+        after_id = None
+        while True:
+            rows = await self.image_repo.get_unprobed_images(after_id, PROBE_BACKFILL_BATCH)
+            if not rows:
+                break
+            after_id = rows[-1]["_id"]
+
+            results = await asyncio.gather(*(probe_row(row) for row in rows))
+            patches = {str(row["_id"]): probed for row, probed in zip(rows, results) if probed}
+            await self.image_repo.bulk_update_image_metadata(patches)
+
+            progress["scanned"] += len(rows)
+            progress["updated"] += len(patches)
+            progress["failed"] += len(rows) - len(patches)
+        return progress
+
+
+# Global singleton instance
+probe_service = ProbeService()
@@ -0,0 +1,168 @@
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from backend.core.aws import S3_PREFIX
+from backend.core.storage import storage
+from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
+from backend.src.services.job_service import job_registry
+
+# a pending row older than this without an object is an abandoned upload
+PENDING_TTL = timedelta(hours=int(os.getenv("RECONCILE_PENDING_TTL_HOURS", "24")))
+# objects younger than this are left alone, their row may not be visible to the sweep yet
+ORPHAN_MIN_AGE = timedelta(hours=int(os.getenv("RECONCILE_ORPHAN_MIN_AGE_HOURS", "1")))
+# writes are flushed per batch while the sweep streams on
+RECONCILE_FLUSH_SIZE = 1000
+REPORT_SAMPLE_SIZE = 100
+
+
+class ReconcileService:
+    """
+    Sweeps S3 against imageMetadata for one dataset prefix or the whole bucket.
+
+    Both sides are streamed in s3Key order (list_objects_v2 pages, next page prefetched,
+    and a Mongo cursor sorted on s3Key) and merge-joined, so neither is loaded fully.
+    - object without a row: orphan, deleted (e.g. a delete_object that failed during hard delete)
+    - stale pending row without an object: abandoned upload, marked failed
+    - ready row without an object: reported only
+    Renditions and tiles under _derived/ are skipped in the listing.
+    """
+
+    def __init__(self):
+        self.image_repo = ImageMetadataRepo()
+
+    def start(self, dataset_id: str | None = None, dry_run: bool = True) -> dict:
+        return job_registry.start(
+            "reconcile",
+            lambda job: self.reconcile(dataset_id, dry_run, job["progress"]),
+            target=dataset_id or "*"
+        )
+
+    async def reconcile(self, dataset_id: str | None = None, dry_run: bool = True, report: dict | None = None) -> dict:
+        prefix = f"{S3_PREFIX}/{dataset_id}/" if dataset_id else f"{S3_PREFIX}/"
+        report = report if report is not None else {}
+        report.update({
+            "prefix": prefix,
+            "dryRun": dry_run,
+            "objects": 0,
+            "rows": 0,
+            "orphans": 0,
+            "orphansDeleted": 0,
+            "stalePending": 0,
+            "markedFailed": 0,
+            "missingObjects": 0,
+            "samples": {"orphans": [], "stalePending": [], "missingObjects": []},
+        })
+        now = datetime.now(timezone.utc)
+        orphan_queue: list[str] = []
+        stale_queue: list = []
+
+        def sample(kind: str, value):
+            if len(report["samples"][kind]) < REPORT_SAMPLE_SIZE:
+                report["samples"][kind].append(value)
+
+        async def flush(force: bool = False):
+            if dry_run:
+                orphan_queue.clear()
+                stale_queue.clear()
+                return
+            if orphan_queue and (force or len(orphan_queue) >= RECONCILE_FLUSH_SIZE):
+                keys = orphan_queue[:]
+                orphan_queue.clear()
+                response = await storage.delete_objects(keys)
+                report["orphansDeleted"] += len(keys) - len(response.get("Errors", []))
+            if stale_queue and (force or len(stale_queue) >= RECONCILE_FLUSH_SIZE):
+                ids = stale_queue[:]
+                stale_queue.clear()
+                report["markedFailed"] += await self.image_repo.mark_failed(ids)
+
+        def on_orphan(obj: dict):
+            if now - obj["LastModified"] < ORPHAN_MIN_AGE:
+                return
+            report["orphans"] += 1
+            sample("orphans", obj["Key"])
+            orphan_queue.append(obj["Key"])
+
+        async def on_rows_without_object(rows: list[dict]):
+            for row in rows:
+                if row.get("status") == "ready":
+                    report["missingObjects"] += 1
+                    sample("missingObjects", str(row["_id"]))
+                elif row.get("status") == "pending" and now - _as_utc(row.get("uploadedAt")) > PENDING_TTL:
+                    report["stalePending"] += 1
+                    sample("stalePending", str(row["_id"]))
+                    stale_queue.append(row["_id"])
+                    if row.get("uploadId") and not dry_run:
+                        # the parts of an abandoned multipart upload are billed until aborted
+                        try:
+                            await storage.abort_multipart_upload(row["s3Key"], row["uploadId"])
+                        except Exception:
+                            pass
+
+        objects = self._stream_objects(prefix)
+        groups = self._stream_row_groups(prefix)
+        obj = await anext(objects, None)
+        group = await anext(groups, None)
+
+        while obj is not None or group is not None:
+            if group is None or (obj is not None and obj["Key"] < group[0]):
+                report["objects"] += 1
+                on_orphan(obj)
+                obj = await anext(objects, None)
+            elif obj is None or group[0] < obj["Key"]:
+                report["rows"] += len(group[1])
+                await on_rows_without_object(group[1])
+                group = await anext(groups, None)
+            else:
+                report["objects"] += 1
+                report["rows"] += len(group[1])
+                obj = await anext(objects, None)
+                group = await anext(groups, None)
+            await flush()
+
+        await flush(force=True)
+        return report
+
+    async def _stream_objects(self, prefix: str):
+        derived = f"{S3_PREFIX}/_derived/"
+        # '/' sorts right before '0', so listing after this key skips every derived object at once
+        after_derived = f"{S3_PREFIX}/_derived0"
+
+        # the next page is already on its way while this one is being joined
+        pending = asyncio.create_task(storage.list_objects_page(prefix))
+        while pending is not None:
+            page = await pending
+            pending = None
+            if page.get("IsTruncated"):
+                pending = asyncio.create_task(storage.list_objects_page(prefix, page["NextContinuationToken"]))
+
+            for obj in page.get("Contents", []):
+                if obj["Key"].startswith(derived):
+                    if pending is not None:
+                        pending.cancel()
+                    pending = asyncio.create_task(storage.list_objects_page(prefix, start_after=after_derived))
+                    break
+                yield obj
+
+    async def _stream_row_groups(self, prefix: str):
+        # deduplicated rows share a key: yields (s3Key, [rows]) once per key
+        key, rows = None, []
+        async for row in self.image_repo.stream_by_s3_prefix(prefix):
+            if row["s3Key"] != key and rows:
+                yield key, rows
+                rows = []
+            key = row["s3Key"]
+            rows.append(row)
+        if rows:
+            yield key, rows
+
+
+def _as_utc(value: datetime | None) -> datetime:
+    if value is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    # motor returns naive UTC datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# Global singleton instance
+reconcile_service = ReconcileService()
@@ -2,6 +2,8 @@ from typing import List
 from backend.src.repositories.remark_repo import RemarkRepo
 from backend.src.models.remark import Remark, RemarkDTO
 from backend.src.helpers.helpers import NotFoundError, ValidationError
+from backend.src.helpers.projection import parse_fields, to_projection
+from backend.src.helpers.raw_json import encode_docs
 from backend.src.models.user import UserDto
 from datetime import datetime, timezone
 
@@ -25,6 +27,14 @@ class RemarkService:
         # print(remarks_dto)
         return remarks_dto
 
+    # JSON array of RemarkDTO straight from the documents, optionally only some fields
+    async def get_all_remarks_json(self, dataset_id: str, fields: str | None = None, current_user: UserDto | None = None) -> bytes:
+        selected = parse_fields(fields, RemarkDTO)
+        docs = await self.repo.get_remark_docs(dataset_id, to_projection(selected) if selected else None)
+        if not docs:
+            raise NotFoundError("No remarks found in the database")
+        return encode_docs(docs, RemarkDTO, selected)
+
     # create remark
     async def create_remark(self, remark: Remark, current_user: UserDto | None = None) -> str:
         if not remark.message:
@@ -0,0 +1,126 @@
+import io
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+
+from backend.core.aws import derived_key
+from backend.core.storage import storage
+from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
+
+logger = logging.getLogger(__name__)
+
+THUMB_SIZE = int(os.getenv("RENDITION_THUMB_SIZE", "256"))
+PREVIEW_SIZE = int(os.getenv("RENDITION_PREVIEW_SIZE", "1600"))
+# Pillow's own limit (~178 MP) would refuse whole-slide images; decoding still holds the full image in memory
+# (about 3 bytes a pixel), so the workers have their own bound
+RENDITION_MAX_PIXELS = int(os.getenv("RENDITION_MAX_PIXELS", str(1_000_000_000)))
+RENDITION_WORKERS = int(os.getenv("RENDITION_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+RENDITIONS = {
+    # name: (max edge in px, webp quality)
+    "thumb": (THUMB_SIZE, 75),
+    "preview": (PREVIEW_SIZE, 85),
+}
+
+
+class RenditionTooLargeError(ValueError):
+    """More pixels than RENDITION_MAX_PIXELS, the image is served as the original."""
+
+
+#------------------------------------------------------------
+def to_display_mode(img: Image.Image) -> Image.Image:
+    # 16-bit / float microscopy TIFFs: scale down to 8 bit before converting
+    # (point() only takes the native "I;16" layout, so big-endian I;16B goes through 32-bit "I" first)
+    if img.mode in ("I;16", "I;16B", "I;16L", "I"):
+        img = img.convert("I").point(lambda v: v * (1 / 256)).convert("L")
+    elif img.mode == "F":
+        img = img.convert("L")
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    return img
+
+
+# Runs in a worker process: decode once, encode every rendition
+def make_renditions(data: bytes) -> dict[str, bytes]:
+    Image.MAX_IMAGE_PIXELS = None  # checked against our own bound below, before anything is decoded
+    with Image.open(io.BytesIO(data)) as img:
+        if img.width * img.height > RENDITION_MAX_PIXELS:
+            raise RenditionTooLargeError(f"{img.width}x{img.height} is over {RENDITION_MAX_PIXELS} pixels")
+        # JPEG can decode at 1/2, 1/4, 1/8 scale directly, much cheaper for big photos
+        img.draft("RGB", (PREVIEW_SIZE, PREVIEW_SIZE))
+        img = to_display_mode(ImageOps.exif_transpose(img))
+
+        out = {}
+        for name, (size, quality) in sorted(RENDITIONS.items(), key=lambda r: -r[1][0]):
+            # largest first, each smaller one is resized from the previous result
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format="WEBP", quality=quality, method=4)
+            out[name] = buf.getvalue()
+        return out
+#------------------------------------------------------------
+
+
+class RenditionService:
+    """
+    Builds a small WebP thumbnail and a medium preview for every image that becomes ready.
+
+    Pillow work runs in a process pool so it neither blocks the event loop nor holds the GIL;
+    S3 transfers go through the shared gateway. Jobs are fire-and-forget: a failure only
+    means the image keeps being served as the original.
+    """
+
+    def __init__(self, max_workers: int = RENDITION_WORKERS):
+        self.image_repo = ImageMetadataRepo()
+        self.max_workers = max_workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # created lazily, so importing the app doesn't fork workers
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def schedule(self, images: list[dict]):
+        """images: [{imageId, s3Key}] that just became ready."""
+        if self._semaphore is None:
+            # limits how many originals are held in memory at once
+            self._semaphore = asyncio.Semaphore(self.max_workers * 2)
+        for image in images:
+            task = asyncio.create_task(self._render_guarded(image["imageId"], image["s3Key"]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _render_guarded(self, image_id: str, key: str):
+        async with self._semaphore:
+            try:
+                await self.render(image_id, key)
+            except RenditionTooLargeError as e:
+                logger.warning(f"No renditions for image {image_id}, raise RENDITION_MAX_PIXELS to render it: {e}")
+            except Exception as e:
+                logger.warning(f"Rendition failed for image {image_id}: {e}")
+
+    async def render(self, image_id: str, key: str) -> dict:
+        data = await storage.get_object_bytes(key)
+
+        loop = asyncio.get_running_loop()
+        renditions = await loop.run_in_executor(self._get_pool(), make_renditions, data)
+        del data
+
+        keys = {name: derived_key(key, f"{name}.webp") for name in renditions}
+        await asyncio.gather(*(
+            storage.put_object(keys[name], body, "image/webp", cache_control="private, max-age=31536000, immutable")
+            for name, body in renditions.items()
+        ))
+
+        patch = {"thumbKey": keys["thumb"], "previewKey": keys["preview"]}
+        await self.image_repo.update_image_metadata(image_id, patch)
+        return patch
+
+
+# Global singleton instance
+rendition_service = RenditionService()
@@ -0,0 +1,345 @@
+import io
+import os
+import math
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from PIL import Image, ImageOps, ExifTags
+
+from backend.core.aws import derived_key
+from backend.core.storage import storage, create_storage
+from backend.core.signed_url_cache import signed_url_cache
+from backend.src.helpers.helpers import NotFoundError, ValidationError
+from backend.src.repositories.Image_metadata_repo import ImageMetadataRepo
+from backend.src.services.rendition_service import to_display_mode
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = int(os.getenv("TILE_SIZE", "254"))
+TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", "1"))
+TILE_FORMAT = os.getenv("TILE_FORMAT", "jpeg")
+TILE_QUALITY = int(os.getenv("TILE_QUALITY", "85"))
+# images with at least this many pixels are tiled automatically after upload
+TILE_MIN_PIXELS = int(os.getenv("TILE_MIN_PIXELS", str(64_000_000)))
+# a compressed whole-slide image is still decoded in full (see BandReader), so keep this low
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", "1"))
+MAX_TILES_PER_VIEWPORT = 512
+
+TILE_CONTENT_TYPES = {"jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+
+#------------------------------------------------------------
+# Full-resolution rows decoded at a time: tile_size * 2**BAND_LEVELS (plus the overlap); the
+# BAND_LEVELS levels below full resolution are cut from the same band, the rest from one small image
+BAND_LEVELS = 3
+# rows per decoder entry when one uncompressed strip is split up
+STRIP_ROWS = 64
+TIFF_STRIP_BYTE_COUNTS = 279
+
+
+def region_tiles(img: Image.Image) -> list | None:
+    """
+    The decoder entries of an uncompressed TIFF (strips or tiles), so bands of rows can be decoded
+    on their own. None if the file can't be read by region: compressed TIFFs go through libtiff
+    in one piece, other formats have a single entry, and a rotated image is transposed as a whole.
+    """
+    if img.format != "TIFF" or img.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+        return None
+    tiles = list(img.tile)
+    if not tiles or any(t.codec_name != "raw" or (len(t.args) > 2 and t.args[2] != 1) for t in tiles):
+        return None
+    if len(tiles) > 1:
+        return tiles
+
+    # one strip: the rows are at fixed offsets, split it into entries of STRIP_ROWS rows
+    strip = tiles[0]
+    width, height = img.size
+    byte_counts = img.tag_v2.get(TIFF_STRIP_BYTE_COUNTS)
+    if strip.extents != (0, 0, width, height) or not byte_counts or len(byte_counts) != 1:
+        return None
+    row_bytes, rest = divmod(byte_counts[0], height)
+    if rest:
+        return None
+    return [
+        strip._replace(extents=(0, y, width, min(y + STRIP_ROWS, height)), offset=strip.offset + y * row_bytes)
+        for y in range(0, height, STRIP_ROWS)
+    ]
+
+
+class BandReader:
+    """
+    Horizontal bands of the source image. An uncompressed TIFF is decoded band by band; anything else
+    (e.g. a JPEG-compressed slide) is decoded once and cut into bands. EXIF orientation is applied
+    like the renditions do, so tiles and thumbnails agree.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.whole = None
+        with Image.open(fp) as img:
+            self.tiles = region_tiles(img)
+            self.size = img.size
+        if self.tiles is None:
+            fp.seek(0)
+            img = Image.open(fp)
+            img.load()
+            ImageOps.exif_transpose(img, in_place=True)
+            self.whole = img
+            self.size = img.size
+
+    def read(self, top: int, bottom: int) -> Image.Image:
+        width = self.size[0]
+        if self.whole is not None:
+            return self.whole.crop((0, top, width, bottom))
+
+        # decode only the entries that cover these rows, as if they were the whole image
+        selected = [t for t in self.tiles if t.extents[1] < bottom and t.extents[3] > top]
+        first, last = min(t.extents[1] for t in selected), max(t.extents[3] for t in selected)
+        self.fp.seek(0)
+        img = Image.open(self.fp)
+        img._size = (width, last - first)
+        img.tile = [
+            t._replace(extents=(t.extents[0], t.extents[1] - first, t.extents[2], t.extents[3] - first))
+            for t in selected
+        ]
+        img.load()
+        if (first, last) != (top, bottom):
+            img = img.crop((0, top - first, width, bottom - first))
+        return img
+
+
+def write_tile_pyramid(fp, put, root_key: str, tile_size: int, overlap: int, fmt: str, quality: int) -> dict:
+    """
+    Cuts the DZI pyramid of the image in fp and hands every tile to put(key, body, content_type).
+    Memory stays at one band of rows plus the image of level maxLevel - BAND_LEVELS (1/64 of the pixels),
+    unless the file can only be decoded whole (see BandReader).
+    """
+    content_type = TILE_CONTENT_TYPES[fmt]
+    reader = BandReader(fp)
+    width, height = reader.size
+    max_level = math.ceil(math.log2(max(width, height))) if max(width, height) > 1 else 0
+    band_levels = min(BAND_LEVELS, max_level)
+    band_rows = tile_size << band_levels
+    margin = overlap << band_levels
+
+    def display(img: Image.Image) -> Image.Image:
+        img = to_display_mode(img)
+        return img.convert("RGB") if img.mode == "RGBA" and fmt == "jpeg" else img
+
+    def cut(level: int, img: Image.Image, origin: int, rows: range) -> list:
+        # img holds the rows origin.. of the level, tiles are cut in level coordinates
+        scale = 1 << (max_level - level)
+        level_w, level_h = math.ceil(width / scale), math.ceil(height / scale)
+        pending = []
+        for row in rows:
+            for col in range(math.ceil(level_w / tile_size)):
+                box = (
+                    max(col * tile_size - overlap, 0),
+                    max(row * tile_size - overlap, 0) - origin,
+                    min((col + 1) * tile_size + overlap, level_w),
+                    min((row + 1) * tile_size + overlap, level_h) - origin,
+                )
+                buf = io.BytesIO()
+                img.crop(box).save(buf, format=fmt.upper(), quality=quality)
+                pending.append(uploads.submit(put, f"{root_key}_files/{level}/{col}_{row}.{fmt}", buf.getvalue(), content_type))
+        return pending
+
+    with ThreadPoolExecutor(max_workers=16) as uploads:
+        low = None
+        for top in range(0, height, band_rows):
+            bottom = min(top + band_rows, height)
+            # the margin holds the overlap rows of the neighbouring bands, at every band level
+            start = max(top - margin, 0)
+            band = display(reader.read(start, min(bottom + margin, height)))
+            pending = []
+            for i in range(band_levels + 1):
+                if i:
+                    # DZI: every level is half the previous one, rounded up
+                    band = band.reduce(2)
+                scale = 1 << i
+                first_row = top // scale // tile_size
+                last_row = math.ceil(math.ceil(bottom / scale) / tile_size)
+                pending += cut(max_level - i, band, start // scale, range(first_row, last_row))
+
+            scale = 1 << band_levels
+            if low is None:
+                low = Image.new(band.mode, (math.ceil(width / scale), math.ceil(height / scale)))
+            low.paste(band.crop((0, (top - start) // scale, band.width, math.ceil(bottom / scale) - start // scale)), (0, top // scale))
+            # finish a band before reading the next one, bounds the encoded tiles held in memory
+            for upload in pending:
+                upload.result()
+            del band
+
+        level_img = low
+        for level in range(max_level - band_levels - 1, -1, -1):
+            level_img = level_img.reduce(2)
+            for upload in cut(level, level_img, 0, range(math.ceil(level_img.height / tile_size))):
+                upload.result()
+
+    dzi = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{tile_size}" Overlap="{overlap}" Format="{fmt}">'
+        f'<Size Width="{width}" Height="{height}"/></Image>'
+    )
+    put(f"{root_key}.dzi", dzi.encode(), "application/xml")
+
+    return {
+        "tileSize": tile_size,
+        "overlap": overlap,
+        "format": fmt,
+        "width": width,
+        "height": height,
+        "maxLevel": max_level,
+    }
+
+
+# Runs in a worker process. Has its own storage backend (and S3 client) and never sends pixels back to the parent.
+def build_tile_pyramid(key: str, root_key: str, tile_size: int, overlap: int, fmt: str, quality: int) -> dict:
+    Image.MAX_IMAGE_PIXELS = None  # slides are legitimately huge
+    backend = create_storage(for_worker_process=True)
+
+    def put(tile_key: str, body: bytes, content_type: str):
+        backend.put_object_sync(tile_key, body, content_type, cache_control="private, max-age=31536000, immutable")
+
+    with tempfile.TemporaryFile() as tmp:
+        backend.download_fileobj(key, tmp)
+        tmp.seek(0)
+        return write_tile_pyramid(tmp, put, root_key, tile_size, overlap, fmt, quality)
+#------------------------------------------------------------
+
+
+class TileService:
+    """
+    Optional deep-zoom mode: a DZI tile pyramid next to the original, built in a worker
+    process after the upload is ready, so the viewer only downloads the tiles it shows.
+    """
+
+    def __init__(self, max_workers: int = TILE_WORKERS):
+        self.image_repo = ImageMetadataRepo()
+        self.max_workers = max_workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    @staticmethod
+    def should_tile(width: int | None, height: int | None) -> bool:
+        return bool(width and height and width * height >= TILE_MIN_PIXELS)
+
+    # explicit request from the client, also for images below the threshold
+    async def request_tiles(self, image_id: str) -> dict:
+        image = await self.image_repo.get_image_metadata_by_id(image_id)
+        if not image:
+            raise NotFoundError(f"Image metadata with id {image_id} not found")
+        if image.status != "ready":
+            raise ValidationError("Image upload is not complete")
+        if image.tiles and image.tiles.status in ("pending", "ready"):
+            return image.tiles.model_dump()
+
+        await self.schedule(image_id, image.s3Key)
+        return {"status": "pending"}
+
+    async def schedule(self, image_id: str, key: str):
+        root_key = derived_key(key, "tiles")
+        # marked pending before the task starts, so a second request doesn't start it again
+        await self.image_repo.update_image_metadata(image_id, {"tiles": {"status": "pending", "rootKey": root_key}})
+        task = asyncio.create_task(self._build(image_id, key, root_key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _build(self, image_id: str, key: str, root_key: str):
+        loop = asyncio.get_running_loop()
+        try:
+            info = await loop.run_in_executor(
+                self._get_pool(), build_tile_pyramid,
+                key, root_key, TILE_SIZE, TILE_OVERLAP, TILE_FORMAT, TILE_QUALITY
+            )
+        except Exception as e:
+            logger.warning(f"Tiling failed for image {image_id}: {e}")
+            await self.image_repo.update_image_metadata(image_id, {"tiles": {"status": "failed", "rootKey": root_key}})
+            return
+
+        await self.image_repo.update_image_metadata(image_id, {"tiles": {"status": "ready", "rootKey": root_key, **info}})
+
+
+    # ---------- signed tile urls for one viewport ----------
+    async def get_viewport_tiles(
+        self,
+        image_id: str,
+        level: int | None = None,
+        x: int = 0,
+        y: int = 0,
+        width: int | None = None,
+        height: int | None = None,
+    ) -> dict:
+        """
+        x, y, width, height: viewport in full-resolution pixels (default: whole image)
+        level: DZI level, maxLevel is full resolution (default: maxLevel)
+        """
+        image = await self.image_repo.get_image_metadata_by_id(image_id)
+        if not image:
+            raise NotFoundError(f"Image metadata with id {image_id} not found")
+        tiles = image.tiles
+        if not tiles or tiles.status != "ready":
+            raise NotFoundError(f"Image {image_id} has no tile pyramid (yet)")
+
+        level = tiles.maxLevel if level is None else level
+        if not 0 <= level <= tiles.maxLevel:
+            raise ValidationError(f"level must be between 0 and {tiles.maxLevel}")
+
+        scale = 2 ** (tiles.maxLevel - level)
+        level_w = math.ceil(tiles.width / scale)
+        level_h = math.ceil(tiles.height / scale)
+        width = tiles.width - x if width is None else width
+        height = tiles.height - y if height is None else height
+
+        ts = tiles.tileSize
+        first_col = max(int(x / scale) // ts, 0)
+        first_row = max(int(y / scale) // ts, 0)
+        last_col = min((math.ceil((x + width) / scale) - 1) // ts, math.ceil(level_w / ts) - 1)
+        last_row = min((math.ceil((y + height) / scale) - 1) // ts, math.ceil(level_h / ts) - 1)
+
+        count = max(last_col - first_col + 1, 0) * max(last_row - first_row + 1, 0)
+        if count > MAX_TILES_PER_VIEWPORT:
+            raise ValidationError("Viewport covers too many tiles at this level, use a lower level")
+
+        urls = []
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                tile_key = f"{tiles.rootKey}_files/{level}/{col}_{row}.{tiles.format}"
+                url = signed_url_cache.get_or_sign(
+                    tile_key,
+                    lambda expires_in, k=tile_key: storage.presign_get(
+                        k, expires_in=expires_in, cache_control=f"private, max-age={expires_in}"
+                    )
+                )
+                urls.append({"col": col, "row": row, "url": url})
+
+        return {
+            **tiles.model_dump(exclude={"status", "rootKey"}),
+            "level": level,
+            "levelWidth": level_w,
+            "levelHeight": level_h,
+            "tiles": urls,
+        }
+
+    # remove every object of a pyramid (used by hard delete)
+    async def delete_tiles(self, root_key: str):
+        token = None
+        while True:
+            page = await storage.list_objects_page(f"{root_key}_files/", token)
+            keys = [obj["Key"] for obj in page.get("Contents", [])]
+            if keys:
+                await storage.delete_objects(keys)
+            if not page.get("IsTruncated"):
+                break
+            token = page.get("NextContinuationToken")
+        await storage.delete_object(f"{root_key}.dzi")
+
+
+# Global singleton instance
+tile_service = TileService()
@@ -0,0 +1,31 @@
+# backend/tests/conftest.py
+# run from the repository root: python -m pytest backend/tests (needs pytest and mongomock-motor)
+import os
+import sys
+
+import pytest
+
+# Settings() and the db module need these to import; nothing is mailed, uploaded or connected
+for name, value in {
+    "MAILGUN_DOMAIN": "test", "MAILGUN_API_KEY": "test", "MAIL_FROM": "test@localhost",
+    "FRONTEND_BASE_URL": "http://localhost", "atlas_URL": "mongodb://localhost:27017", "atlas_DB": "test",
+    "STORAGE_LOCAL_SECRET": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """
+    An in-memory database (mongomock-motor) in place of backend.core.db.db, for every module
+    that imported it. Repositories built after this (services build theirs in __init__) use it.
+    """
+    from mongomock_motor import AsyncMongoMockClient
+    import backend.core.db as core_db
+
+    test_db = AsyncMongoMockClient()["test"]
+    real_db = core_db.db
+    for module in list(sys.modules.values()):
+        if getattr(module, "db", None) is real_db:
+            monkeypatch.setattr(module, "db", test_db)
+    return test_db
@@ -0,0 +1,51 @@
+# backend/tests/test_annotation_patch.py
+import asyncio
+
+from bson import ObjectId
+
+from backend.src.models.annotation2 import AnnotationOperation
+from backend.src.services.annotation_service2 import ImageAnnotationsService
+
+BOX = {"type": "bbox", "geometry": {"x": 1, "y": 2, "width": 3, "height": 4}}
+
+
+def test_patch_returns_the_ids_of_added_annotations(mongo):
+    image_id = ObjectId()
+
+    async def run():
+        dataset_id = (await mongo["dataset"].insert_one({"name": "d", "total_Images": 1, "completed_Images": 0})).inserted_id
+        await mongo["imageMetadata"].insert_one(
+            {"_id": image_id, "datasetId": str(dataset_id), "status": "ready", "is_active": True, "is_completed": False})
+        await mongo["imageAnnotations"].insert_one({"imageId": str(image_id), "annotations": []})
+
+        result = await ImageAnnotationsService().patch_image_annotation(str(image_id), [
+            AnnotationOperation(op="add", annotation=BOX),
+            AnnotationOperation(op="add", annotation={**BOX, "id": "mine"}),
+        ])
+        doc = await mongo["imageAnnotations"].find_one({"imageId": str(image_id)})
+        return result, [a["id"] for a in doc["annotations"]]
+
+    result, stored = asyncio.run(run())
+    assert result.added == stored
+    assert result.added[1] == "mine"
+
+
+def test_guest_patch_returns_the_ids_of_added_annotations(tmp_path, monkeypatch):
+    # a new guest session loads the learning dataset from ./images
+    (tmp_path / "images").mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    async def run():
+        # the service starts its session cleanup task on import, so it needs a running loop
+        from backend.src.models.annotation2 import ImageAnnotations
+        from backend.src.services.guest_session_service import GuestSessionService
+
+        service = GuestSessionService()
+        service.create_image_annotations("guest_1", "img", ImageAnnotations(imageId="img", annotations=[]))
+        result = service.patch_image_annotation("guest_1", "img", [AnnotationOperation(op="add", annotation=BOX)])
+        stored = service.get_image_annotation("guest_1", "img")
+        return result, stored
+
+    result, stored = asyncio.run(run())
+    assert len(result.added) == 1
+    assert [a["id"] if isinstance(a, dict) else a.id for a in stored["annotations"]] == result.added
@@ -0,0 +1,37 @@
+# backend/tests/test_complete_upload.py
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from backend.core.local_storage import LocalStorage
+from backend.src.services import image_service as image_service_module
+from backend.src.services.image_service import ImageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    local = LocalStorage(root=str(tmp_path), secret=b"test")
+    monkeypatch.setattr(image_service_module, "storage", local)
+    return local
+
+
+def test_a_missing_object_never_fails_a_ready_image(mongo, storage):
+    async def run():
+        dataset_id = (await mongo["dataset"].insert_one({"name": "d", "total_Images": 1, "completed_Images": 0})).inserted_id
+        ready, pending = ObjectId(), ObjectId()
+        await mongo["imageMetadata"].insert_many([
+            {"_id": i, "datasetId": str(dataset_id), "s3Key": f"uploads/{i}.png", "status": status,
+             "fileName": "a.png", "width": 1, "height": 1, "fileType": "png", "is_active": True}
+            for i, status in ((ready, "ready"), (pending, "pending"))
+        ])
+        # neither object exists (e.g. a retried complete during a storage hiccup)
+        out = await ImageService().complete_upload_bulk([{"imageId": str(ready)}, {"imageId": str(pending)}], None)
+        statuses = {str(doc["_id"]): doc["status"] async for doc in mongo["imageMetadata"].find({})}
+        dataset = await mongo["dataset"].find_one({"_id": dataset_id})
+        return out, statuses, dataset["total_Images"], str(ready), str(pending)
+
+    out, statuses, total, ready, pending = asyncio.run(run())
+    assert out["results"] == {ready: "failed", pending: "failed"}
+    assert statuses == {ready: "ready", pending: "failed"}
+    assert total == 1
@@ -0,0 +1,106 @@
+# backend/tests/test_dataset_counters.py
+import asyncio
+import random
+
+from bson import ObjectId
+
+from backend.src.models.annotation2 import ImageAnnotations
+from backend.src.repositories.dataset_repo import DatasetRepo
+from backend.src.services.annotation_service2 import ImageAnnotationsService
+from backend.src.services.imageMetadata_service import MetadataService
+
+
+async def counts(db, dataset_id: ObjectId) -> tuple[int, int]:
+    doc = await db["dataset"].find_one({"_id": dataset_id})
+    return doc.get("total_Images", 0), doc.get("completed_Images", 0)
+
+
+def test_parallel_increments_are_exact(mongo):
+    async def run():
+        repo = DatasetRepo()
+        deltas = [random.choice((1, 1, 2, -1)) for _ in range(200)]
+        dataset_id = (await mongo["dataset"].insert_one({"name": "d", "total_Images": 1000, "completed_Images": 1000})).inserted_id
+        await asyncio.gather(*(
+            repo.increment_dataset_counters(str(dataset_id), total_delta=d, completed_delta=d) for d in deltas
+        ))
+        return await counts(mongo, dataset_id), 1000 + sum(deltas)
+
+    (total, completed), expected = asyncio.run(run())
+    assert total == completed == expected
+
+
+def test_counters_are_floored_at_zero(mongo):
+    async def run():
+        repo = DatasetRepo()
+        dataset_id = (await mongo["dataset"].insert_one({"name": "d", "total_Images": 3, "completed_Images": 0})).inserted_id
+        await asyncio.gather(*(repo.increment_total_images(str(dataset_id), -1) for _ in range(10)))
+        return await counts(mongo, dataset_id)
+
+    assert asyncio.run(run()) == (0, 0)
+
+
+def test_parallel_saves_deletes_and_restores_count_each_image_once(mongo):
+    n = 20
+
+    async def run():
+        metadata_service = MetadataService()
+        annotation_service = ImageAnnotationsService()
+        dataset_id = (await mongo["dataset"].insert_one({"name": "d", "total_Images": n, "completed_Images": 0})).inserted_id
+        image_ids = [ObjectId() for _ in range(n)]
+        await mongo["imageMetadata"].insert_many([
+            {"_id": i, "datasetId": str(dataset_id), "is_active": True, "is_completed": False, "status": "ready"}
+            for i in image_ids
+        ])
+        await mongo["imageAnnotations"].insert_many([{"imageId": str(i), "annotations": []} for i in image_ids])
+        annotated = ImageAnnotations(annotations=[{"type": "bbox", "geometry": {"x": 1, "y": 2, "width": 3, "height": 4}}])
+
+        # every image saved with annotations 3 times in parallel
+        await asyncio.gather(*(
+            annotation_service.update_image_annotation(str(i), annotated) for i in image_ids for _ in range(3)
+        ))
+        after_save = await counts(mongo, dataset_id)
+
+        # half of them soft-deleted 3 times in parallel, then restored 3 times in parallel
+        half = image_ids[: n // 2]
+        await asyncio.gather(*(metadata_service.soft_delete_image(str(i)) for i in half for _ in range(3)))
+        after_delete = await counts(mongo, dataset_id)
+        await asyncio.gather(*(metadata_service.restore_image(str(i)) for i in half for _ in range(3)))
+        after_restore = await counts(mongo, dataset_id)
+        return after_save, after_delete, after_restore
+
+    assert asyncio.run(run()) == ((n, n), (n // 2, n // 2), (n, n))
+
+
+def test_pending_images_are_not_counted(mongo):
+    async def run():
+        metadata_service = MetadataService()
+        dataset_id = (await mongo["dataset"].insert_one({"name": "d", "total_Images": 1, "completed_Images": 1})).inserted_id
+        ready, pending = ObjectId(), ObjectId()
+        await mongo["imageMetadata"].insert_many([
+            {"_id": ready, "datasetId": str(dataset_id), "is_active": True, "is_completed": True, "status": "ready"},
+            {"_id": pending, "datasetId": str(dataset_id), "is_active": True, "is_completed": True, "status": "pending"},
+        ])
+        await metadata_service.soft_delete_image(str(pending))
+        after_single = await counts(mongo, dataset_id)
+        await metadata_service.restore_image(str(pending))
+        await metadata_service.soft_delete_images(str(dataset_id))
+        return after_single, await counts(mongo, dataset_id)
+
+    assert asyncio.run(run()) == ((1, 1), (0, 0))
+
+
+def test_recount_counts_rows_without_is_active_as_active(mongo):
+    async def run():
+        from backend.src.services.dataset_stats_service import DatasetStatsService
+
+        dataset_id = (await mongo["dataset"].insert_one({"name": "d", "total_Images": 2, "completed_Images": 1})).inserted_id
+        await mongo["imageMetadata"].insert_many([
+            {"datasetId": str(dataset_id), "status": "ready", "is_active": True, "is_completed": True},
+            # legacy row, from before the field
+            {"datasetId": str(dataset_id), "status": "ready", "is_completed": False},
+            {"datasetId": str(dataset_id), "status": "ready", "is_active": False, "is_completed": True},
+        ])
+        return await DatasetStatsService().recount(str(dataset_id))
+
+    report = asyncio.run(run())
+    assert report["drifted"] == 0
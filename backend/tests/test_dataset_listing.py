@@ -0,0 +1,59 @@
+# backend/tests/test_dataset_listing.py
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from backend.src.repositories.dataset_repo import DatasetRepo
+from backend.src.services.dataset_service import DatasetService
+
+
+def test_counter_changes_while_paging_keep_every_dataset_on_its_page(mongo):
+    async def run():
+        service = DatasetService()
+        repo = DatasetRepo()
+        start = datetime(2025, 1, 1)
+        ids = (await mongo["dataset"].insert_many([
+            {"name": f"d{i}", "is_active": True, "total_Images": 0, "completed_Images": 0,
+             "updatedAt": start + timedelta(minutes=i)}
+            for i in range(7)
+        ])).inserted_ids
+
+        seen, after = [], None
+        while True:
+            content, after = await service.get_all_datasets_json(fields="id", limit=2, after=after)
+            seen += [row["id"] for row in json.loads(content)]
+            # annotation saves and uploads on datasets before and after the current page
+            for dataset_id in (ids[0], ids[6], ids[3]):
+                await repo.increment_completed_images(str(dataset_id), 1)
+                await repo.increment_total_images(str(dataset_id), 1)
+            if not after:
+                return seen, [str(i) for i in reversed(ids)]
+
+    seen, expected = asyncio.run(run())
+    assert seen == expected
+
+
+def test_paging_over_datasets_without_updated_at(mongo):
+    async def run():
+        service = DatasetService()
+        start = datetime(2025, 1, 1)
+        ids = (await mongo["dataset"].insert_many([
+            {"name": "d0", "updatedAt": start}, {"name": "legacy"}, {"name": "d2", "updatedAt": start + timedelta(minutes=1)},
+            {"name": "legacy"}, {"name": "d4", "updatedAt": start + timedelta(minutes=2)},
+        ])).inserted_ids
+
+        pages = {}
+        for sort in ("-updatedAt", "updatedAt"):
+            seen, after = [], None
+            while True:
+                content, after = await service.get_all_datasets_json(fields="id", limit=2, after=after, sort=sort)
+                seen += [row["id"] for row in json.loads(content)]
+                if not after:
+                    break
+            pages[sort] = seen
+        return [str(i) for i in ids], pages
+
+    ids, pages = asyncio.run(run())
+    # rows without updatedAt sort first ascending, last descending
+    assert pages["-updatedAt"] == [ids[4], ids[2], ids[0], ids[3], ids[1]]
+    assert pages["updatedAt"] == [ids[1], ids[3], ids[0], ids[2], ids[4]]
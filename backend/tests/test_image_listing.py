@@ -0,0 +1,54 @@
+# backend/tests/test_image_listing.py
+import asyncio
+import json
+
+from bson import ObjectId
+
+from backend.src.services.imageMetadata_service import MetadataService, image_filters
+
+
+async def insert_images(mongo, dataset_id: str, rows: list[dict]) -> list[str]:
+    docs = [{"datasetId": dataset_id, "fileName": f"img_{i:02d}.png", "width": 1, "height": 1, "fileType": "png",
+             "status": "ready", **row} for i, row in enumerate(rows)]
+    return [str(i) for i in (await mongo["imageMetadata"].insert_many(docs)).inserted_ids]
+
+
+def test_active_filter_includes_rows_without_the_field(mongo):
+    dataset_id = str(ObjectId())
+
+    async def run():
+        ids = await insert_images(mongo, dataset_id, [{"is_active": True}, {}, {"is_active": False}])
+        service = MetadataService()
+        active, _ = await service.get_images_json_by_dataset(
+            dataset_id, None, limit=None, offset=0, fields="id", filters=image_filters(is_active=True))
+        inactive, _ = await service.get_images_json_by_dataset(
+            dataset_id, None, limit=None, offset=0, fields="id", filters=image_filters(is_active=False))
+        return ids, [r["id"] for r in json.loads(active)], [r["id"] for r in json.loads(inactive)]
+
+    ids, active, inactive = asyncio.run(run())
+    assert active == ids[:2]
+    assert inactive == ids[2:]
+
+
+def test_paging_on_uploaded_at_over_rows_without_it(mongo):
+    from datetime import datetime, timedelta
+
+    dataset_id = str(ObjectId())
+    start = datetime(2025, 1, 1)
+
+    async def run():
+        # legacy rows without uploadedAt sort first
+        ids = await insert_images(mongo, dataset_id, [
+            {}, {"uploadedAt": start + timedelta(minutes=2)}, {}, {"uploadedAt": start + timedelta(minutes=1)}, {},
+        ])
+        service = MetadataService()
+        seen, after = [], None
+        while True:
+            content, after = await service.get_images_json_by_dataset(
+                dataset_id, None, limit=2, offset=0, after=after, sort="uploadedAt", fields="id")
+            seen += [row["id"] for row in json.loads(content)]
+            if not after:
+                return ids, seen
+
+    ids, seen = asyncio.run(run())
+    assert seen == [ids[0], ids[2], ids[4], ids[3], ids[1]]
@@ -0,0 +1,35 @@
+# backend/tests/test_indexes.py
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from backend.core import indexes
+from backend.core.indexes import IndexRegistry
+
+
+def test_unreachable_server_is_not_fatal(monkeypatch):
+    registry = IndexRegistry()
+    registry.declare("imageMetadata", [("datasetId", 1), ("_id", 1)])
+    registry.declare("dataset", "name")
+
+    async def run():
+        # nothing listens on port 1
+        client = AsyncIOMotorClient("mongodb://127.0.0.1:1", serverSelectionTimeoutMS=100)
+        monkeypatch.setattr(indexes, "db", client["test"])
+        try:
+            return await registry.apply()
+        finally:
+            client.close()
+
+    report = asyncio.run(run())
+    assert report["ensured"] == [] and report["failed"] == []
+    assert report["unreachable"]
+
+
+def test_indexes_are_created(mongo):
+    registry = IndexRegistry()
+    registry.declare("dataset", [("is_active", 1), ("updatedAt", -1)])
+
+    report = asyncio.run(registry.apply())
+
+    assert report == {"ensured": ["dataset.is_active_1_updatedAt_-1"], "failed": []}
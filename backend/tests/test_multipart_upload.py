@@ -0,0 +1,85 @@
+# backend/tests/test_multipart_upload.py
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from backend.core.local_storage import LocalStorage
+from backend.src.helpers.helpers import ValidationError
+from backend.src.models.imageMetadata import ImageMetadata
+from backend.src.services import image_service as image_service_module
+from backend.src.services.image_service import ImageService
+
+PART_SIZE = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    local = LocalStorage(root=str(tmp_path), secret=b"test")
+    monkeypatch.setattr(image_service_module, "storage", local)
+    return local
+
+
+async def one_chunk(data: bytes):
+    yield data
+
+
+async def start_upload(storage: LocalStorage, parts: dict[int, bytes], size: int) -> ImageMetadata:
+    key = f"uploads/test/{ObjectId()}.png"
+    upload_id = await storage.create_multipart_upload(key, "image/png")
+    etags = {}
+    for number, data in parts.items():
+        etags[str(number)] = await storage.write_stream(key, one_chunk(data), upload_id=upload_id, part_number=number)
+    return ImageMetadata(
+        _id=ObjectId(), datasetId=str(ObjectId()), fileName="scan.png", width=0, height=0, fileType="png", is_active=True,
+        s3Key=key, contentType="image/png", sizeBytes=size, uploadId=upload_id, partSize=PART_SIZE, uploadParts=etags,
+    )
+
+
+def test_missing_parts_are_listed_and_nothing_is_completed(storage):
+    size = 3 * PART_SIZE + 10  # 4 parts
+    doc = asyncio.run(start_upload(storage, {1: b"a" * PART_SIZE, 3: b"c" * PART_SIZE}, size))
+
+    with pytest.raises(ValidationError, match="Missing parts .*: 2, 4$"):
+        asyncio.run(ImageService()._finish_multipart(doc))
+
+    # the upload is still open, the client can upload the missing parts and complete again
+    assert [p["PartNumber"] for p in asyncio.run(storage.list_parts(doc.s3Key, doc.uploadId))] == [1, 3]
+    with pytest.raises(Exception):
+        asyncio.run(storage.head_object(doc.s3Key))
+
+
+def test_missing_parts_from_the_part_list(storage):
+    size = 2 * PART_SIZE  # exactly 2 parts
+    doc = asyncio.run(start_upload(storage, {2: b"b" * PART_SIZE}, size))
+    doc.uploadParts = None
+
+    with pytest.raises(ValidationError, match="Missing parts .*: 1$"):
+        asyncio.run(ImageService()._finish_multipart(doc))
+
+
+def test_parts_beyond_the_size_are_rejected(storage):
+    doc = asyncio.run(start_upload(storage, {1: b"a" * 10, 2: b"b" * 10}, 10))
+
+    with pytest.raises(ValidationError, match="Unexpected parts .*: 2$"):
+        asyncio.run(ImageService()._finish_multipart(doc))
+
+
+def test_retry_after_a_completed_upload_carries_on(storage):
+    size = PART_SIZE + 10
+    doc = asyncio.run(start_upload(storage, {1: b"a" * PART_SIZE, 2: b"b" * 10}, size))
+    service = ImageService()
+
+    # first complete went through, but the row kept uploadId (its update didn't land)
+    asyncio.run(service._finish_multipart(doc))
+    asyncio.run(service._finish_multipart(doc))
+
+    assert asyncio.run(storage.head_object(doc.s3Key))["ContentLength"] == size
+
+
+def test_retry_of_an_aborted_upload_fails(storage):
+    doc = asyncio.run(start_upload(storage, {1: b"a" * 10}, 10))
+    asyncio.run(storage.abort_multipart_upload(doc.s3Key, doc.uploadId))
+
+    with pytest.raises(ValidationError, match="no longer exists"):
+        asyncio.run(ImageService()._finish_multipart(doc))
@@ -0,0 +1,60 @@
+# backend/tests/test_purge.py
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from backend.core.local_storage import LocalStorage
+from backend.src.services import image_service as image_service_module
+from backend.src.services.image_service import ImageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    local = LocalStorage(root=str(tmp_path), secret=b"test")
+    monkeypatch.setattr(image_service_module, "storage", local)
+    return local
+
+
+def test_an_image_restored_during_the_purge_is_kept(mongo, storage):
+    dataset_id = str(ObjectId())
+    image_ids = [ObjectId() for _ in range(3)]
+    keys = [f"uploads/{dataset_id}/{i}.png" for i in image_ids]
+
+    async def run():
+        for key in keys:
+            await storage.put_object(key, b"png", "image/png")
+        await mongo["imageMetadata"].insert_many([
+            {"_id": i, "datasetId": dataset_id, "s3Key": key, "status": "ready", "is_active": False}
+            for i, key in zip(image_ids, keys)
+        ])
+        await mongo["imageAnnotations"].insert_many([{"imageId": str(i), "annotations": []} for i in image_ids])
+
+        service = ImageService()
+        select = service.image_repo.get_inactive_for_purge
+
+        async def select_then_restore(*args):
+            rows = await select(*args)
+            # restored by a request between the select and the delete
+            await mongo["imageMetadata"].update_one({"_id": image_ids[1]}, {"$set": {"is_active": True}})
+            return rows
+
+        service.image_repo.get_inactive_for_purge = select_then_restore
+        progress = await service.purge_dataset_images(dataset_id)
+
+        left = [doc["_id"] async for doc in mongo["imageMetadata"].find({})]
+        annotations = [doc["imageId"] async for doc in mongo["imageAnnotations"].find({})]
+        objects = []
+        for key in keys:
+            try:
+                await storage.head_object(key)
+                objects.append(key)
+            except Exception:
+                pass
+        return progress, left, annotations, objects
+
+    progress, left, annotations, objects = asyncio.run(run())
+    assert progress["deleted"] == 2
+    assert left == [image_ids[1]]
+    assert annotations == [str(image_ids[1])]
+    assert objects == [keys[1]]
@@ -0,0 +1,61 @@
+# backend/tests/test_rendition.py
+import io
+
+import pytest
+from PIL import Image
+
+from backend.src.services import rendition_service as rendition_module
+from backend.src.services.rendition_service import to_display_mode, make_renditions, RenditionTooLargeError
+
+
+def tiff_16bit(mode: str) -> bytes:
+    img = Image.new(mode, (64, 32))
+    img.putpixel((0, 0), 65535)
+    img.putpixel((1, 0), 100 * 256)
+    buf = io.BytesIO()
+    img.save(buf, format="TIFF")
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("mode", ["I;16", "I;16B"])
+def test_16bit_tiff_is_scaled_to_8bit(mode):
+    with Image.open(io.BytesIO(tiff_16bit(mode))) as img:
+        assert img.mode == mode
+        out = to_display_mode(img)
+
+    assert out.mode == "L"
+    assert [out.getpixel((x, 0)) for x in range(3)] == [255, 100, 0]
+
+
+def test_renditions_of_a_16bit_big_endian_tiff():
+    out = make_renditions(tiff_16bit("I;16B"))
+
+    assert set(out) == {"thumb", "preview"}
+    with Image.open(io.BytesIO(out["thumb"])) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (64, 32)
+
+
+def png(width: int, height: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_images_over_pillows_limit_are_rendered(monkeypatch):
+    # stands in for Pillow's ~178 MP limit: 600x400 is more than twice this, Image.open alone would refuse it
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100_000)
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(io.BytesIO(png(600, 400)))
+
+    out = make_renditions(png(600, 400))
+
+    with Image.open(io.BytesIO(out["thumb"])) as thumb:
+        assert max(thumb.size) == rendition_module.THUMB_SIZE
+
+
+def test_images_over_the_rendition_bound_are_refused(monkeypatch):
+    monkeypatch.setattr(rendition_module, "RENDITION_MAX_PIXELS", 100_000)
+
+    with pytest.raises(RenditionTooLargeError, match="600x400"):
+        make_renditions(png(600, 400))
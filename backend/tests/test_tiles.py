@@ -0,0 +1,93 @@
+# backend/tests/test_tiles.py
+import io
+import math
+
+import pytest
+from PIL import Image, ImageOps
+
+from backend.src.services.rendition_service import to_display_mode
+from backend.src.services.tile_service import BandReader, write_tile_pyramid
+
+TILE, OVERLAP = 16, 1
+
+
+def noise(mode: str, size: tuple[int, int]) -> Image.Image:
+    # different pixels everywhere, so a tile cut from the wrong rows shows
+    img = Image.effect_noise(size, 80).convert("L")
+    return Image.merge("RGB", (img, img.rotate(90, expand=False), img.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).convert(mode)
+
+
+def encode(img: Image.Image, fmt: str, **params) -> io.BytesIO:
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **params)
+    buf.seek(0)
+    return buf
+
+
+def reference_pyramid(data: io.BytesIO) -> dict[str, bytes]:
+    # the whole image in memory, halved level by level
+    with Image.open(data) as src:
+        img = to_display_mode(ImageOps.exif_transpose(src))
+    max_level = math.ceil(math.log2(max(img.size)))
+    tiles = {}
+    for level in range(max_level, -1, -1):
+        w, h = img.size
+        for row in range(math.ceil(h / TILE)):
+            for col in range(math.ceil(w / TILE)):
+                box = (max(col * TILE - OVERLAP, 0), max(row * TILE - OVERLAP, 0),
+                       min((col + 1) * TILE + OVERLAP, w), min((row + 1) * TILE + OVERLAP, h))
+                tiles[f"t_files/{level}/{col}_{row}.png"] = img.crop(box).tobytes()
+        img = img.reduce(2)
+    return tiles
+
+
+def pyramid(data: io.BytesIO) -> tuple[dict, dict[str, bytes]]:
+    tiles = {}
+
+    def put(key: str, body: bytes, content_type: str):
+        if key.endswith(".png"):
+            with Image.open(io.BytesIO(body)) as tile:
+                tiles[key] = tile.tobytes()
+
+    info = write_tile_pyramid(data, put, "t", TILE, OVERLAP, "png", 90)
+    return info, tiles
+
+
+@pytest.mark.parametrize("fmt, params, by_region", [
+    ("TIFF", {}, True),                                   # one uncompressed strip
+    ("TIFF", {"tiffinfo": {278: 7}}, True),               # many strips of 7 rows
+    ("TIFF", {"compression": "tiff_lzw"}, False),         # libtiff, decoded whole
+    ("PNG", {}, False),
+])
+def test_pyramid_matches_the_whole_image_pyramid(fmt, params, by_region):
+    data = encode(noise("RGB", (301, 517)), fmt, **params)
+
+    assert (BandReader(data).whole is None) == by_region
+    data.seek(0)
+    info, tiles = pyramid(data)
+    data.seek(0)
+
+    assert (info["width"], info["height"], info["maxLevel"]) == (301, 517, 10)
+    assert tiles == reference_pyramid(data)
+
+
+def test_16bit_tiff_bands():
+    img = Image.new("I;16", (90, 300))
+    img.putdata([(x * 700 + y * 97) % 65536 for y in range(300) for x in range(90)])
+    data = encode(img, "TIFF")
+
+    info, tiles = pyramid(data)
+    data.seek(0)
+    assert tiles == reference_pyramid(data)
+
+
+def test_exif_rotation_is_applied_like_the_renditions():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    data = encode(noise("RGB", (200, 60)), "JPEG", exif=exif, quality=95)
+
+    info, tiles = pyramid(data)
+    data.seek(0)
+
+    assert (info["width"], info["height"]) == (60, 200)
+    assert tiles == reference_pyramid(data)